@@ -0,0 +1,108 @@
+from datetime import date
+
+from flask import Blueprint, request, jsonify
+from db import get_read_connection
+from response_cache import cached
+
+get_calendar_blueprint = Blueprint("get_calendar", __name__)
+
+# Срок ТО в ближайшие UPCOMING_DAYS дней включительно (дни 0..5, как в прежнем календаре) — приближающийся
+UPCOMING_DAYS = 5
+MAX_WINDOW_DAYS = 400
+
+
+def due_status(due_date, today):
+    days = (due_date - today).days
+    if days < 0:
+        return "overdue"
+    if days <= UPCOMING_DAYS:
+        return "upcoming"
+    return "planned"
+
+
+def parse_window(args):
+    today = date.fromisoformat(args['today']) if args.get('today') else date.today()
+    date_from = date.fromisoformat(args['date_from']) if args.get('date_from') else date(today.year, 1, 1)
+    date_to = date.fromisoformat(args['date_to']) if args.get('date_to') else date(date_from.year + 1, 1, 1)
+    if date_to <= date_from or (date_to - date_from).days > MAX_WINDOW_DAYS:
+        raise ValueError("window")
+    machine_id = int(args['machine_id']) if args.get('machine_id') else None
+    return today, date_from, date_to, machine_id
+
+
+@get_calendar_blueprint.get("/api/v1/Calendar")
+@cached("VendingMachines", "Maintenance", "Events")
+def calendar():
+    conn = None
+    cursor = None
+    try:
+        try:
+            today, date_from, date_to, machine_id = parse_window(request.args)
+        except (ValueError, TypeError):
+            return jsonify({"error": f"Неверные параметры: date_from/date_to в формате YYYY-MM-DD, "
+                                     f"окно не больше {MAX_WINDOW_DAYS} дней"}), 400
+
+        machine_filter = "and vm.MachineID = ?" if machine_id is not None else ""
+        machine_params = [machine_id] if machine_id is not None else []
+        window = [date_from, date_to]
+
+        conn = get_read_connection()
+        cursor = conn.cursor()
+        events = []
+
+        cursor.execute(f"""select vm.MachineID, vm.Model, vm.Location, vm.DateOfNextFixing
+        from VendingMachines vm
+        where vm.DateOfNextFixing >= ? and vm.DateOfNextFixing < ? {machine_filter}""",
+                       window + machine_params)
+        for machine, model, location, due in cursor.fetchall():
+            events.append({
+                "Date": due, "Type": "maintenance", "Status": due_status(due, today),
+                "MachineID": machine, "Model": model, "Location": location,
+                "Description": "Плановое ТО"
+            })
+
+        cursor.execute(f"""select vm.MachineID, vm.Model, vm.Location, vm.NextVerificationDate
+        from VendingMachines vm
+        where vm.NextVerificationDate >= ? and vm.NextVerificationDate < ? {machine_filter}""",
+                       window + machine_params)
+        for machine, model, location, due in cursor.fetchall():
+            events.append({
+                "Date": due, "Type": "verification", "Status": due_status(due, today),
+                "MachineID": machine, "Model": model, "Location": location,
+                "Description": "Поверка"
+            })
+
+        cursor.execute(f"""select m.MachineID, vm.Model, vm.Location, m.MaintenanceDate, m.Description
+        from Maintenance m
+        join VendingMachines vm on m.MachineID=vm.MachineID
+        where m.MaintenanceDate >= ? and m.MaintenanceDate < ? {machine_filter}""",
+                       window + machine_params)
+        for machine, model, location, done, description in cursor.fetchall():
+            events.append({
+                "Date": done, "Type": "maintenance", "Status": "done",
+                "MachineID": machine, "Model": model, "Location": location,
+                "Description": description
+            })
+
+        cursor.execute(f"""select e.MachineID, vm.Model, vm.Location, e.EventDateTime, e.EventType, e.Message
+        from Events e
+        left join VendingMachines vm on e.MachineID=vm.MachineID
+        where e.EventDateTime >= ? and e.EventDateTime < ? {machine_filter}""",
+                       window + machine_params)
+        for machine, model, location, happened, event_type, message in cursor.fetchall():
+            events.append({
+                "Date": happened.date() if hasattr(happened, 'date') else happened,
+                "Type": "event", "Status": event_type,
+                "MachineID": machine, "Model": model, "Location": location,
+                "Description": message
+            })
+
+        events.sort(key=lambda event: (str(event["Date"]), event["MachineID"] or 0))
+        for event in events:
+            event["Date"] = str(event["Date"])
+        return jsonify(events)
+    except Exception as e:
+        return "Ошибка сервера", 500
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
@@ -0,0 +1,83 @@
+import os
+import threading
+
+from flask import Blueprint, Response, request, jsonify
+import changefeed
+from changefeed import broadcaster, sse_frame
+
+get_changes_blueprint = Blueprint("get_changes", __name__)
+
+DEFAULT_LIMIT = 500
+# Раз в столько секунд в пустой поток уходит комментарий, чтобы прокси не рвали соединение
+HEARTBEAT = 15
+# Каждый SSE-подписчик занимает поток сервера, пока не отключится. Сверх лимита поток
+# не открывается: клиент получает 503 и переходит на опрос GET /api/v1/changes?since=
+MAX_STREAMS = int(os.environ.get('CHANGES_MAX_STREAMS', 4))
+POLL_RETRY_AFTER = 5
+
+_streams = threading.BoundedSemaphore(MAX_STREAMS)
+
+
+def parse_tables(value):
+    return {table.strip() for table in value.split(',') if table.strip()} if value else None
+
+
+# Изменения после since. Без since отдаётся только текущий last_id — точка, с которой
+# клиент, загрузивший полные списки, начинает читать ленту
+@get_changes_blueprint.get("/api/v1/changes")
+def changes():
+    try:
+        since = request.args.get('since')
+        count = min(max(int(request.args.get('limit', DEFAULT_LIMIT)), 1), changefeed.MAX_READ)
+        tables = parse_tables(request.args.get('tables'))
+        if since is None:
+            return jsonify({"changes": [], "last_id": changefeed.latest()})
+        items, last_id = changefeed.read(int(since), count, tables)
+        return jsonify({"changes": items, "last_id": last_id})
+    except ValueError:
+        return jsonify({"error": "since и limit должны быть числами"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Server-Sent Events: id кадра — ChangeID, event — имя таблицы. При переподключении
+# браузер сам присылает Last-Event-ID и получает пропущенное.
+@get_changes_blueprint.get("/api/v1/changes/stream")
+def changes_stream():
+    try:
+        since = int(request.headers.get('Last-Event-ID') or request.args.get('since') or changefeed.latest())
+    except ValueError:
+        return jsonify({"error": "since должен быть числом"}), 400
+    tables = parse_tables(request.args.get('tables'))
+    if not _streams.acquire(blocking=False):
+        return jsonify({
+            "error": "Слишком много подписчиков, используйте опрос",
+            "poll_url": f"/api/v1/changes?since={since}"
+        }), 503, {"Retry-After": str(POLL_RETRY_AFTER)}
+
+    def generate():
+        last = since
+        yield "retry: 3000\n\n"
+        while True:
+            frames = broadcaster.frames_after(last)
+            if frames is None:
+                items, last_id = changefeed.read(last)
+                for change in items:
+                    if not tables or change["table"] in tables:
+                        yield sse_frame(change)
+                if last_id == last:
+                    broadcaster.wait(last, 1)
+                last = last_id
+                continue
+            for change_id, table, frame in frames:
+                if not tables or table in tables:
+                    yield frame
+                last = change_id
+            if not frames and not broadcaster.wait(last, HEARTBEAT):
+                yield ": ping\n\n"
+
+    response = Response(generate(), mimetype='text/event-stream',
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # Место освобождается при закрытии ответа, даже если генератор так и не запустился
+    response.call_on_close(_streams.release)
+    return response
@@ -0,0 +1,75 @@
+import os
+
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context
+from db import get_read_connection
+import exports
+import jobs
+from workers import hold_connection
+
+get_export_blueprint = Blueprint("get_export", __name__)
+
+
+# Выгрузка потоком: строки уходят клиенту по мере чтения курсора.
+# Соединение занято до конца выгрузки, поэтому многомиллионные выгрузки лучше ставить в фон через POST.
+@get_export_blueprint.get("/api/v1/<any(Sales, Maintenance):source>/export")
+def export(source):
+    conn = None
+    cursor = None
+    try:
+        try:
+            params = exports.parse_params(request.args)
+        except (ValueError, TypeError) as e:
+            return jsonify({"error": str(e)}), 400
+
+        conn = get_read_connection()
+        cursor = conn.cursor()
+        exports.execute(cursor, source, params)
+        chunks = exports.chunks(cursor, source, params["format"])
+
+        def generate(conn, cursor):
+            try:
+                yield from chunks
+            finally:
+                cursor.close()
+                conn.close()
+
+        response = hold_connection(Response(stream_with_context(generate(conn, cursor)),
+                                            mimetype=exports.MIMETYPES[params["format"]]))
+        conn = cursor = None
+        response.headers['Content-Disposition'] = f'attachment; filename="{exports.filename(source, params)}"'
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def export_job(job_id):
+    job = jobs.get(job_id)
+    return job if job is not None and job.kind == "export" else None
+
+
+# Статус фоновой выгрузки; processed — сколько строк уже записано
+@get_export_blueprint.get("/api/v1/exports/<job_id>")
+def export_status(job_id):
+    job = export_job(job_id)
+    if job is None:
+        return jsonify({"error": "Задача выгрузки не найдена"}), 404
+    status = job.to_dict()
+    if job.result is not None:
+        status["filename"] = job.result["filename"]
+        status["size"] = job.result["size"]
+        status["download_url"] = f"/api/v1/exports/{job.id}/file"
+    return jsonify(status)
+
+
+@get_export_blueprint.get("/api/v1/exports/<job_id>/file")
+def export_file(job_id):
+    job = export_job(job_id)
+    if job is None or job.result is None or not os.path.exists(job.result["path"]):
+        return jsonify({"error": "Файл выгрузки не найден или ещё не готов"}), 404
+    return send_file(job.result["path"], mimetype=job.result["mimetype"],
+                     as_attachment=True, download_name=job.result["filename"])
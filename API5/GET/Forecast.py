@@ -0,0 +1,57 @@
+from flask import Blueprint, current_app, request, jsonify
+from response_cache import cached
+from encoding import wants_columnar
+import forecast
+
+get_forecast_blueprint = Blueprint("get_forecast", __name__)
+
+
+def parse_horizon(args):
+    horizon = int(args.get('horizon_days', forecast.DEFAULT_HORIZON))
+    if not 1 <= horizon <= forecast.MAX_HORIZON:
+        raise ValueError
+    return horizon
+
+
+def parse_int(args, name):
+    value = args.get(name)
+    return int(value) if value is not None else None
+
+
+def frame_response(frame):
+    keys, rows = forecast.records(frame)
+    if wants_columnar():
+        return current_app.json.response({"columns": keys, "rows": rows})
+    return current_app.json.response([dict(zip(keys, row)) for row in rows])
+
+
+# Прогноз по аппаратам: by_days=N оставляет позиции, которые опустятся ниже порога в ближайшие N дней
+@get_forecast_blueprint.get("/api/v1/Forecast")
+@cached(*forecast.TABLES)
+def machine_forecast():
+    try:
+        try:
+            horizon = parse_horizon(request.args)
+            machine_id = parse_int(request.args, 'machine_id')
+            product_id = parse_int(request.args, 'product_id')
+            within = parse_int(request.args, 'by_days')
+        except ValueError:
+            return jsonify({"error": f"horizon_days – от 1 до {forecast.MAX_HORIZON}, by_days – число дней, "
+                                     f"machine_id и product_id – числа"}), 400
+        return frame_response(forecast.machine_plan(horizon, machine_id, product_id, within))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# План закупки по товарам на horizon_days дней
+@get_forecast_blueprint.get("/api/v1/Forecast/products")
+@cached(*forecast.TABLES)
+def product_forecast():
+    try:
+        try:
+            horizon = parse_horizon(request.args)
+        except ValueError:
+            return jsonify({"error": f"horizon_days – от 1 до {forecast.MAX_HORIZON}"}), 400
+        return frame_response(forecast.product_plan(horizon))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
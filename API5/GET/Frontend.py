@@ -0,0 +1,35 @@
+from flask import Blueprint, Response, request
+import assets
+from compression import choose_encoding
+
+get_frontend_blueprint = Blueprint("get_frontend", __name__)
+
+# Имена с хэшем меняются вместе с содержимым, поэтому их можно кэшировать навсегда
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def send_asset(name, cache_control):
+    asset = assets.get(name)
+    if asset is None:
+        return "Файл не найден", 404
+    encoding = choose_encoding(request.accept_encodings)
+    body = asset.compressed.get(encoding) if encoding else None
+    response = Response(body if body is not None else asset.body, mimetype=asset.mimetype)
+    if body is not None:
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(f"{asset.etag}-{encoding}")
+    else:
+        response.set_etag(asset.etag)
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = cache_control
+    return response.make_conditional(request)
+
+
+@get_frontend_blueprint.get("/")
+def index():
+    return send_asset(assets.INDEX, "no-cache")
+
+
+@get_frontend_blueprint.get("/assets/<name>")
+def asset(name):
+    return send_asset(name, IMMUTABLE)
@@ -0,0 +1,13 @@
+from flask import Blueprint, jsonify
+import jobs
+
+get_import_blueprint = Blueprint("get_import", __name__)
+
+
+# Статус фонового импорта CSV: progress — доля прочитанного файла в процентах
+@get_import_blueprint.get("/api/v1/VendingMachines/import/<job_id>")
+def import_status(job_id):
+    job = jobs.get(job_id)
+    if job is None or job.kind != "vm_import":
+        return jsonify({"error": "Задача импорта не найдена"}), 404
+    return jsonify(job.to_dict())
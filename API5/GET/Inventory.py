@@ -0,0 +1,74 @@
+from flask import Blueprint, request, jsonify
+from db import get_read_connection
+from response_cache import cached
+from streaming import wants_stream, stream_rows
+from refdata import resolver
+from encoding import rows_response
+
+get_inventory_blueprint = Blueprint("get_inventory", __name__)
+
+resolve_stock = resolver({"ProductName": "Products"})
+
+
+@get_inventory_blueprint.get("/api/v1/VendingMachines/<int:machine_id>/Products")
+@cached("MachineProducts", "Products")
+def machine_products(machine_id):
+    conn = None
+    cursor = None
+    try:
+        conn = get_read_connection()
+        cursor = conn.cursor()
+        query = """select mp.ProductID, mp.ProductID as ProductName, mp.Quantity, mp.MinQuantity, mp.NeedsRestock
+                from MachineProducts mp where mp.MachineID = ?
+                order by mp.ProductID"""
+        cursor.execute(query, (machine_id,))
+        stock = cursor.fetchall()
+        if stock:
+            return rows_response(cursor, stock, resolve_stock)
+        else:
+            return "Не найдены товары в аппарате", 404
+    except Exception as e:
+        return "Ошибка сервера", 500
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+
+# Аппараты, где остаток товара ниже порога. Выборка идёт по индексу
+# IX_MachineProducts_NeedsRestock, поэтому её стоимость зависит от числа
+# найденных позиций, а не от размера парка.
+@get_inventory_blueprint.get("/api/v1/Restock")
+@cached("MachineProducts", "VendingMachines", "Products")
+def restock():
+    conn = None
+    cursor = None
+    try:
+        where = "mp.NeedsRestock = 1"
+        params = []
+        machine_id = request.args.get('machine_id')
+        if machine_id is not None:
+            try:
+                params.append(int(machine_id))
+            except ValueError:
+                return jsonify({"error": "machine_id должен быть числом"}), 400
+            where += " and mp.MachineID = ?"
+
+        conn = get_read_connection()
+        cursor = conn.cursor()
+        query = f"""select mp.MachineID, vm.Location, vm.Model, mp.ProductID, mp.ProductID as ProductName,
+                mp.Quantity, mp.MinQuantity, mp.MinQuantity - mp.Quantity as Shortage
+                from MachineProducts mp
+                join VendingMachines vm on vm.MachineID = mp.MachineID
+                where {where}
+                order by mp.MachineID, mp.ProductID"""
+        cursor.execute(query, params)
+        if wants_stream():
+            response = stream_rows(conn, cursor, resolve_stock)
+            conn = cursor = None
+            return response
+        return rows_response(cursor, cursor.fetchall(), resolve_stock)
+    except Exception as e:
+        return "Ошибка сервера", 500
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
@@ -1,13 +1,22 @@
 from flask import Blueprint
-from db import get_connection
+from db import get_read_connection
+from response_cache import cached
+from streaming import wants_stream, stream_rows
+from refdata import resolver
+from encoding import rows_response
 
 get_mtc_blueprint = Blueprint("get_mtc", __name__)
+
+resolve_mtc = resolver({"DoneByUser": "Users"})
+
+
 @get_mtc_blueprint.get("/api/v1/Maintenance")
+@cached("Maintenance", "Users")
 def mtc():
     conn = None
     cursor = None
     try:
-        conn = get_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         query = """select 
         m.NoteID,
@@ -15,22 +24,15 @@ def mtc():
         m.MaintenanceDate,
         m.Description,
         m.Problems,
-        us.FullName from Maintenance m
-        left join Users us on m.DoneByUserID=us.UserID"""
+        m.DoneByUserID as DoneByUser from Maintenance m"""
         cursor.execute(query)
+        if wants_stream():
+            response = stream_rows(conn, cursor, resolve_mtc)
+            conn = cursor = None
+            return response
         mtc = cursor.fetchall()
         if mtc:
-            mtc_json = []
-            for mtcit in mtc:
-                 mtc_json.append({
-                     "NoteID": mtcit[0],
-                     "MachineID": mtcit[1],
-                     "MaintenanceDate": mtcit[2],
-                     "Description": mtcit[3],
-                     "Problems": mtcit[4],
-                     "DoneByUser": mtcit[5]
-                 })
-            return mtc_json
+            return rows_response(cursor, mtc, resolve_mtc)
         else:
             return "Не найдены данные об обслуживании"
 
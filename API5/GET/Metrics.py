@@ -0,0 +1,9 @@
+from flask import Blueprint, Response
+from metrics import render
+
+get_metrics_blueprint = Blueprint("get_metrics", __name__)
+
+
+@get_metrics_blueprint.get("/metrics")
+def metrics():
+    return Response(render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,13 @@
+from flask import Blueprint, jsonify
+from db import pool_stats, replica_stats
+
+get_pool_blueprint = Blueprint("get_pool", __name__)
+
+
+@get_pool_blueprint.get("/api/v1/Pool")
+def pool():
+    stats = pool_stats()
+    replicas = replica_stats()
+    if replicas:
+        stats["replicas"] = replicas
+    return jsonify(stats)
@@ -1,32 +1,29 @@
 from flask import Blueprint
-from db import get_connection
+from db import get_read_connection
+from response_cache import cached
+from streaming import wants_stream, stream_rows
+from encoding import rows_response
 
 get_products_blueprint = Blueprint("get_products", __name__)
 
 
 @get_products_blueprint.get("/api/v1/Products")
+@cached("Products")
 def products():
     conn = None
     cursor = None
     try:
-        conn = get_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         query = """select ProductID, Name, Description, Price, InStock, MinStock, PropensityToSell from Products"""
         cursor.execute(query)
+        if wants_stream():
+            response = stream_rows(conn, cursor)
+            conn = cursor = None
+            return response
         product = cursor.fetchall()
         if product:
-            product_json = []
-            for productit in product:
-                product_json.append({
-                    "ProductID": productit[0],
-                    "Name": productit[1],
-                    "Description": productit[2],
-                    "Price": productit[3],
-                    "InStock": productit[4],
-                    "MinStock": productit[5],
-                    "PropensityToSell": productit[6]
-                })
-            return product_json
+            return rows_response(cursor, product)
         else:
             return "Не найдены записи товарах"
     except Exception as e:
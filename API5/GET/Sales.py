@@ -1,41 +1,120 @@
-from flask import Blueprint
-from db import get_connection
+import base64
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify
+from db import get_read_connection, top, limit as limit_clause
+from response_cache import cached
+from streaming import wants_stream, stream_rows
+from refdata import resolver
+from encoding import rows_response
 
 get_sales_blueprint = Blueprint("get_sales", __name__)
 
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+resolve_sale = resolver({
+    "ProductName": "Products",
+    "PaymentTypeName": "PaymentType",
+})
+
+
+# Курсор — последняя отданная пара (SaleDateTime, SaleID), закодированная в base64
+def encode_cursor(sale_datetime, sale_id):
+    raw = f"{sale_datetime.isoformat()}|{sale_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+    sale_datetime, sale_id = raw.split('|')
+    return datetime.fromisoformat(sale_datetime), int(sale_id)
+
+
+def parse_filters(args):
+    where = []
+    params = []
+
+    for arg, column in (('machine_id', 's.MachineID'),
+                        ('product_id', 's.ProductID'),
+                        ('payment_type_id', 's.PaymentTypeID')):
+        value = args.get(arg)
+        if value is not None:
+            where.append(f"{column} = ?")
+            params.append(int(value))
+
+    date_from = args.get('date_from')
+    if date_from:
+        where.append("s.SaleDateTime >= ?")
+        params.append(datetime.fromisoformat(date_from))
+    date_to = args.get('date_to')
+    if date_to:
+        where.append("s.SaleDateTime < ?")
+        params.append(datetime.fromisoformat(date_to))
+
+    return where, params
+
+
+# Курсор после страницы из limit продаж или None, если страница последняя
+def page_end_cursor(cursor, where, params, limit):
+    cursor.execute(f"""select {top(1)} SaleDateTime, SaleID, count(*) over () from (
+        select {top(limit)} s.SaleDateTime, s.SaleID from Sales s
+        {"where " + " and ".join(where) if where else ""}
+        order by s.SaleDateTime desc, s.SaleID desc
+        {limit_clause(limit)}) page
+    order by SaleDateTime, SaleID {limit_clause(1)}""", params)
+    row = cursor.fetchone()
+    if row is None or row[2] < limit:
+        return None
+    return encode_cursor(row[0], row[1])
+
 
 @get_sales_blueprint.get("/api/v1/Sales")
+@cached("Sales", "Products", "PaymentType")
 def sales():
     conn = None
     cursor = None
     try:
-        conn = get_connection()
+        try:
+            limit = min(max(int(request.args.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+            where, params = parse_filters(request.args)
+            if request.args.get('cursor'):
+                last_datetime, last_id = decode_cursor(request.args['cursor'])
+                where.append("(s.SaleDateTime < ? OR (s.SaleDateTime = ? AND s.SaleID < ?))")
+                params.extend([last_datetime, last_datetime, last_id])
+        except (ValueError, TypeError):
+            return jsonify({"error": "Неверные параметры фильтрации или курсор"}), 400
+
+        conn = get_read_connection()
         cursor = conn.cursor()
-        query = """select 
+        query = f"""select {top(limit)}
         s.SaleID,
-        p.Name as ProductName,
+        s.ProductID as ProductName,
         s.MachineID,
         s.Quantity,
         s.SaleSum,
-        pay.Name as PaymentTypeName,
+        s.PaymentTypeID as PaymentTypeName,
         s.SaleDateTime from Sales s
-        left join Products p on s.ProductID=p.ProductID
-        left join PaymentType pay on s.PaymentTypeID=pay.PaymentTypeID"""
-        cursor.execute(query)
+        {"where " + " and ".join(where) if where else ""}
+        order by s.SaleDateTime desc, s.SaleID desc
+        {limit_clause(limit)}"""
+        if wants_stream():
+            # Заголовок уходит раньше строк, поэтому курсор следующей страницы — последнюю пару
+            # (SaleDateTime, SaleID) страницы — считаем отдельным запросом по индексу до выдачи
+            next_cursor = page_end_cursor(cursor, where, params, limit)
+            cursor.execute(query, params)
+            response = stream_rows(conn, cursor, resolve_sale)
+            conn = cursor = None
+            if next_cursor:
+                response.headers['X-Next-Cursor'] = next_cursor
+            return response
+        cursor.execute(query, params)
         sale = cursor.fetchall()
         if sale:
-            sales_json = []
-            for saleit in sale:
-                sales_json.append({
-                    "SaleID": saleit[0],
-                    "ProductName": saleit[1],
-                    "MachineID": saleit[2],
-                    "Quantity": saleit[3],
-                    "SaleSum": saleit[4],
-                    "PaymentTypeName": saleit[5],
-                    "SaleDateTime": saleit[6]
-                })
-            return sales_json
+            response = rows_response(cursor, sale, resolve_sale)
+            if len(sale) == limit:
+                response.headers['X-Next-Cursor'] = encode_cursor(sale[-1][6], sale[-1][0])
+            return response
         else:
             return "Не найдены записи о продажах"
     except Exception as e:
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify
+from db import get_read_connection
+from response_cache import cached
+
+get_sales_summary_blueprint = Blueprint("get_sales_summary", __name__)
+
+GRANULARITY = {"hour": "H", "day": "D"}
+GROUP_BY = {
+    "machine": "MachineID",
+    "product": "ProductID",
+    "payment": "PaymentTypeID",
+}
+
+
+@get_sales_summary_blueprint.get("/api/v1/Sales/summary")
+@cached("Sales")
+def sales_summary():
+    conn = None
+    cursor = None
+    try:
+        try:
+            granularity = GRANULARITY[request.args.get('granularity', 'day')]
+            group_by = [GROUP_BY[name] for name in request.args.get('group_by', 'machine').split(',') if name]
+            where = ["Granularity = ?"]
+            params = [granularity]
+            for arg, column in (('machine_id', 'MachineID'),
+                                ('product_id', 'ProductID'),
+                                ('payment_type_id', 'PaymentTypeID')):
+                if request.args.get(arg) is not None:
+                    where.append(f"{column} = ?")
+                    params.append(int(request.args[arg]))
+            if request.args.get('date_from'):
+                where.append("PeriodStart >= ?")
+                params.append(datetime.fromisoformat(request.args['date_from']))
+            if request.args.get('date_to'):
+                where.append("PeriodStart < ?")
+                params.append(datetime.fromisoformat(request.args['date_to']))
+        except (KeyError, ValueError):
+            return jsonify({"error": "Неверные параметры: granularity=hour|day, group_by=machine,product,payment"}), 400
+
+        columns = ["PeriodStart"] + group_by
+        conn = get_read_connection()
+        cursor = conn.cursor()
+        query = f"""select {", ".join(columns)},
+        sum(SaleCount), sum(Quantity), sum(SaleSum)
+        from SalesRollup
+        where {" and ".join(where)}
+        group by {", ".join(columns)}
+        order by {", ".join(columns)}"""
+        cursor.execute(query, params)
+        keys = columns + ["SaleCount", "Quantity", "SaleSum"]
+        summary_json = [dict(zip(keys, row)) for row in cursor.fetchall()]
+        return jsonify(summary_json)
+    except Exception as e:
+        return "Ошибка сервера", 500
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
@@ -0,0 +1,22 @@
+from flask import Blueprint, request, jsonify
+import scheduler
+
+get_schedule_blueprint = Blueprint("get_schedule", __name__)
+
+
+# План ТО по сотрудникам на горизонт планирования; user_id оставляет одного сотрудника
+@get_schedule_blueprint.get("/api/v1/Schedule")
+def schedule():
+    try:
+        user_id = request.args.get('user_id')
+        if user_id is not None:
+            try:
+                user_id = int(user_id)
+            except ValueError:
+                return jsonify({"error": "user_id должен быть числом"}), 400
+        plan = scheduler.plan()
+        if user_id is not None:
+            plan["technicians"] = [t for t in plan["technicians"] if t["UserID"] == user_id]
+        return jsonify(plan)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,29 +1,29 @@
 from flask import Blueprint
-from db import get_connection
+from db import get_read_connection
+from response_cache import cached
+from streaming import wants_stream, stream_rows
+from encoding import rows_response
 
 get_users_blueprint = Blueprint("get_users", __name__)
 
 
 @get_users_blueprint.get("/api/v1/Users")
+@cached("Users")
 def users():
     conn = None
     cursor = None
     try:
-        conn = get_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
-        query = """select *from Users"""
+        query = """select UserID, FullName, Contacts, Role from Users"""
         cursor.execute(query)
+        if wants_stream():
+            response = stream_rows(conn, cursor)
+            conn = cursor = None
+            return response
         user = cursor.fetchall()
         if user:
-            users_json = []
-            for userit in user:
-                users_json.append({
-                    "UserID": userit[0],
-                    "FullName": userit[1],
-                    "Contacts": userit[2],
-                    "Role": userit[3]
-                })
-            return users_json
+            return rows_response(cursor, user)
         else:
             return "Не найдены записи о пользователях"
     except Exception as e:
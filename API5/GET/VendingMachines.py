@@ -1,67 +1,79 @@
-from flask import Blueprint, jsonify
-from db import get_connection
+from flask import Blueprint, request, jsonify
+from db import get_read_connection
+from response_cache import cached
+from streaming import wants_stream, stream_rows
+from refdata import resolver
+from encoding import rows_response
+import machine_search
 
 get_vm_blueprint = Blueprint("get_vm", __name__)
 
+# Поля, доступные через ?fields=, и их выражения в SQL. Без параметра отдаются все, кроме MachineID.
+VM_FIELDS = {
+    "MachineID": "vm.MachineID",
+    "Location": "vm.Location",
+    "Model": "vm.Model",
+    "PaymentType": "vm.PaymentTypeID as PaymentType",
+    "FullIncome": "vm.FullIncome",
+    "SerialNumber": "vm.SerialNumber",
+    "InventoryNumber": "vm.InventoryNumber",
+    "Manufacturer": "vm.Manufacturer",
+    "ManufactureDate": "vm.ManufactureDate",
+    "DateOfCommissioning": "vm.DateOfCommissioning",
+    "LastVerificationDate": "vm.LastVerificationDate",
+    "VerificationInterval": "vm.VerificationInterval",
+    "ResourceHours": "vm.ResourceHours",
+    "DateOfNextFixing": "vm.DateOfNextFixing",
+    "MaintenanceTimeHours": "vm.MaintenanceTimeHours",
+    "StatusName": "vm.MachineStatusID as StatusName",
+    "CountryName": "vm.CountryID as CountryName",
+    "InventoryDate": "vm.InventoryDate",
+    "LastCheckedByUser": "vm.LastCheckedByUserID as LastCheckedByUser",
+}
+DEFAULT_FIELDS = tuple(field for field in VM_FIELDS if field != "MachineID")
+
+resolve_vm = resolver({
+    "PaymentType": "PaymentType",
+    "StatusName": "MachineStatus",
+    "CountryName": "Country",
+    "LastCheckedByUser": "Users",
+})
+
+
+def parse_fields(value):
+    if not value:
+        return DEFAULT_FIELDS
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in VM_FIELDS]
+    if not fields or unknown:
+        raise ValueError(", ".join(unknown))
+    return fields
+
 
 @get_vm_blueprint.get("/api/v1/VendingMachines")
+@cached("VendingMachines", "PaymentType", "MachineStatus", "Country", "Users")
 def vm_create():
     conn = None
     cursor = None
     try:
-        conn = get_connection()
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({"error": f"Неизвестные поля: {e}", "allowed": list(VM_FIELDS)}), 400
+
+        conn = get_read_connection()
         cursor = conn.cursor()
-        query = """select 
-                vm.Location,
-                vm.Model,
-                pay.Name as PaymentName,
-                vm.FullIncome,
-                vm.SerialNumber,
-                vm.InventoryNumber,
-                vm.Manufacturer,
-                vm.ManufactureDate,
-                vm.DateOfCommissioning,
-                vm.LastVerificationDate,
-                vm.VerificationInterval,
-                vm.ResourceHours,
-                vm.DateOfNextFixing,
-                vm.MaintenanceTimeHours,
-                ms.Name as StatusName,
-                c.Name as CountryName,
-                vm.InventoryDate,
-                us.FullName as LastCheckedByUserName
-                from VendingMachines vm
-                left join PaymentType pay on vm.PaymentTypeID=pay.PaymentTypeID
-                left join MachineStatus ms on vm.MachineStatusID=ms.StatusID
-                left join Country c on vm.CountryID=c.CountryID
-                left join Users us on vm.LastCheckedByUserID=us.UserID"""
+        query = f"""select {", ".join(VM_FIELDS[field] for field in fields)}
+                from VendingMachines vm"""
         cursor.execute(query)
+        if wants_stream():
+            response = stream_rows(conn, cursor, resolve_vm)
+            conn = cursor = None
+            return response
         vm = cursor.fetchall()
 
         if vm:
-            vm_json = []
-            for vmit in vm:
-                vm_json.append({
-                    "Location": vmit[0],
-                    "Model": vmit[1],
-                    "PaymentType": vmit[2],
-                    "FullIncome": vmit[3],
-                    "SerialNumber": vmit[4],
-                    "InventoryNumber": vmit[5],
-                    "Manufacturer": vmit[6],
-                    "ManufactureDate": vmit[7],
-                    "DateOfCommissioning": vmit[8],
-                    "LastVerificationDate": vmit[9],
-                    "VerificationInterval": vmit[10],
-                    "ResourceHours": vmit[11],
-                    "DateOfNextFixing": vmit[12],
-                    "MaintenanceTimeHours": vmit[13],
-                    "StatusName": vmit[14],
-                    "CountryName": vmit[15],
-                    "InventoryDate": vmit[16],
-                    "LastCheckedByUser": vmit[17]
-                })
-            return jsonify(vm_json)
+            return rows_response(cursor, vm, resolve_vm)
         else:
             return "Не найдены записи об аппаратах", 404
 
@@ -72,3 +84,24 @@ def vm_create():
             cursor.close()
         if conn:
             conn.close()
+
+
+# Поиск по части серийного или инвентарного номера, адреса или модели; слова запроса должны
+# найтись все, лучшие совпадения — первыми. total — сколько аппаратов подошло всего
+@get_vm_blueprint.get("/api/v1/VendingMachines/search")
+def vm_search():
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({"error": "Не задан поисковый запрос q"}), 400
+        try:
+            limit = int(request.args.get('limit', machine_search.DEFAULT_LIMIT))
+        except ValueError:
+            return jsonify({"error": "limit должен быть числом"}), 400
+        if not 1 <= limit <= machine_search.MAX_LIMIT:
+            return jsonify({"error": f"limit должен быть от 1 до {machine_search.MAX_LIMIT}"}), 400
+
+        total, items = machine_search.search(query, limit)
+        return jsonify({"query": query, "total": total, "items": items})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,23 @@
+from flask import Blueprint, request, jsonify
+import exports
+import jobs
+
+post_export_blueprint = Blueprint("post_export", __name__)
+
+
+# Фоновая выгрузка: файл пишется в EXPORT_DIR, обработчик запроса сразу освобождается.
+# Параметры те же, что у GET: в JSON или в query string.
+@post_export_blueprint.post("/api/v1/<any(Sales, Maintenance):source>/export")
+def queue_export(source):
+    try:
+        params = exports.parse_params(request.get_json(silent=True) or request.args)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    job = jobs.submit("export", exports.run_export, source, params)
+    status_url = f"/api/v1/exports/{job.id}"
+    return jsonify({
+        "message": "Выгрузка поставлена в очередь",
+        "job_id": job.id,
+        "status_url": status_url
+    }), 202, {"Location": status_url}
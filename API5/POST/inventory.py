@@ -0,0 +1,53 @@
+from flask import Blueprint, request, jsonify
+from db import get_connection
+from response_cache import bump
+from auth import require_auth
+from inventory import parse_stock, set_stock
+import changefeed
+
+post_inventory_blueprint = Blueprint("post_inventory", __name__)
+
+
+# Загрузка аппарата: принимает одну позицию или массив {ProductID, Quantity, MinQuantity?}
+@post_inventory_blueprint.post("/api/v1/VendingMachines/<int:machine_id>/Products")
+@require_auth()
+def load_machine(machine_id):
+    conn = None
+    cursor = None
+    try:
+        data = request.get_json()
+        if isinstance(data, dict):
+            data = [data]
+        if not isinstance(data, list) or not data:
+            return jsonify({"error": "Ожидается позиция или непустой массив позиций"}), 400
+
+        try:
+            items = [parse_stock(item) for item in data]
+        except KeyError as e:
+            return jsonify({"error": f"Отсутствует обязательное поле: {str(e)}"}), 400
+        except (ValueError, TypeError, AttributeError) as e:
+            return jsonify({"error": f"Ошибка в типах данных: {str(e)}"}), 400
+
+        conn = get_connection()
+        cursor = conn.cursor()
+        set_stock(cursor, machine_id, items)
+        changefeed.record(cursor, "MachineProducts", [
+            {"MachineID": machine_id, "ProductID": product_id, "Quantity": quantity, "MinQuantity": min_quantity}
+            for product_id, quantity, min_quantity in items
+        ], 'U')
+        bump(conn, "MachineProducts")
+        conn.commit()
+        changefeed.notify()
+        return jsonify({
+            "message": f"Обновлено позиций: {len(items)}"
+        }), 200
+
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
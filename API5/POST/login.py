@@ -1,5 +1,6 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, g, request, jsonify
 from db import get_connection
+from auth import TOKEN_TTL, issue, login_limiter, require_auth, revoke
 
 post_login_blueprint = Blueprint("post_login", __name__)
 
@@ -18,6 +19,13 @@ def login():
         if not contacts or not password:
             return jsonify({"error": "Не указаны контакты или пароль"}), 400
 
+        # Подбор пароля отсекается до запроса к БД
+        key = (request.remote_addr, str(contacts).lower())
+        retry_after = login_limiter.retry_after(key)
+        if retry_after:
+            return jsonify({"error": "Слишком много попыток входа, повторите позже"}), 429, \
+                {"Retry-After": str(retry_after)}
+
         conn = get_connection()
         cursor = conn.cursor()
         query = "SELECT UserID, FullName, Role FROM Users WHERE Contacts = ? AND Password = ?"
@@ -25,12 +33,16 @@ def login():
         user = cursor.fetchone()
 
         if user:
+            login_limiter.reset(key)
             return jsonify({
                 "UserID": user[0],
                 "FullName": user[1],
-                "Role": user[2]
+                "Role": user[2],
+                "token": issue(user[0], user[2]),
+                "expires_in": TOKEN_TTL
             }), 200
         else:
+            login_limiter.hit(key)
             return jsonify({"error": "Неверные контакты или пароль"}), 401
 
     except Exception as e:
@@ -38,4 +50,15 @@ def login():
         return jsonify({"error": "Внутренняя ошибка сервера"}), 500
     finally:
         if cursor: cursor.close()
-        if conn: conn.close()
\ No newline at end of file
+        if conn: conn.close()
+
+
+@post_login_blueprint.post("/api/v1/logout")
+@require_auth()
+def logout():
+    try:
+        revoke(g.user)
+    except Exception as e:
+        print(f"Ошибка при выходе: {e}")
+        return jsonify({"error": "Внутренняя ошибка сервера"}), 500
+    return jsonify({"message": "Выход выполнен"}), 200
@@ -1,10 +1,15 @@
 from flask import Blueprint, request, jsonify
-from db import get_connection
+from db import get_connection, last_identity
+from response_cache import bump
+from auth import require_auth
+import changefeed
+import scheduler
 
 post_mtc_blueprint = Blueprint("post_mtc", __name__)
 
 
 @post_mtc_blueprint.post("/api/v1/Maintenance")
+@require_auth()
 def add_mtc():
     conn = None
     cursor = None
@@ -28,10 +33,21 @@ def add_mtc():
         )
 
         cursor.execute(query, params)
+        cursor.execute(last_identity())
+        note_id = int(cursor.fetchone()[0])
+        changefeed.record(cursor, "Maintenance", [{
+            "NoteID": note_id, "MachineID": params[0], "MaintenanceDate": params[1],
+            "Description": params[2], "Problems": params[3], "DoneByUser": params[4]
+        }])
+        bump(conn, "Maintenance")
         conn.commit()
-
-        cursor.execute("SELECT SCOPE_IDENTITY()")
-        note_id = cursor.fetchone()[0]
+        changefeed.notify()
+        # Запись уже закоммичена: ошибка графика не должна откатывать её и превращаться в 500.
+        # График всё равно перестроится по новой версии Maintenance
+        try:
+            scheduler.maintenance_done(params[0], params[1])
+        except Exception as e:
+            print(f"✗ Не удалось обновить график работ: {e}")
 
         return jsonify({
             "message": "Запись технического обслуживания успешно создана"
@@ -1,11 +1,15 @@
 from flask import Blueprint, request, jsonify
 import json
-from db import get_connection
+from db import get_connection, last_identity
+from response_cache import bump
+from auth import ADMIN, OPERATOR, require_auth
+import changefeed
 
 post_products_blueprint = Blueprint("post_products", __name__)
 
 
 @post_products_blueprint.post("/api/v1/Products")
+@require_auth(ADMIN, OPERATOR)
 def add_product():
     conn = None
     cursor = None
@@ -32,8 +36,14 @@ def add_product():
             float(data.get('PropensityToSell', 0.0))
         )
         cursor.execute(query, params)
+        cursor.execute(last_identity())
+        product = {"ProductID": int(cursor.fetchone()[0])}
+        product.update(zip(("Name", "Description", "Price", "InStock", "MinStock", "PropensityToSell"), params))
+        changefeed.record(cursor, "Products", [product])
+        bump(conn, "Products")
 
         conn.commit()
+        changefeed.notify()
         return jsonify({
             "message": "Запись товара успешно создана"
         }), 201
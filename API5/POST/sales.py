@@ -1,48 +1,100 @@
-from datetime import datetime
-
 from flask import Blueprint, request, jsonify
-import json
 from db import get_connection
+import sales_ingest
+import changefeed
+from sales_ingest import parse_sale, write_sales, BufferFull
 
 post_sales_blueprint = Blueprint("post_sales", __name__)
 
+MAX_BATCH_SIZE = 5000
+
+
 @post_sales_blueprint.post("/api/v1/Sales")
 def add_sale():
     conn = None
-    cursor = None
     try:
         data = request.get_json()
         if data is None:
             return jsonify({"error": "Неверный формат JSON"}), 400
 
+        params = parse_sale(data)
+
+        if sales_ingest.buffer is not None:
+            sales_ingest.buffer.add([params])
+            return jsonify({
+                "message": "Продажа принята в обработку"
+            }), 202
+
         conn = get_connection()
-        cursor = conn.cursor()
-
-        query = """INSERT INTO Sales 
-                   (ProductID, MachineID, Quantity, SaleSum, PaymentTypeID, SaleDateTime) 
-                   VALUES (?, ?, ?, ?, ?, GETDATE())"""
-        params = (
-            int(data['ProductID']),
-            int(data['MachineID']),
-            int(data['Quantity']),
-            int(data['SaleSum']),
-            int(data['PaymentTypeID'])
-        )
-        cursor.execute(query, params)
+        write_sales(conn, [params])
 
         conn.commit()
+        changefeed.notify()
         return jsonify({
             "message": "Запись продажи успешно создана"
         }), 201
 
     except KeyError as e:
         return jsonify({"error": f"Отсутствует обязательное поле: {str(e)}"}), 400
+    except ValueError as e:
+        return jsonify({"error": f"Ошибка в типах данных: {str(e)}"}), 400
+    except BufferFull as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if conn:
+            conn.close()
+
+
+@post_sales_blueprint.post("/api/v1/Sales/batch")
+def add_sales_batch():
+    conn = None
+    try:
+        data = request.get_json()
+        if isinstance(data, dict):
+            data = data.get('sales')
+        if not isinstance(data, list) or not data:
+            return jsonify({"error": "Ожидается непустой массив продаж"}), 400
+        if len(data) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"Не больше {MAX_BATCH_SIZE} продаж за запрос"}), 413
+
+        rows = []
+        errors = []
+        for idx, item in enumerate(data):
+            try:
+                rows.append(parse_sale(item))
+            except KeyError as e:
+                errors.append(f"Продажа {idx}: отсутствует обязательное поле {str(e)}")
+            except (ValueError, TypeError, AttributeError) as e:
+                errors.append(f"Продажа {idx}: {str(e)}")
+
+        if rows:
+            conn = get_connection()
+            write_sales(conn, rows)
+            conn.commit()
+            changefeed.notify()
+
+        if errors:
+            return jsonify({
+                "success": False,
+                "message": f"Загружено {len(rows)} продаж, ошибок: {len(errors)}",
+                "processed": len(rows),
+                "errors": errors[:20]
+            }), 207
+
+        return jsonify({
+            "success": True,
+            "message": f"Загружено {len(rows)} продаж",
+            "processed": len(rows)
+        }), 201
+
     except Exception as e:
         if conn:
             conn.rollback()
         return jsonify({"error": str(e)}), 500
     finally:
-        if cursor:
-            cursor.close()
         if conn:
-            conn.close()
\ No newline at end of file
+            conn.close()
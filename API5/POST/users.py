@@ -1,10 +1,14 @@
 from flask import Blueprint, request, jsonify
-from db import get_connection
+from db import get_connection, last_identity
+from response_cache import bump
+from auth import ADMIN, require_auth
+import changefeed
 
 post_user_blueprint = Blueprint("post_user", __name__)
 
 
 @post_user_blueprint.post("/api/v1/Users")
+@require_auth(ADMIN)
 def add_user():
     conn = None
     cursor = None
@@ -28,7 +32,14 @@ def add_user():
         )
 
         cursor.execute(query, params)
+        cursor.execute(last_identity())
+        user_id = int(cursor.fetchone()[0])
+        changefeed.record(cursor, "Users", [{
+            "UserID": user_id, "FullName": params[0], "Contacts": params[1], "Role": params[2]
+        }])
+        bump(conn, "Users")
         conn.commit()
+        changefeed.notify()
 
         return jsonify({
             "message": "Запись пользователя успешно создана"
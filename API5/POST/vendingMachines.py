@@ -1,12 +1,44 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime
-from db import get_connection
+from db import get_connection, connection, last_identity
+from response_cache import bump
+from auth import ADMIN, OPERATOR, require_auth
+import jobs
+import changefeed
+import numpy as np
 import pandas as pd
-import io
+import os
+import shutil
+import tempfile
 
 post_vm_blueprint = Blueprint("post_vm", __name__)
 
+INSERT_VM = """
+        INSERT INTO VendingMachines (Location, Model, PaymentTypeID, FullIncome, SerialNumber, 
+                    InventoryNumber, Manufacturer, ManufactureDate, DateOfCommissioning, 
+                    LastVerificationDate, VerificationInterval, ResourceHours, 
+                    DateOfNextFixing, MaintenanceTimeHours, MachineStatusID, 
+                    CountryID, InventoryDate, LastCheckedByUserID) 
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+# Имена полей GET /VendingMachines в порядке параметров INSERT_VM — для ленты изменений
+VM_CHANGE_KEYS = ("Location", "Model", "PaymentType", "FullIncome", "SerialNumber", "InventoryNumber",
+                  "Manufacturer", "ManufactureDate", "DateOfCommissioning", "LastVerificationDate",
+                  "VerificationInterval", "ResourceHours", "DateOfNextFixing", "MaintenanceTimeHours",
+                  "StatusName", "CountryName", "InventoryDate", "LastCheckedByUser")
+SERIAL_INDEX = VM_CHANGE_KEYS.index("SerialNumber")
+
+# Размер пачки для проверки дублей (2 параметра на строку, лимит SQL Server — 2100) и для вставки
+KEYS_CHUNK = 1000
+INSERT_BATCH = 1000
+# Импорт CSV: файл до SPOOL_MAX_SIZE байт держится в памяти, больше — во временном файле;
+# разбирается пачками по IMPORT_CHUNK_ROWS строк
+SPOOL_MAX_SIZE = int(os.environ.get('IMPORT_SPOOL_MAX_SIZE', 1024 * 1024))
+IMPORT_CHUNK_ROWS = int(os.environ.get('IMPORT_CHUNK_ROWS', 5000))
+COPY_BUFFER = 64 * 1024
+
 @post_vm_blueprint.post("/api/v1/VendingMachines")
+@require_auth(ADMIN, OPERATOR)
 def add_vending_machine():
     conn = None
     cursor = None
@@ -32,115 +64,228 @@ def process_json(data):
         return jsonify({"error": "Неверный формат JSON"}), 400
     
     conn = get_connection()
-    cursor = conn.cursor()
+    try:
+        cursor = conn.cursor()
     
-    # Проверка уникальности
-    cursor.execute("SELECT COUNT(*) FROM VendingMachines WHERE SerialNumber = ? OR InventoryNumber = ?",
-                  (data.get('SerialNumber', ''), data.get('InventoryNumber', '')))
+        # Проверка уникальности
+        cursor.execute("SELECT COUNT(*) FROM VendingMachines WHERE SerialNumber = ? OR InventoryNumber = ?",
+                      (data.get('SerialNumber', ''), data.get('InventoryNumber', '')))
     
-    if cursor.fetchone()[0] > 0:
-        return jsonify({"error": "Дублирование SerialNumber или InventoryNumber"}), 400
+        if cursor.fetchone()[0] > 0:
+            return jsonify({"error": "Дублирование SerialNumber или InventoryNumber"}), 400
     
-    # Подготовка параметров
-    params = (
-        str(data.get('Location', '')),
-        str(data.get('Model', '')),
-        int(data['PaymentTypeID']),
-        float(data.get('FullIncome', 0.0)),
-        str(data.get('SerialNumber', '')),
-        str(data.get('InventoryNumber', '')),
-        str(data.get('Manufacturer', '')),
-        str(data.get('ManufactureDate', '')),
-        str(data.get('DateOfCommissioning', '')),
-        str(data.get('LastVerificationDate', '')),
-        int(data.get('VerificationInterval', 6)),
-        int(data.get('ResourceHours', 0)),
-        data.get('DateOfNextFixing', ''),
-        int(data.get('MaintenanceTimeHours', 4)),
-        int(data['MachineStatusID']),
-        int(data['CountryID']),
-        str(data.get('InventoryDate', datetime.now().date())),
-        int(data['LastCheckedByUserID'])
-    )
+        # Подготовка параметров
+        params = (
+            str(data.get('Location', '')),
+            str(data.get('Model', '')),
+            int(data['PaymentTypeID']),
+            float(data.get('FullIncome', 0.0)),
+            str(data.get('SerialNumber', '')),
+            str(data.get('InventoryNumber', '')),
+            str(data.get('Manufacturer', '')),
+            str(data.get('ManufactureDate', '')),
+            str(data.get('DateOfCommissioning', '')),
+            str(data.get('LastVerificationDate', '')),
+            int(data.get('VerificationInterval', 6)),
+            int(data.get('ResourceHours', 0)),
+            data.get('DateOfNextFixing', ''),
+            int(data.get('MaintenanceTimeHours', 4)),
+            int(data['MachineStatusID']),
+            int(data['CountryID']),
+            str(data.get('InventoryDate', datetime.now().date())),
+            int(data['LastCheckedByUserID'])
+        )
     
-    cursor.execute("""
-        INSERT INTO VendingMachines (Location, Model, PaymentTypeID, FullIncome, SerialNumber, 
-                    InventoryNumber, Manufacturer, ManufactureDate, DateOfCommissioning, 
-                    LastVerificationDate, VerificationInterval, ResourceHours, 
-                    DateOfNextFixing, MaintenanceTimeHours, MachineStatusID, 
-                    CountryID, InventoryDate, LastCheckedByUserID) 
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, params)
+        cursor.execute(INSERT_VM, params)
+        cursor.execute(last_identity())
+        changefeed.record(cursor, "VendingMachines", [machine_change(cursor.fetchone()[0], params)])
+        bump(conn, "VendingMachines")
     
-    conn.commit()
-    return jsonify({"message": "Запись успешно создана"}), 201
+        conn.commit()
+        changefeed.notify()
+        return jsonify({"message": "Запись успешно создана"}), 201
+    finally:
+        conn.close()
+
+# Колонки CSV в порядке параметров INSERT_VM: тип и значение для отсутствующей колонки
+# или пустой ячейки; None — поле обязательно
+CSV_COLUMNS = (
+    ('Location', str, None), ('Model', str, None), ('PaymentTypeID', int, None),
+    ('FullIncome', float, 0.0), ('SerialNumber', str, None), ('InventoryNumber', str, None),
+    ('Manufacturer', str, None), ('ManufactureDate', str, None), ('DateOfCommissioning', str, None),
+    ('LastVerificationDate', str, None), ('VerificationInterval', int, 6), ('ResourceHours', int, None),
+    ('DateOfNextFixing', str, ''), ('MaintenanceTimeHours', int, 4), ('MachineStatusID', int, None),
+    ('CountryID', int, None), ('InventoryDate', str, lambda: str(datetime.now().date())),
+    ('LastCheckedByUserID', int, 1),
+)
+REQUIRED_CSV_FIELDS = [name for name, _, default in CSV_COLUMNS if default is None]
+
+
+# Приводит колонки пачки к типам INSERT_VM целиком, без цикла по строкам.
+# Возвращает DataFrame с колонками CSV_COLUMNS без строк с ошибками и ошибки (строка, текст) —
+# по первому неверному полю строки
+def csv_frame(df):
+    bad = pd.Series(False, index=df.index)
+    errors = []
+    columns = {}
+    for name, kind, default in CSV_COLUMNS:
+        if callable(default):
+            default = default()
+        if name not in df.columns:
+            columns[name] = pd.Series(default, index=df.index, dtype=object if kind is str else kind)
+            continue
+        column = df[name]
+        missing = column.isna()
+        if kind is str:
+            invalid = missing if default is None else pd.Series(False, index=df.index)
+            column = column.fillna('' if default is None else default).astype(str)
+        else:
+            column = pd.to_numeric(column, errors='coerce')
+            if default is not None:
+                column = column.where(~missing, default)
+            invalid = ~np.isfinite(column)
+            column = column.where(~invalid, 0)
+            if kind is int:
+                # 10.7 не обрезается до 10, а отклоняется, как int() при построчной проверке
+                invalid |= column % 1 != 0
+            column = column.where(~invalid, 0).astype('int64' if kind is int else 'float64')
+        new = invalid & ~bad
+        expected = "ожидается целое число" if kind is int else "ожидается число"
+        for line, empty in zip((df.index[new] + 2).tolist(), missing[new].tolist()):
+            errors.append((line, f"Не заполнено поле {name}" if empty else f"Поле {name}: {expected}"))
+        bad |= invalid
+        columns[name] = column
+    return pd.DataFrame(columns)[~bad], errors
+
+
+# Один запрос на пачку ключей вместо SELECT COUNT(*) на каждую строку
+def find_existing_keys(cursor, serials, inventories):
+    existing_serials = set()
+    existing_inventories = set()
+    serials = list(serials)
+    inventories = list(inventories)
+    for start in range(0, max(len(serials), len(inventories)), KEYS_CHUNK):
+        serial_chunk = serials[start:start + KEYS_CHUNK] or ['']
+        inventory_chunk = inventories[start:start + KEYS_CHUNK] or ['']
+        cursor.execute(
+            f"""SELECT SerialNumber, InventoryNumber FROM VendingMachines
+                WHERE SerialNumber IN ({', '.join('?' * len(serial_chunk))})
+                   OR InventoryNumber IN ({', '.join('?' * len(inventory_chunk))})""",
+            serial_chunk + inventory_chunk)
+        for serial, inventory in cursor.fetchall():
+            existing_serials.add(serial)
+            existing_inventories.add(inventory)
+    return existing_serials, existing_inventories
+
+
+def machine_change(machine_id, params):
+    machine = {"MachineID": int(machine_id)}
+    machine.update(zip(VM_CHANGE_KEYS, params))
+    return machine
+
+
+# executemany не возвращает ключи, поэтому MachineID пачки читаются обратно одним запросом
+# по SerialNumber (уникален; пачка не больше INSERT_BATCH параметров)
+def inserted_ids(cursor, batch):
+    serials = [params[SERIAL_INDEX] for _, params in batch]
+    cursor.execute(f"SELECT SerialNumber, MachineID FROM VendingMachines "
+                   f"WHERE SerialNumber IN ({', '.join('?' * len(serials))})", serials)
+    return dict(cursor.fetchall())
+
+
+# Вставка пачками; если пачка упала, повторяем её построчно, чтобы указать номера строк с ошибкой
+def insert_rows(conn, cursor, rows, errors):
+    if hasattr(cursor, 'fast_executemany'):
+        cursor.fast_executemany = True
+    success = 0
+    for start in range(0, len(rows), INSERT_BATCH):
+        batch = rows[start:start + INSERT_BATCH]
+        try:
+            cursor.executemany(INSERT_VM, [params for _, params in batch])
+            ids = inserted_ids(cursor, batch)
+            changefeed.record(cursor, "VendingMachines",
+                              [machine_change(ids[params[SERIAL_INDEX]], params) for _, params in batch])
+            bump(conn, "VendingMachines")
+            conn.commit()
+            success += len(batch)
+            continue
+        except Exception:
+            conn.rollback()
+        for line, params in batch:
+            try:
+                cursor.execute(INSERT_VM, params)
+                cursor.execute(last_identity())
+                changefeed.record(cursor, "VendingMachines", [machine_change(cursor.fetchone()[0], params)])
+                bump(conn, "VendingMachines")
+                conn.commit()
+                success += 1
+            except Exception as e:
+                conn.rollback()
+                errors.append((line, str(e)))
+    return success
+
+
+def import_dataframe(conn, df):
+    cursor = conn.cursor()
+    frame, errors = csv_frame(df)
+
+    # Повтор номера внутри файла: строка отклоняется, если номер уже встречался выше
+    repeated = frame['SerialNumber'].duplicated() | frame['InventoryNumber'].duplicated()
+    errors.extend((line, "Дублирование в файле") for line in (frame.index[repeated] + 2).tolist())
+    frame = frame[~repeated]
+
+    existing_serials, existing_inventories = find_existing_keys(
+        cursor, frame['SerialNumber'].tolist(), frame['InventoryNumber'].tolist())
+    existing = frame['SerialNumber'].isin(existing_serials) | frame['InventoryNumber'].isin(existing_inventories)
+    errors.extend((line, "Дублирование") for line in (frame.index[existing] + 2).tolist())
+    frame = frame[~existing]
+
+    valid = list(zip((frame.index + 2).tolist(), frame.itertuples(index=False, name=None)))
+    success = insert_rows(conn, cursor, valid, errors)
+    cursor.close()
+    errors.sort()
+    return success, [f"Строка {line}: {message}" for line, message in errors]
+
+
+# Фоновая часть импорта: читает файл пачками, память не зависит от его размера
+def run_csv_import(job, spool):
+    try:
+        chunks = pd.read_csv(spool, chunksize=IMPORT_CHUNK_ROWS, encoding='utf-8')
+        for chunk in chunks:
+            with connection() as conn:
+                success, errors = import_dataframe(conn, chunk)
+            if success:
+                changefeed.notify()
+            job.progress(spool.tell(), success, errors)
+        job.progress(job.total)
+    finally:
+        spool.close()
+
 
 def process_csv(file):
     if not file.filename.endswith('.csv'):
         return jsonify({"error": "Только CSV файлы"}), 400
-    
-    df = pd.read_csv(io.StringIO(file.read().decode('utf-8')))
-    
-    required = ['Location', 'Model', 'PaymentTypeID', 'SerialNumber', 
-                'InventoryNumber', 'Manufacturer', 'ManufactureDate',
-                'DateOfCommissioning', 'LastVerificationDate', 
-                'ResourceHours', 'MachineStatusID', 'CountryID']
-    
-    if any(field not in df.columns for field in required):
+
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    try:
+        shutil.copyfileobj(file.stream, spool, COPY_BUFFER)
+        total = spool.tell()
+        spool.seek(0)
+        # Заголовок проверяем сразу, чтобы не ставить в очередь заведомо негодный файл
+        columns = pd.read_csv(spool, nrows=0, encoding='utf-8').columns
+        spool.seek(0)
+    except Exception as e:
+        spool.close()
+        return jsonify({"error": f"Не удалось прочитать CSV: {str(e)}"}), 400
+
+    if any(field not in columns for field in REQUIRED_CSV_FIELDS):
+        spool.close()
         return jsonify({"error": "Отсутствуют обязательные поля"}), 400
-    
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    errors = []
-    success = 0
-    
-    for idx, row in df.iterrows():
-        try:
-            # Проверка уникальности
-            cursor.execute("SELECT COUNT(*) FROM VendingMachines WHERE SerialNumber = ? OR InventoryNumber = ?",
-                          (str(row['SerialNumber']), str(row['InventoryNumber'])))
-            
-            if cursor.fetchone()[0] > 0:
-                errors.append(f"Строка {idx+2}: Дублирование")
-                continue
-            
-            # Вставка
-            cursor.execute("""
-                INSERT INTO VendingMachines (Location, Model, PaymentTypeID, FullIncome, SerialNumber, 
-                            InventoryNumber, Manufacturer, ManufactureDate, DateOfCommissioning, 
-                            LastVerificationDate, VerificationInterval, ResourceHours, 
-                            DateOfNextFixing, MaintenanceTimeHours, MachineStatusID, 
-                            CountryID, InventoryDate, LastCheckedByUserID) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                str(row['Location']), str(row['Model']), int(row['PaymentTypeID']),
-                float(row.get('FullIncome', 0.0)), str(row['SerialNumber']),
-                str(row['InventoryNumber']), str(row['Manufacturer']),
-                str(row['ManufactureDate']), str(row['DateOfCommissioning']),
-                str(row['LastVerificationDate']), int(row.get('VerificationInterval', 6)),
-                int(row['ResourceHours']), str(row.get('DateOfNextFixing', '')),
-                int(row.get('MaintenanceTimeHours', 4)), int(row['MachineStatusID']),
-                int(row['CountryID']), str(row.get('InventoryDate', datetime.now().date())),
-                int(row.get('LastCheckedByUserID', 1))
-            ))
-            
-            success += 1
-        except Exception as e:
-            errors.append(f"Строка {idx+2}: {str(e)}")
-    
-    conn.commit()
-    
-    if errors:
-        return jsonify({
-            "success": False,
-            "message": f"Загружено {success} записей, ошибок: {len(errors)}",
-            "processed": success,
-            "errors": errors[:5]
-        }), 207
-    
+
+    job = jobs.submit("vm_import", run_csv_import, spool, total=total)
+    status_url = f"/api/v1/VendingMachines/import/{job.id}"
     return jsonify({
-        "success": True,
-        "message": f"Загружено {success} записей",
-        "processed": success
-    }), 201
\ No newline at end of file
+        "message": "Импорт поставлен в очередь",
+        "job_id": job.id,
+        "status_url": status_url
+    }), 202, {"Location": status_url}
@@ -0,0 +1,65 @@
+import hashlib
+import os
+import re
+
+from compression import compress, encodings
+
+# Фронтенд лежит в корне репозитория, рядом с папкой API5
+STATIC_ROOT = os.environ.get('STATIC_ROOT', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+INDEX = 'index.html'
+# Файлы, которые index.html подключает и которые получают имена с хэшем содержимого
+HASHED = ('script.js', 'styles.css')
+MIMETYPES = {
+    '.html': 'text/html',
+    '.js': 'text/javascript',
+    '.css': 'text/css',
+}
+
+# Имя файла → Asset; заполняется build() при старте приложения
+_assets = {}
+
+
+class Asset:
+    def __init__(self, body, mimetype):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(body).hexdigest()[:16]
+        # Статика сжимается один раз и с максимальным уровнем
+        self.compressed = {}
+        for encoding in encodings():
+            self.compressed[encoding] = compress(body, encoding, 11 if encoding == 'br' else 9)
+
+
+def hashed_name(name, body):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(body).hexdigest()[:10]}{ext}"
+
+
+def build(root=STATIC_ROOT):
+    assets = {}
+    renamed = {}
+    for name in HASHED:
+        path = os.path.join(root, name)
+        if not os.path.exists(path):
+            continue
+        with open(path, 'rb') as f:
+            body = f.read()
+        renamed[name] = hashed_name(name, body)
+        assets[renamed[name]] = Asset(body, MIMETYPES[os.path.splitext(name)[1]])
+
+    index_path = os.path.join(root, INDEX)
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        # Ссылки на script.js/styles.css заменяем на версии с хэшем
+        for name, hashed in renamed.items():
+            html = re.sub(rf'''(src|href)=(["']){re.escape(name)}\2''', rf'\1=\2/assets/{hashed}\2', html)
+        assets[INDEX] = Asset(html.encode('utf-8'), MIMETYPES['.html'])
+
+    _assets.clear()
+    _assets.update(assets)
+    return sorted(_assets)
+
+
+def get(name):
+    return _assets.get(name)
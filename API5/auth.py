@@ -0,0 +1,189 @@
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import wraps
+
+from flask import g, jsonify, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+from db import connection
+
+# Токен входа — подписанные HMAC данные {uid, role, jti} с временем выдачи.
+# Проверка идёт целиком в памяти: подпись, срок и список отозванных, без запросов к БД.
+# Ключ обязателен и должен быть одинаковым во всех процессах: иначе токен, выданный
+# одним воркером, не пройдёт проверку в другом и не переживёт перезапуск
+SECRET_KEY = os.environ.get('AUTH_SECRET_KEY')
+TOKEN_TTL = int(os.environ.get('AUTH_TOKEN_TTL', 8 * 3600))
+# Отозванные токены хранятся в RevokedTokens; фоновый поток процесса перечитывает список
+# раз в REVOKED_CHECK_INTERVAL секунд — на столько выход через другой воркер может запоздать
+REVOKED_CHECK_INTERVAL = float(os.environ.get('AUTH_REVOKED_CHECK', 1))
+# Не больше LOGIN_RATE_LIMIT неудачных входов за LOGIN_RATE_WINDOW секунд с одного адреса
+# на одну учётную запись; 0 отключает ограничение. Счётчик свой в каждом воркере,
+# поэтому при gunicorn -w N попыток до блокировки может быть до N * LOGIN_RATE_LIMIT
+LOGIN_RATE_LIMIT = int(os.environ.get('LOGIN_RATE_LIMIT', 10))
+LOGIN_RATE_WINDOW = float(os.environ.get('LOGIN_RATE_WINDOW', 60))
+# Сколько ключей ограничителя держать, прежде чем вычистить устаревшие
+MAX_RATE_KEYS = 10000
+
+ADMIN = "Администратор"
+OPERATOR = "Оператор"
+
+# Создаётся в init_app, когда ключ проверен
+_serializer = None
+
+
+class AuthError(Exception):
+    pass
+
+
+def issue(user_id, role):
+    return _serializer.dumps({"uid": user_id, "role": role, "jti": secrets.token_urlsafe(8)})
+
+
+INSERT_REVOKED = """INSERT INTO RevokedTokens (Jti, ExpiresAt)
+                    SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM RevokedTokens WHERE Jti = ?)"""
+
+# Снимок RevokedTokens: jti отозванных и ещё не истёкших токенов
+_revoked = frozenset()
+# Отозванные этим процессом, пока фоновый поток читал RevokedTokens: чтение могло их не застать
+_revoked_since_load = set()
+_revoked_lock = threading.Lock()
+_refresher = None
+
+
+# Запись удаляется, когда токен истёк бы сам
+def revoke(claims):
+    global _revoked
+    expires = datetime.fromtimestamp(claims["exp"])
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM RevokedTokens WHERE ExpiresAt < ?", (datetime.now(),))
+        cursor.execute(INSERT_REVOKED, (claims["jti"], expires, claims["jti"]))
+        cursor.close()
+    with _revoked_lock:
+        _revoked = _revoked | {claims["jti"]}
+        _revoked_since_load.add(claims["jti"])
+
+
+def _load_revoked():
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT Jti FROM RevokedTokens WHERE ExpiresAt >= ?", (datetime.now(),))
+        revoked = frozenset(row[0] for row in cursor.fetchall())
+        cursor.close()
+    return revoked
+
+
+def _refresh_revoked():
+    global _revoked
+    with _revoked_lock:
+        _revoked_since_load.clear()
+    loaded = _load_revoked()
+    with _revoked_lock:
+        _revoked = loaded | _revoked_since_load
+
+
+# Если БД недоступна, проверка идёт по последнему прочитанному списку
+def _refresh_in_background():
+    while True:
+        try:
+            _refresh_revoked()
+        except Exception as e:
+            print(f"✗ Не удалось прочитать отозванные токены: {e}")
+        time.sleep(REVOKED_CHECK_INTERVAL)
+
+
+def init_app(app):
+    global _serializer, _refresher
+    if not SECRET_KEY:
+        raise RuntimeError("Не задан AUTH_SECRET_KEY: сервер не может подписывать токены входа. "
+                           "Задайте одинаковый ключ для всех процессов сервера")
+    _serializer = URLSafeTimedSerializer(SECRET_KEY, salt="login")
+    with _revoked_lock:
+        if _refresher is not None:
+            return
+        _refresher = threading.Thread(target=_refresh_in_background, name="revoked-tokens", daemon=True)
+    _refresher.start()
+
+
+def verify(token):
+    try:
+        claims, issued = _serializer.loads(token, max_age=TOKEN_TTL, return_timestamp=True)
+    except SignatureExpired:
+        raise AuthError("Срок действия токена истёк")
+    except BadSignature:
+        raise AuthError("Неверный токен")
+    if claims["jti"] in _revoked:
+        raise AuthError("Токен отозван")
+    claims["exp"] = issued.timestamp() + TOKEN_TTL
+    return claims
+
+
+def _unauthorized(message):
+    return jsonify({"error": message}), 401, {"WWW-Authenticate": "Bearer"}
+
+
+# Проверяет заголовок Authorization: Bearer <токен> и кладёт данные токена в g.user.
+# roles — допустимые роли; без них пускает любого вошедшего пользователя
+def require_auth(*roles):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+            if scheme.lower() != 'bearer' or not token:
+                return _unauthorized("Требуется вход в систему")
+            try:
+                g.user = verify(token.strip())
+            except AuthError as e:
+                return _unauthorized(str(e))
+            if roles and g.user["role"] not in roles:
+                return jsonify({"error": "Недостаточно прав"}), 403
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Скользящее окно по ключу: хранятся только времена попыток за последние window секунд
+class RateLimiter:
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self._hits = {}
+        self._lock = threading.Lock()
+
+    def _recent(self, key, now):
+        hits = self._hits.get(key)
+        while hits and now - hits[0] >= self.window:
+            hits.popleft()
+        return hits
+
+    # Через сколько секунд можно повторить; 0 — можно сейчас
+    def retry_after(self, key):
+        if not self.limit:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            hits = self._recent(key, now)
+            if hits and len(hits) >= self.limit:
+                return int(self.window - (now - hits[0])) + 1
+        return 0
+
+    def hit(self, key):
+        if not self.limit:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._hits) >= MAX_RATE_KEYS:
+                for stale in [k for k, hits in self._hits.items() if not hits or now - hits[-1] >= self.window]:
+                    del self._hits[stale]
+            self._hits.setdefault(key, deque(maxlen=self.limit)).append(now)
+
+    def reset(self, key):
+        with self._lock:
+            self._hits.pop(key, None)
+
+
+login_limiter = RateLimiter(LOGIN_RATE_LIMIT, LOGIN_RATE_WINDOW)
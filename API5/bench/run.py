@@ -0,0 +1,269 @@
+import argparse
+import csv
+import io
+import itertools
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_unique = itertools.count(int(time.time()))
+CSV_ROWS = 20
+# Эндпоинты, которые не замеряются: поток без конца, отзыв токена бенчмарка, статусы задач по job_id
+SKIPPED = {
+    "/api/v1/changes/stream",
+    "/api/v1/logout",
+    "/api/v1/VendingMachines/import/<job_id>",
+    "/api/v1/exports/<job_id>",
+    "/api/v1/exports/<job_id>/file",
+}
+
+
+# Файл для multipart-загрузки в поле file
+class Upload:
+    def __init__(self, filename, content):
+        self.filename = filename
+        self.content = content
+
+
+def endpoints(counts, rnd):
+    machines, products, users = counts["machines"], counts["products"], counts["users"]
+    today = date.today()
+
+    def sale():
+        return {"ProductID": rnd.randint(1, products), "MachineID": rnd.randint(1, machines),
+                "Quantity": 1, "SaleSum": 100, "PaymentTypeID": rnd.randint(1, 3)}
+
+    def machine():
+        n = next(_unique)
+        return {"Location": "Бенчмарк", "Model": "Bench", "PaymentTypeID": 1, "SerialNumber": f"BSN{n}",
+                "InventoryNumber": f"BINV{n}", "Manufacturer": "Bench", "ManufactureDate": "2024-01-01",
+                "DateOfCommissioning": "2024-01-02", "LastVerificationDate": "2024-02-01",
+                "ResourceHours": 100, "DateOfNextFixing": str(today + timedelta(days=30)),
+                "MachineStatusID": 1, "CountryID": 1, "InventoryDate": "2024-01-02",
+                "LastCheckedByUserID": 1}
+
+    # POST с файлом отвечает 202 сразу, строки вставляет фоновая задача
+    def machines_csv():
+        rows = [dict(machine(), VerificationInterval=6, MaintenanceTimeHours=4) for _ in range(CSV_ROWS)]
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+        return Upload("bench.csv", buffer.getvalue().encode('utf-8'))
+
+    return [
+        ("GET Users", "GET", lambda: "/api/v1/Users", None),
+        ("GET Products", "GET", lambda: "/api/v1/Products", None),
+        ("GET VendingMachines", "GET", lambda: "/api/v1/VendingMachines", None),
+        ("GET Maintenance", "GET", lambda: "/api/v1/Maintenance", None),
+        ("GET Sales", "GET", lambda: "/api/v1/Sales", None),
+        ("GET Sales?machine_id", "GET", lambda: f"/api/v1/Sales?machine_id={rnd.randint(1, machines)}", None),
+        ("GET Sales/summary", "GET", lambda: "/api/v1/Sales/summary?granularity=day&group_by=payment", None),
+        ("GET Calendar", "GET", lambda: "/api/v1/Calendar", None),
+        ("GET Restock", "GET", lambda: "/api/v1/Restock", None),
+        ("GET VM/search", "GET", lambda: f"/api/v1/VendingMachines/search?q=SN{rnd.randint(1, machines) // 10:06d}", None),
+        ("GET VM/Products", "GET", lambda: f"/api/v1/VendingMachines/{rnd.randint(1, machines)}/Products", None),
+        ("GET Forecast", "GET", lambda: "/api/v1/Forecast?by_days=3", None),
+        ("GET Forecast/products", "GET", lambda: "/api/v1/Forecast/products", None),
+        ("GET Schedule", "GET", lambda: "/api/v1/Schedule", None),
+        ("GET changes", "GET", lambda: "/api/v1/changes?since=0&limit=100", None),
+        ("GET Sales/export", "GET", lambda: f"/api/v1/Sales/export?machine_id={rnd.randint(1, machines)}", None),
+        ("GET Pool", "GET", lambda: "/api/v1/Pool", None),
+        ("GET metrics", "GET", lambda: "/metrics", None),
+        ("POST Sales", "POST", lambda: "/api/v1/Sales", sale),
+        ("POST Sales/batch", "POST", lambda: "/api/v1/Sales/batch", lambda: [sale() for _ in range(50)]),
+        ("POST Maintenance", "POST", lambda: "/api/v1/Maintenance", lambda: {
+            "MachineID": rnd.randint(1, machines), "MaintenanceDate": str(today),
+            "Description": "Бенчмарк", "DoneByUserID": rnd.randint(1, users)}),
+        ("POST Products", "POST", lambda: "/api/v1/Products", lambda: {
+            "Name": "Бенчмарк", "Price": 10, "InStock": 1, "MinStock": 1}),
+        ("POST Users", "POST", lambda: "/api/v1/Users", lambda: {
+            "FullName": "Бенчмарк", "Contacts": f"bench{next(_unique)}@example.com", "Role": "Оператор"}),
+        ("POST VendingMachines", "POST", lambda: "/api/v1/VendingMachines", machine),
+        ("POST VM csv", "POST", lambda: "/api/v1/VendingMachines", machines_csv),
+        ("POST VM/Products", "POST", lambda: f"/api/v1/VendingMachines/{rnd.randint(1, machines)}/Products",
+         lambda: [{"ProductID": rnd.randint(1, products), "Quantity": rnd.randint(0, 20)}]),
+        ("POST Sales/export", "POST", lambda: "/api/v1/Sales/export",
+         lambda: {"machine_id": [rnd.randint(1, machines)]}),
+        ("POST login", "POST", lambda: "/api/v1/login", lambda: {
+            "contacts": f"user{rnd.randint(1, users)}@example.com", "password": "password"}),
+    ]
+
+
+# Клиенты возвращают (статус, тело); headers общие для всех запросов — туда попадает токен входа
+def in_process_client(headers):
+    from main import create_app
+
+    app = create_app()
+
+    def call(method, path, body):
+        client = app.test_client()
+        if isinstance(body, Upload):
+            response = client.open(path, method=method, headers=headers,
+                                   data={"file": (io.BytesIO(body.content), body.filename)})
+        else:
+            response = client.open(path, method=method, json=body, headers=headers)
+        data = response.get_data()
+        # Как WSGI-сервер: закрытие возвращает соединение потокового ответа
+        response.close()
+        return response.status_code, data
+    call.app = app
+    return call
+
+
+def http_client(base_url, headers):
+    def call(method, path, body):
+        if isinstance(body, Upload):
+            boundary = f"bench{next(_unique)}"
+            data = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{body.filename}"\r\n'
+                    f'Content-Type: text/csv\r\n\r\n').encode('utf-8') + body.content + f'\r\n--{boundary}--\r\n'.encode('utf-8')
+            content_type = f"multipart/form-data; boundary={boundary}"
+        else:
+            data = json.dumps(body).encode('utf-8') if body is not None else None
+            content_type = "application/json"
+        req = urllib.request.Request(base_url + path, data=data, method=method,
+                                     headers={"Content-Type": content_type, **headers})
+        try:
+            with urllib.request.urlopen(req) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+    return call
+
+
+# POST-эндпоинты справочников требуют токен; в bench/seed.py user2 — администратор
+def login(call, headers):
+    status, data = call("POST", "/api/v1/login", {"contacts": "user2@example.com", "password": "password"})
+    if status == 200:
+        headers["Authorization"] = f"Bearer {json.loads(data)['token']}"
+    else:
+        print(f"Не удалось войти ({status}), POST-эндпоинты ответят 401")
+
+
+def percentile(values, p):
+    index = min(len(values) - 1, max(0, int(round(p / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def measure(call, method, make_path, make_body, requests, concurrency):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    remaining = itertools.count()
+
+    def worker():
+        while next(remaining) < requests:
+            path = make_path()
+            body = make_body() if make_body else None
+            started = time.perf_counter()
+            status, _ = call(method, path, body)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if status >= 400:
+                    errors[0] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "rps": len(latencies) / wall if wall else 0.0,
+    }
+
+
+# Считаются только строки из bench/seed.py: у записей, созданных прошлыми прогонами,
+# нет пароля user<N> и остатков в аппаратах, и запросы к ним отвечали бы 401 и 404
+def table_counts(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {
+            "machines": conn.execute("SELECT COUNT(*) FROM VendingMachines WHERE Model <> 'Bench'").fetchone()[0],
+            "products": conn.execute("SELECT COUNT(*) FROM Products WHERE Name <> 'Бенчмарк'").fetchone()[0],
+            "users": conn.execute("SELECT COUNT(*) FROM Users WHERE Contacts LIKE 'user%@example.com'").fetchone()[0],
+        }
+    finally:
+        conn.close()
+
+
+# Маршруты API из app.url_map, которых нет в endpoints(): новый обработчик не выпадет из замеров незаметно
+def uncovered(app, counts):
+    adapter = app.url_map.bind("localhost")
+    covered = set()
+    for _, method, make_path, _ in endpoints(counts, random.Random(0)):
+        covered.add((adapter.match(make_path().partition('?')[0], method=method)[0], method))
+    missing = []
+    for rule in app.url_map.iter_rules():
+        if not rule.rule.startswith(("/api/", "/metrics")) or rule.rule in SKIPPED:
+            continue
+        for method in sorted(rule.methods - {"HEAD", "OPTIONS"}):
+            if (rule.endpoint, method) not in covered:
+                missing.append(f"{method} {rule.rule}")
+    return missing
+
+
+# Замер задержек и пропускной способности всех эндпоинтов на базе из bench/seed.py:
+#   python bench/run.py --db bench.db --requests 200 --concurrency 4
+#   python bench/run.py --db bench.db --url http://localhost:8086   (запущенный сервер)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Бенчмарк эндпоинтов API")
+    parser.add_argument('--db', default='vending.db', help="SQLite-база, заполненная bench/seed.py")
+    parser.add_argument('--url', help="адрес запущенного сервера; без него приложение поднимается в процессе")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--only', help="подстрока имени эндпоинта, например 'GET Sales'")
+    parser.add_argument('--no-cache', action='store_true', help="отключить кэш GET-ответов")
+    parser.add_argument('--json', help="записать результаты в JSON-файл")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    headers = {}
+    if args.url:
+        call = http_client(args.url.rstrip('/'), headers)
+    else:
+        os.environ['DB_BACKEND'] = 'sqlite'
+        os.environ['DB_SQLITE_PATH'] = args.db
+        os.environ.setdefault('AUTH_SECRET_KEY', 'bench')
+        if args.no_cache:
+            os.environ['RESPONSE_CACHE_TTL'] = '0'
+        call = in_process_client(headers)
+    login(call, headers)
+
+    counts = table_counts(args.db)
+    if not args.url:
+        for route in uncovered(call.app, counts):
+            print(f"Не замеряется: {route}")
+
+    rnd = random.Random(args.seed)
+    results = {}
+    print(f"{'endpoint':<26}{'n':>6}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>10}")
+    for name, method, make_path, make_body in endpoints(counts, rnd):
+        if args.only and args.only not in name:
+            continue
+        stats = measure(call, method, make_path, make_body, args.requests, args.concurrency)
+        results[name] = stats
+        print(f"{name:<26}{stats['requests']:>6}{stats['errors']:>5}{stats['p50_ms']:>10.2f}"
+              f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['rps']:>10.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,125 @@
+import argparse
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Генератор работает только с локальной SQLite-базой
+os.environ['DB_BACKEND'] = 'sqlite'
+
+import db
+import rollups
+
+COUNTRIES = ["Россия", "Беларусь", "Казахстан", "Армения"]
+STATUSES = ["Работает", "Вышел из строя", "В ремонте/на обслуживании"]
+PAYMENT_TYPES = ["Наличные", "Карта", "QR-код"]
+ROLES = ["Администратор", "Оператор"]
+MODELS = ["CoffeeMaster Pro", "VendCore X-200", "SnackBox 3", "FreshJuice 10"]
+CITIES = ["Москва", "Санкт-Петербург", "Казань", "Новосибирск", "Екатеринбург"]
+BATCH = 5000
+
+
+def batched(cursor, query, rows):
+    for start in range(0, len(rows), BATCH):
+        cursor.executemany(query, rows[start:start + BATCH])
+
+
+def seed(path, machines, products, users, sales, days, products_per_machine, rnd):
+    for stale in (path, path + '-wal', path + '-shm'):
+        if os.path.exists(stale):
+            os.remove(stale)
+    db.init_sqlite(path)
+    conn = db._connect_sqlite(path)
+    cursor = conn.cursor()
+    today = date.today()
+
+    cursor.executemany("INSERT INTO Country (Name) VALUES (?)", [(name,) for name in COUNTRIES])
+    cursor.executemany("INSERT INTO MachineStatus (Name) VALUES (?)", [(name,) for name in STATUSES])
+    cursor.executemany("INSERT INTO PaymentType (Name) VALUES (?)", [(name,) for name in PAYMENT_TYPES])
+
+    batched(cursor, "INSERT INTO Users (FullName, Contacts, Role, Password) VALUES (?, ?, ?, ?)", [
+        (f"Сотрудник {i}", f"user{i}@example.com", ROLES[i % len(ROLES)], "password")
+        for i in range(1, users + 1)
+    ])
+
+    batched(cursor, """INSERT INTO Products (Name, Description, Price, InStock, MinStock, PropensityToSell)
+                       VALUES (?, ?, ?, ?, ?, ?)""", [
+        (f"Товар {i}", "", rnd.randint(30, 300), rnd.randint(0, 500), rnd.randint(5, 50),
+         round(rnd.random(), 2))
+        for i in range(1, products + 1)
+    ])
+
+    machine_rows = []
+    for i in range(1, machines + 1):
+        manufactured = today - timedelta(days=rnd.randint(400, 2000))
+        commissioned = manufactured + timedelta(days=rnd.randint(1, 60))
+        verified = commissioned + timedelta(days=rnd.randint(0, 300))
+        machine_rows.append((
+            f"г. {rnd.choice(CITIES)}, ул. Тестовая, д. {i}", rnd.choice(MODELS), rnd.randint(1, 3),
+            rnd.randint(0, 2000000), f"SN{i:07d}", f"INV{i:07d}", "ООО Вендинг",
+            manufactured, commissioned, verified, rnd.choice((6, 12)), rnd.randint(1000, 5000),
+            today + timedelta(days=rnd.randint(-60, 300)), rnd.randint(1, 8), rnd.randint(1, 3),
+            rnd.randint(1, len(COUNTRIES)), commissioned, rnd.randint(1, users)
+        ))
+    batched(cursor, """INSERT INTO VendingMachines (Location, Model, PaymentTypeID, FullIncome, SerialNumber,
+                       InventoryNumber, Manufacturer, ManufactureDate, DateOfCommissioning,
+                       LastVerificationDate, VerificationInterval, ResourceHours,
+                       DateOfNextFixing, MaintenanceTimeHours, MachineStatusID,
+                       CountryID, InventoryDate, LastCheckedByUserID)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", machine_rows)
+
+    stock_rows = []
+    for machine in range(1, machines + 1):
+        for product in rnd.sample(range(1, products + 1), min(products_per_machine, products)):
+            stock_rows.append((machine, product, rnd.randint(0, 40)))
+    batched(cursor, "INSERT INTO MachineProducts (MachineID, ProductID, Quantity) VALUES (?, ?, ?)", stock_rows)
+
+    batched(cursor, """INSERT INTO Maintenance (MachineID, MaintenanceDate, Description, Problems, DoneByUserID)
+                       VALUES (?, ?, ?, ?, ?)""", [
+        (rnd.randint(1, machines), today - timedelta(days=rnd.randint(0, days)),
+         "Плановое ТО", rnd.choice(("", "Замена фильтра", "Чистка датчиков")), rnd.randint(1, users))
+        for _ in range(machines * 4)
+    ])
+
+    batched(cursor, "INSERT INTO Events (MachineID, EventType, Message, EventDateTime) VALUES (?, ?, ?, ?)", [
+        (rnd.randint(1, machines), rnd.choice(("Ошибка", "Инфо")), "Событие аппарата",
+         datetime.now() - timedelta(minutes=rnd.randint(0, days * 1440)))
+        for _ in range(machines * 2)
+    ])
+
+    started = datetime.now() - timedelta(days=days)
+    step = days * 86400 / max(sales, 1)
+    for start in range(0, sales, BATCH):
+        rows = []
+        for i in range(start, min(start + BATCH, sales)):
+            quantity = rnd.randint(1, 3)
+            rows.append((rnd.randint(1, machines), rnd.randint(1, products), quantity,
+                         quantity * rnd.randint(30, 300), started + timedelta(seconds=i * step),
+                         rnd.randint(1, 3)))
+        cursor.executemany("""INSERT INTO Sales (MachineID, ProductID, Quantity, SaleSum, SaleDateTime, PaymentTypeID)
+                              VALUES (?, ?, ?, ?, ?, ?)""", rows)
+    conn.commit()
+
+    rollups.rebuild(conn)
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+# Генератор синтетических данных для локального SQLite:
+#   python bench/seed.py --db bench.db --machines 1000 --sales 500000
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Заполнение локальной SQLite-базы синтетическими данными")
+    parser.add_argument('--db', default=db.DB_SQLITE_PATH)
+    parser.add_argument('--machines', type=int, default=1000)
+    parser.add_argument('--products', type=int, default=50)
+    parser.add_argument('--users', type=int, default=30)
+    parser.add_argument('--sales', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--products-per-machine', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    seed(args.db, args.machines, args.products, args.users, args.sales, args.days,
+         args.products_per_machine, random.Random(args.seed))
+    print(f"✓ База {args.db}: {args.machines} аппаратов, {args.products} товаров, {args.sales} продаж")
@@ -0,0 +1,206 @@
+import json
+import os
+import sys
+import threading
+from collections import deque
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from db import DB_BACKEND, connection, top, limit
+from refdata import resolver
+
+# Лента изменений: POST-обработчики в той же транзакции пишут вставленные строки в ChangeLog
+# (outbox), клиенты читают их по GET /api/v1/changes?since= или через SSE.
+
+# Сколько последних изменений держать в памяти для SSE-подписчиков
+BUFFER_SIZE = int(os.environ.get('CHANGES_BUFFER_SIZE', 1000))
+# Как часто перечитывать ChangeLog без сигнала от своих POST (изменения других процессов)
+POLL_INTERVAL = float(os.environ.get('CHANGES_POLL_INTERVAL', 2.0))
+# Сколько ждать, пока заполнится пропуск в ChangeID: на SQL Server транзакция с меньшим
+# номером может закоммититься позже транзакции с большим
+GAP_WAIT = 2.0
+# Возраст строки в миллисекундах по часам БД: ChangedAt проставляет сама БД
+# (SQLite — в UTC, SQL Server — в местном времени), поэтому и сравнивать надо с её временем
+AGE_MS = {
+    'mssql': "datediff_big(millisecond, ChangedAt, sysdatetime())",
+    'sqlite': "cast((julianday('now') - julianday(ChangedAt)) * 86400000 as integer)",
+}
+MAX_READ = 5000
+
+INSERT_CHANGE = "INSERT INTO ChangeLog (TableName, Operation, Payload) VALUES (?, ?, ?)"
+
+# Данные изменения хранятся с ключами как в GET-ответах, но с ID вместо названий;
+# названия подставляются при отдаче, так же как в GET
+RESOLVE = {
+    "Sales": resolver({"ProductName": "Products", "PaymentTypeName": "PaymentType"}),
+    "Maintenance": resolver({"DoneByUser": "Users"}),
+    "VendingMachines": resolver({
+        "PaymentType": "PaymentType",
+        "StatusName": "MachineStatus",
+        "CountryName": "Country",
+        "LastCheckedByUser": "Users",
+    }),
+}
+
+
+def _default(o):
+    if isinstance(o, (date, datetime)):
+        return o.isoformat()
+    if isinstance(o, Decimal):
+        return str(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+# Пишет изменения в открытой транзакции; коммит — на вызывающем. items — список словарей
+def record(cursor, table, items, operation='I'):
+    params = [(table, operation, json.dumps(item, ensure_ascii=False, default=_default)) for item in items]
+    if len(params) == 1:
+        cursor.execute(INSERT_CHANGE, params[0])
+    elif params:
+        cursor.executemany(INSERT_CHANGE, params)
+
+
+def _change(row):
+    change_id, table, operation, payload, changed_at = row
+    data = json.loads(payload)
+    resolve = RESOLVE.get(table)
+    if resolve is not None:
+        data = resolve(data)
+    return {
+        "id": change_id,
+        "table": table,
+        "op": operation,
+        "at": changed_at.isoformat() if hasattr(changed_at, 'isoformat') else changed_at,
+        "data": data,
+    }
+
+
+# Отдаёт только строки без пропусков после since. Пропуск считается брошенным (откат транзакции),
+# если строка за ним записана больше GAP_WAIT назад: решение зависит только от данных в БД,
+# а не от того, когда и какой процесс увидел пропуск. Проверка идёт и от since=0: новый клиент
+# и поток SSE на пустой ленте тоже не должны перескочить незакоммиченные номера
+def _settled(rows, since):
+    expected = since + 1
+    settled = []
+    for row in rows:
+        if row[0] != expected and row[5] < GAP_WAIT * 1000:
+            break
+        settled.append(row[:5])
+        expected = row[0] + 1
+    return settled
+
+
+def read(since, count=MAX_READ, tables=None):
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""select {top(count)} ChangeID, TableName, Operation, Payload, ChangedAt,
+                                  {AGE_MS[DB_BACKEND]}
+                           from ChangeLog where ChangeID > ?
+                           order by ChangeID {limit(count)}""", (since,))
+        rows = _settled(cursor.fetchall(), since)
+        cursor.close()
+    changes = [_change(row) for row in rows]
+    if tables:
+        changes = [change for change in changes if change["table"] in tables]
+    last_id = rows[-1][0] if rows else since
+    return changes, last_id
+
+
+def latest():
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("select max(ChangeID) from ChangeLog")
+        value = cursor.fetchone()[0]
+        cursor.close()
+    return value or 0
+
+
+def sse_frame(change):
+    return (f"id: {change['id']}\nevent: {change['table']}\n"
+            f"data: {json.dumps(change, ensure_ascii=False, default=_default)}\n\n")
+
+
+# Один поток на процесс читает ChangeLog и раскладывает готовые SSE-кадры в кольцевой буфер;
+# подписчики только читают буфер, поэтому каждое изменение сериализуется один раз
+class Broadcaster:
+    def __init__(self, size=BUFFER_SIZE, poll_interval=POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._frames = deque(maxlen=size)
+        # Буфер покрывает изменения с ChangeID в (_floor, _last_id]
+        self._floor = None
+        self._last_id = None
+        self._cond = threading.Condition()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def _start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._floor = self._last_id = latest()
+            self._thread = threading.Thread(target=self._run, name="changefeed", daemon=True)
+            self._thread.start()
+
+    # Вызывается POST-обработчиками после commit, чтобы не ждать очередного опроса
+    def notify(self):
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                changes, last_id = read(self._last_id)
+            except Exception as e:
+                print(f"Ошибка чтения ленты изменений: {e}")
+                continue
+            if last_id == self._last_id:
+                continue
+            with self._cond:
+                for change in changes:
+                    if len(self._frames) == self._frames.maxlen:
+                        self._floor = self._frames[0][0]
+                    self._frames.append((change["id"], change["table"], sse_frame(change)))
+                self._last_id = last_id
+                self._cond.notify_all()
+
+    # Готовые кадры после since; None — since старше буфера, и клиенту нужно догнать по ChangeLog
+    def frames_after(self, since):
+        self._start()
+        with self._cond:
+            if since < self._floor:
+                return None
+            return [frame for frame in self._frames if frame[0] > since]
+
+    # Ждёт изменений новее since не дольше timeout
+    def wait(self, since, timeout):
+        self._start()
+        with self._cond:
+            if self._last_id <= since:
+                self._cond.wait(timeout)
+            return self._last_id > since
+
+
+broadcaster = Broadcaster()
+
+
+def notify():
+    broadcaster.notify()
+
+
+def prune(days):
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM ChangeLog WHERE ChangedAt < ?", (datetime.now() - timedelta(days=days),))
+        deleted = cursor.rowcount
+        cursor.close()
+    return deleted
+
+
+# Очистка старых изменений: python changefeed.py prune [дней, по умолчанию 7]
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'prune':
+        print("Использование: python changefeed.py prune [дней]")
+        sys.exit(1)
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    print(f"✓ Удалено изменений: {prune(days)}")
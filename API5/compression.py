@@ -0,0 +1,94 @@
+import gzip
+import os
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # без brotli отдаём только gzip
+    brotli = None
+
+# Ответы меньше порога не сжимаем: выигрыш меньше накладных расходов
+MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 5))
+
+COMPRESSIBLE = ('application/json', 'application/x-ndjson', 'text/')
+
+
+def encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+# Лучшее из поддерживаемых сжатий, которое принимает клиент
+def choose_encoding(accept_encodings):
+    for encoding in encodings():
+        if accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def compress(data, encoding, level=None):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY if level is None else level)
+    return gzip.compress(data, GZIP_LEVEL if level is None else level)
+
+
+# Потоковые ответы сжимаются по кускам: каждый кусок сбрасывается клиенту сразу
+def _compress_stream(chunks, encoding):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+# Сжатое тело — другое представление, поэтому строгий ETag становится слабым.
+# 304 получает тот же слабый ETag, что и сжатый ответ 200.
+def _weaken_etag(response):
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def _compress_response(response):
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None or 'Content-Encoding' in response.headers:
+        return response
+    # Файлы (send_file) отдаются как есть: иначе весь файл сжимается в памяти
+    if response.direct_passthrough:
+        return response
+    if not response.mimetype or not response.mimetype.startswith(COMPRESSIBLE):
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.status_code == 304:
+        _weaken_etag(response)
+        return response
+    if response.status_code < 200 or response.status_code in (204, 206):
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.iter_encoded(), encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < MIN_SIZE:
+            return response
+        response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    _weaken_etag(response)
+    return response
+
+
+def init_app(app):
+    app.after_request(_compress_response)
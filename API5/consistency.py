@@ -0,0 +1,38 @@
+import os
+import time
+
+from flask import request
+
+import db
+
+# Read-your-writes: после успешного POST клиент ещё READ_YOUR_WRITES секунд читает из основной БД,
+# потому что реплика могла не успеть получить его запись. Браузер получает cookie,
+# другие клиенты могут прислать заголовок X-Read-Your-Writes: 1 сами.
+READ_YOUR_WRITES = float(os.environ.get('DB_READ_YOUR_WRITES', 5))
+COOKIE = 'read_primary_until'
+HEADER = 'X-Read-Your-Writes'
+
+
+def wants_primary():
+    if request.headers.get(HEADER) == '1':
+        return True
+    try:
+        return float(request.cookies.get(COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def _route_reads():
+    db.set_read_primary(wants_primary())
+
+
+def _remember_write(response):
+    if request.method == 'POST' and response.status_code < 400 and db.DB_READ_REPLICAS and READ_YOUR_WRITES > 0:
+        response.set_cookie(COOKIE, f"{time.time() + READ_YOUR_WRITES:.3f}",
+                            max_age=int(READ_YOUR_WRITES) + 1, httponly=True, samesite='Lax')
+    return response
+
+
+def init_app(app):
+    app.before_request(_route_reads)
+    app.after_request(_remember_write)
@@ -1,15 +1,533 @@
-import pyodbc
+import itertools
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime
+
+import sqltrace
+
+# mssql — боевой SQL Server через pyodbc, sqlite — локальная замена для разработки и замеров
+DB_BACKEND = os.environ.get('DB_BACKEND', 'mssql')
+DB_SQLITE_PATH = os.environ.get('DB_SQLITE_PATH', 'vending.db')
+
+DB_DRIVER = os.environ.get('DB_DRIVER', 'ODBC Driver 17 for SQL Server')
+DB_SERVER = os.environ.get('DB_SERVER', 'KOSYAN\\SQLEXPRESS')
+DB_DATABASE = os.environ.get('DB_DATABASE', 'VendingDB')
+
+# Параметры пула соединений
+POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', 2))
+POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 10))
+POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5))
+POOL_MAX_IDLE = float(os.environ.get('DB_POOL_MAX_IDLE', 300))
+POOL_CHECK_AFTER = float(os.environ.get('DB_POOL_CHECK_AFTER', 30))
+
+# Реплики для чтения через запятую: для sqlite — пути к файлам, для mssql — сервер или сервер/база.
+# Без реплик все чтения идут в основную БД
+DB_READ_REPLICAS = [target.strip() for target in os.environ.get('DB_READ_REPLICAS', '').split(',')
+                    if target.strip()]
+# Сколько секунд не обращаться к реплике после ошибки подключения к ней
+REPLICA_RETRY_AFTER = float(os.environ.get('DB_REPLICA_RETRY_AFTER', 30))
+
+
+def _connect_mssql(server=None, database=None):
+    import pyodbc
+
+    return pyodbc.connect(
+        driver='{' + DB_DRIVER + '}',
+        server=server or DB_SERVER,
+        database=database or DB_DATABASE,
+        trusted_connection='yes'
+    )
+
+
+def _connect_sqlite(path=None):
+    conn = sqlite3.connect(path or DB_SQLITE_PATH, detect_types=sqlite3.PARSE_DECLTYPES,
+                           check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+# sqlite3 возвращает даты строками, если не зарегистрировать преобразования для объявленных типов
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+
+def init_sqlite(path=None):
+    schema = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema_sqlite.sql')
+    conn = _connect_sqlite(path)
+    try:
+        with open(schema, encoding='utf-8') as f:
+            conn.executescript(f.read())
+        conn.commit()
+    finally:
+        conn.close()
+
+
+BACKENDS = {
+    'mssql': _connect_mssql,
+    'sqlite': _connect_sqlite,
+}
+
+
+def _replica_connect(target):
+    if DB_BACKEND == 'sqlite':
+        return lambda: _connect_sqlite(target)
+    server, _, database = target.partition('/')
+    return lambda: _connect_mssql(server, database or None)
+
+
+# Различия диалектов, которые встречаются в запросах обработчиков
+def top(n):
+    return f"top ({int(n)})" if DB_BACKEND == 'mssql' else ""
+
+
+def limit(n):
+    return "" if DB_BACKEND == 'mssql' else f"limit {int(n)}"
+
+
+def last_identity():
+    return "SELECT SCOPE_IDENTITY()" if DB_BACKEND == 'mssql' else "SELECT last_insert_rowid()"
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+# Хук для метрик: timing_hook(kind, seconds, rows), kind — connect/execute/fetch.
+# Устанавливается модулем metrics; без него курсор работает без накладных расходов на учёт.
+timing_hook = None
+
+
+def _record(kind, seconds, rows=0):
+    if timing_hook is not None:
+        timing_hook(kind, seconds, rows)
+
+
+# Обёртка над курсором драйвера: замеряет время выполнения и выборки, считает строки.
+# Итог по каждому запросу (текст, время, строки) уходит в sqltrace, когда запрос
+# дочитан: при следующем execute, закрытии курсора или возврате соединения в пул.
+class TimedCursor:
+    def __init__(self, raw, repeats=None):
+        object.__setattr__(self, '_raw', raw)
+        object.__setattr__(self, '_repeats', repeats if repeats is not None else Counter())
+        object.__setattr__(self, '_statement', None)
+
+    def _begin(self, args, many):
+        self._finish()
+        sql, params = args[0], args[1:]
+        self._repeats[sql] += 1
+        # [sql, params, many, execute, fetch, rows]
+        statement = [sql, params, many, 0.0, 0.0, 0]
+        object.__setattr__(self, '_statement', statement)
+        return statement
+
+    def _finish(self):
+        statement = self._statement
+        if statement is None:
+            return
+        object.__setattr__(self, '_statement', None)
+        sql, params, many, execute, fetch, rows = statement
+        if rows == 0 and many:
+            rows = len(params[0]) if params else 0
+        elif rows == 0:
+            rows = max(getattr(self._raw, 'rowcount', 0) or 0, 0)
+        sqltrace.statement(sql, params, execute, fetch, rows, many, self._repeats)
+
+    def _run(self, method, args, many):
+        statement = self._begin(args, many)
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            statement[3] += elapsed
+            _record('execute', elapsed)
+
+    def _fetched(self, started, rows):
+        elapsed = time.perf_counter() - started
+        if self._statement is not None:
+            self._statement[4] += elapsed
+            self._statement[5] += rows
+        _record('fetch', elapsed, rows)
+
+    def execute(self, *args):
+        return self._run(self._raw.execute, args, False)
+
+    def executemany(self, *args):
+        return self._run(self._raw.executemany, args, True)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._raw.fetchone()
+        self._fetched(started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size):
+        started = time.perf_counter()
+        rows = self._raw.fetchmany(size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._raw.fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+    def close(self):
+        self._finish()
+        self._raw.close()
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._raw, name, value)
+
+
+# Обёртка над соединением: close() возвращает его в пул, а не закрывает
+class PooledConnection:
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self.last_used = time.monotonic()
+        # Сколько раз за это взятие из пула выполнялся каждый текст запроса
+        self._repeats = Counter()
+        self._cursors = []
+        self._after_commit = []
+
+    def cursor(self):
+        cursor = TimedCursor(self._raw.cursor(), self._repeats)
+        self._cursors.append(cursor)
+        return cursor
+
+    # Действие после успешного commit текущей транзакции; при rollback отменяется
+    def after_commit(self, callback):
+        self._after_commit.append(callback)
+
+    def commit(self):
+        self._raw.commit()
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            callback()
+
+    def rollback(self):
+        self._after_commit = []
+        self._raw.rollback()
+
+    def close(self):
+        if self._pool is not None:
+            for cursor in self._cursors:
+                cursor._finish()
+            self._cursors = []
+            pool, self._pool = self._pool, None
+            pool.release(self)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        self.close()
+        return False
+
+
+class ConnectionPool:
+    def __init__(self, connect, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE,
+                 timeout=POOL_TIMEOUT, max_idle=POOL_MAX_IDLE, check_after=POOL_CHECK_AFTER):
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self._idle = deque()
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "created": 0,
+            "evicted": 0,
+            "broken": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+        }
+
+    def _open(self):
+        raw = self._connect()
+        with self._cond:
+            self._stats["created"] += 1
+        return raw
+
+    def _discard(self, raw, reason):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats[reason] += 1
+            self._cond.notify()
+
+    def _healthy(self, raw):
+        try:
+            cursor = raw.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _evict_idle(self):
+        # Вызывается под self._cond; оставляем не меньше min_size соединений
+        now = time.monotonic()
+        stale = []
+        while self._idle and self._size > self.min_size:
+            conn = self._idle[0]
+            if now - conn.last_used < self.max_idle:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            self._stats["evicted"] += 1
+            stale.append(conn._raw)
+        return stale
+
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            with self._cond:
+                stale = self._evict_idle()
+                conn = None
+                create = False
+                while conn is None and not create:
+                    if self._idle:
+                        conn = self._idle.pop()
+                    elif self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._stats["timeouts"] += 1
+                            raise PoolTimeout("Нет свободных соединений с БД")
+                        self._cond.wait(remaining)
+            for raw in stale:
+                try:
+                    raw.close()
+                except Exception:
+                    pass
+
+            if create:
+                try:
+                    raw = self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                conn = PooledConnection(self, raw)
+            elif time.monotonic() - conn.last_used > self.check_after and not self._healthy(conn._raw):
+                # Соединение умерло, пока лежало в пуле — пробуем следующее
+                self._discard(conn._raw, "broken")
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._stats["checkouts"] += 1
+                self._stats["wait_total"] += waited
+                self._stats["wait_max"] = max(self._stats["wait_max"], waited)
+            conn._pool = self
+            return conn
+
+    def release(self, conn):
+        try:
+            conn._raw.rollback()
+        except Exception:
+            self._discard(conn._raw, "broken")
+            return
+        fresh = PooledConnection(self, conn._raw)
+        fresh._pool = None
+        with self._cond:
+            self._idle.append(fresh)
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"] = self._size
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._size - len(self._idle)
+            stats["min_size"] = self.min_size
+            stats["max_size"] = self.max_size
+        checkouts = stats["checkouts"]
+        stats["wait_avg"] = stats["wait_total"] / checkouts if checkouts else 0.0
+        return stats
+
+    def close_all(self):
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+        for conn in idle:
+            try:
+                conn._raw.close()
+            except Exception:
+                pass
+
+
+# Чтения распределяются по репликам по кругу. Недоступная реплика пропускается
+# REPLICA_RETRY_AFTER секунд; если не ответила ни одна, чтение идёт в основную БД.
+class ReadRouter:
+    def __init__(self, primary, targets):
+        self.primary = primary
+        self.replicas = [(target, ConnectionPool(_replica_connect(target))) for target in targets]
+        self._next = itertools.count()
+        self._down_until = {}
+
+    def acquire(self):
+        if self.replicas and not _read_primary.get():
+            start = next(self._next)
+            for i in range(len(self.replicas)):
+                target, replica = self.replicas[(start + i) % len(self.replicas)]
+                if self._down_until.get(target, 0) > time.monotonic():
+                    continue
+                try:
+                    return replica.acquire()
+                except PoolTimeout:
+                    continue
+                except Exception as e:
+                    self._down_until[target] = time.monotonic() + REPLICA_RETRY_AFTER
+                    print(f"✗ Реплика {target} недоступна, чтение уходит дальше: {e}")
+        return self.primary.acquire()
+
+    def stats(self):
+        now = time.monotonic()
+        return {target: dict(replica.stats(), down=self._down_until.get(target, 0) > now)
+                for target, replica in self.replicas}
+
+
+pool = ConnectionPool(BACKENDS[DB_BACKEND])
+reads = ReadRouter(pool, DB_READ_REPLICAS)
+
+# Читать ли в текущем запросе из основной БД (read-your-writes); выставляет consistency.py
+_read_primary = ContextVar('read_primary', default=False)
+
+
+def set_read_primary(value):
+    _read_primary.set(value)
+
+
+def reads_from_primary():
+    return bool(reads.replicas) and _read_primary.get()
+
+
+# Чтения внутри блока идут в основную БД независимо от запроса
+@contextmanager
+def primary_reads():
+    token = _read_primary.set(True)
+    try:
+        yield
+    finally:
+        _read_primary.reset(token)
+
+
+# Запрос упёрся в исчерпанный пул: workers.offload отвечает на него 503 с Retry-After, даже если
+# обработчик перехватил исключение и вернул 500
+_pool_exhausted = ContextVar('pool_exhausted', default=False)
+
+
+def pool_exhausted():
+    return _pool_exhausted.get()
+
+
+def _acquire(source):
+    started = time.perf_counter()
+    try:
+        return source.acquire()
+    except PoolTimeout:
+        _pool_exhausted.set(True)
+        raise
+    finally:
+        _record('connect', time.perf_counter() - started)
+
 
 def get_connection():
     try:
-        conn = pyodbc.connect(
-            driver='{ODBC Driver 17 for SQL Server}',
-            server='KOSYAN\\SQLEXPRESS',
-            database='VendingDB',
-            trusted_connection='yes'
-        )
-        print("✓ Успешно подключились к БД")
-        return conn
+        return _acquire(pool)
+    except Exception as e:
+        print(f"✗ Ошибка подключения к БД: {e}")
+        raise
+
+
+@contextmanager
+def connection():
+    conn = _acquire(pool)
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+# Соединение для GET-обработчиков: из пула реплики, если они настроены
+def get_read_connection():
+    try:
+        return _acquire(reads)
     except Exception as e:
         print(f"✗ Ошибка подключения к БД: {e}")
-        return None
\ No newline at end of file
+        raise
+
+
+@contextmanager
+def read_connection():
+    conn = _acquire(reads)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def pool_stats():
+    return pool.stats()
+
+
+def replica_stats():
+    return reads.stats()
+
+
+# Снимок SQLite-базы для локальной проверки реплик: python db.py copy-replica replica.db.
+# Реплика не обновляется сама — повторный запуск переносит свежие данные.
+if __name__ == '__main__':
+    if len(sys.argv) != 3 or sys.argv[1] != 'copy-replica':
+        print("Использование: python db.py copy-replica <файл реплики>")
+        sys.exit(1)
+    source = sqlite3.connect(DB_SQLITE_PATH)
+    target = sqlite3.connect(sys.argv[2])
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    print(f"✓ {DB_SQLITE_PATH} скопирована в {sys.argv[2]}")
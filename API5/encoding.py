@@ -0,0 +1,83 @@
+import uuid
+from datetime import date
+from decimal import Decimal
+
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+from refdata import lookup, name
+
+try:
+    import orjson
+except ImportError:  # без orjson работает стандартный json Flask
+    orjson = None
+
+
+# Те же преобразования, что у DefaultJSONProvider, чтобы формат ответов не зависел от библиотеки
+def _default(o):
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, (Decimal, uuid.UUID)):
+        return str(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option).decode("utf-8")
+
+
+# ?format=columnar — имена колонок один раз, дальше массивы значений
+def wants_columnar():
+    return request.args.get('format') == 'columnar'
+
+
+def columns(cursor):
+    return tuple(column[0] for column in cursor.description)
+
+
+# Подстановка названий из справочников по номеру колонки; resolve — функция из refdata.resolver.
+# Справочник берётся один раз на ответ, а не на каждое значение.
+class RowEncoder:
+    def __init__(self, keys, resolve=None):
+        self.keys = keys
+        self.lookups = []
+        if resolve is not None:
+            # Справочник нужен только для полей, которые есть в выборке
+            for field, table in resolve.fields.items():
+                if field in keys:
+                    self.lookups.append((keys.index(field), table, lookup(table)))
+
+    def values(self, row):
+        if not self.lookups:
+            return list(row)
+        values = list(row)
+        for index, table, names in self.lookups:
+            key = values[index]
+            values[index] = names[key] if key in names else name(table, key)
+        return values
+
+    def record(self, row):
+        return dict(zip(self.keys, self.values(row)))
+
+    def encode(self, rows, columnar=False):
+        if columnar:
+            return {"columns": list(self.keys), "rows": [self.values(row) for row in rows]}
+        return [self.record(row) for row in rows]
+
+
+# Ответ со строками курсора в обычном виде (список объектов) или колоночном
+def rows_response(cursor, rows, resolve=None):
+    encoder = RowEncoder(columns(cursor), resolve)
+    payload = encoder.encode(rows, wants_columnar())
+    return current_app.json.response(payload)
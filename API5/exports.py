@@ -0,0 +1,266 @@
+import csv
+import io
+import os
+import tempfile
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from db import read_connection
+from encoding import RowEncoder, columns
+from refdata import resolver
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # без pyarrow доступен только CSV
+    pa = None
+
+# Выгрузка истории продаж и обслуживания за период в CSV или Parquet.
+# Строки читаются курсором пачками по FETCH_ROWS, поэтому память не зависит от объёма выгрузки.
+FETCH_ROWS = int(os.environ.get('EXPORT_FETCH_ROWS', 5000))
+# Строк в одной row group Parquet-файла
+ROW_GROUP_ROWS = int(os.environ.get('EXPORT_ROW_GROUP_ROWS', 100000))
+# Куда фоновые выгрузки складывают готовые файлы и сколько секунд их хранить.
+# Каталог принадлежит приложению: устаревшие файлы из него удаляются. Воркеры gunicorn
+# должны видеть один и тот же каталог, чтобы файл скачивался через любой из них
+EXPORT_DIR = os.environ.get('EXPORT_DIR', os.path.join(tempfile.gettempdir(), 'vending-exports'))
+EXPORT_TTL = float(os.environ.get('EXPORT_TTL', 3600))
+# Ограничение числа параметров запроса SQL Server — 2100
+MAX_MACHINES = 1000
+
+MIMETYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Колонки выгрузки: имя, тип для Parquet; ID из справочников заменяются названиями, как в GET
+SOURCES = {
+    "Sales": {
+        "query": """select s.SaleID, s.SaleDateTime, s.MachineID, s.ProductID as ProductName,
+                    s.Quantity, s.SaleSum, s.PaymentTypeID as PaymentTypeName from Sales s""",
+        "date_column": "s.SaleDateTime",
+        "machine_column": "s.MachineID",
+        "order_by": "s.SaleDateTime, s.SaleID",
+        "types": ("int", "datetime", "int", "string", "int", "money", "string"),
+        "resolve": resolver({"ProductName": "Products", "PaymentTypeName": "PaymentType"}),
+    },
+    "Maintenance": {
+        "query": """select m.NoteID, m.MaintenanceDate, m.MachineID, m.Description, m.Problems,
+                    m.DoneByUserID as DoneByUser from Maintenance m""",
+        "date_column": "m.MaintenanceDate",
+        "machine_column": "m.MachineID",
+        "order_by": "m.MaintenanceDate, m.NoteID",
+        "types": ("int", "date", "int", "string", "string", "string"),
+        "resolve": resolver({"DoneByUser": "Users"}),
+    },
+}
+
+
+def formats():
+    return ("csv", "parquet") if pa is not None else ("csv",)
+
+
+# Параметры выгрузки из query string или JSON: format, date_from, date_to (не включая), machine_id=1,2,3
+def parse_params(data):
+    export_format = data.get('format', 'csv')
+    if export_format not in MIMETYPES:
+        raise ValueError(f"Неизвестный формат: {export_format}")
+    if export_format not in formats():
+        raise ValueError("Выгрузка в Parquet недоступна: не установлен pyarrow")
+
+    machine_ids = data.get('machine_id')
+    if isinstance(machine_ids, str):
+        machine_ids = [value for value in machine_ids.split(',') if value.strip()]
+    elif machine_ids is not None and not isinstance(machine_ids, list):
+        machine_ids = [machine_ids]
+    try:
+        machine_ids = sorted({int(value) for value in machine_ids}) if machine_ids else []
+    except (ValueError, TypeError):
+        raise ValueError("machine_id должен быть списком номеров аппаратов")
+    if len(machine_ids) > MAX_MACHINES:
+        raise ValueError(f"Не больше {MAX_MACHINES} аппаратов в одной выгрузке")
+
+    try:
+        date_from = datetime.fromisoformat(data['date_from']) if data.get('date_from') else None
+        date_to = datetime.fromisoformat(data['date_to']) if data.get('date_to') else None
+    except (ValueError, TypeError):
+        raise ValueError("date_from и date_to должны быть датами в формате ISO")
+    return {
+        "format": export_format,
+        "date_from": date_from,
+        "date_to": date_to,
+        "machine_ids": machine_ids,
+    }
+
+
+def execute(cursor, source, params):
+    spec = SOURCES[source]
+    where = []
+    values = []
+    if params["date_from"]:
+        where.append(f"{spec['date_column']} >= ?")
+        values.append(params["date_from"])
+    if params["date_to"]:
+        where.append(f"{spec['date_column']} < ?")
+        values.append(params["date_to"])
+    if params["machine_ids"]:
+        where.append(f"{spec['machine_column']} IN ({', '.join('?' * len(params['machine_ids']))})")
+        values.extend(params["machine_ids"])
+    cursor.arraysize = FETCH_ROWS
+    cursor.execute(f"""{spec['query']}
+                       {"where " + " and ".join(where) if where else ""}
+                       order by {spec['order_by']}""", values)
+
+
+def filename(source, params):
+    parts = [source.lower()]
+    if params["date_from"]:
+        parts.append(params["date_from"].date().isoformat())
+    if params["date_to"]:
+        parts.append(params["date_to"].date().isoformat())
+    return f"{'_'.join(parts)}.{params['format']}"
+
+
+def _batches(cursor, size):
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            break
+        yield rows
+
+
+# CSV по пачкам строк. BOM в начале нужен Excel, чтобы он открыл файл как UTF-8.
+def csv_chunks(cursor, source, progress=None):
+    encoder = RowEncoder(columns(cursor), SOURCES[source]["resolve"])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(encoder.keys)
+    yield ('\ufeff' + buffer.getvalue()).encode('utf-8')
+    for rows in _batches(cursor, FETCH_ROWS):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(encoder.values(row) for row in rows)
+        yield buffer.getvalue().encode('utf-8')
+        if progress:
+            progress(len(rows))
+
+
+def _arrow_type(kind):
+    return {
+        "int": pa.int64(),
+        "string": pa.string(),
+        "datetime": pa.timestamp("us"),
+        "date": pa.date32(),
+        "money": pa.decimal128(14, 2),
+    }[kind]
+
+
+def _arrow_value(kind, value):
+    # SQLite отдаёт деньги float'ом, а даты строкой; SQL Server — Decimal и datetime
+    if value is None or kind in ("int", "string"):
+        return value
+    if kind == "money" and not isinstance(value, Decimal):
+        return Decimal(str(value)).quantize(Decimal("0.01"))
+    if kind == "datetime" and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if kind == "date" and isinstance(value, str):
+        return datetime.fromisoformat(value).date()
+    return value
+
+
+# Приёмник для ParquetWriter: копит записанные байты, чтобы отдавать их клиенту после каждой row group.
+# tell() считает всё записанное — по нему writer вычисляет смещения в footer файла.
+class _ChunkSink:
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+# Parquet по row group: в памяти одновременно только одна группа строк
+def parquet_chunks(cursor, source, progress=None):
+    spec = SOURCES[source]
+    encoder = RowEncoder(columns(cursor), spec["resolve"])
+    schema = pa.schema([(key, _arrow_type(kind)) for key, kind in zip(encoder.keys, spec["types"])])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        for rows in _batches(cursor, ROW_GROUP_ROWS):
+            values = [encoder.values(row) for row in rows]
+            arrays = [pa.array([_arrow_value(kind, row[i]) for row in values], type=field.type)
+                      for i, (kind, field) in enumerate(zip(spec["types"], schema))]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema), row_group_size=len(rows))
+            data = sink.drain()
+            if data:
+                yield data
+            if progress:
+                progress(len(rows))
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def chunks(cursor, source, export_format, progress=None):
+    if export_format == "parquet":
+        return parquet_chunks(cursor, source, progress)
+    return csv_chunks(cursor, source, progress)
+
+
+# Фоновая выгрузка: пишет файл в EXPORT_DIR, job.result — имя файла для скачивания
+def run_export(job, source, params):
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    _remove_expired()
+    fd, path = tempfile.mkstemp(prefix=f"export_{job.id}_", suffix=f".{params['format']}", dir=EXPORT_DIR)
+    try:
+        with os.fdopen(fd, 'wb') as f, read_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                execute(cursor, source, params)
+                for data in chunks(cursor, source, params["format"],
+                                   lambda count: job.progress(0, count)):
+                    f.write(data)
+            finally:
+                cursor.close()
+    except Exception:
+        os.remove(path)
+        raise
+    job.result = {
+        "path": path,
+        "filename": filename(source, params),
+        "mimetype": MIMETYPES[params["format"]],
+        "size": os.path.getsize(path),
+    }
+
+
+def _remove_expired():
+    now = time.time()
+    for name in os.listdir(EXPORT_DIR):
+        if not name.startswith("export_"):
+            continue
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > EXPORT_TTL:
+                os.remove(path)
+        except OSError:
+            pass
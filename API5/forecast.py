@@ -0,0 +1,164 @@
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from db import read_connection
+from refdata import lookup
+from response_cache import CACHE_TTL, versions
+
+# Прогноз спроса и план пополнения. Скорость продаж каждого товара в каждом аппарате —
+# взвешенное среднее дневных продаж из SalesRollup за WINDOW_DAYS: вчерашний день весит 1,
+# а вес дня вдвое меньше каждые HALF_LIFE_DAYS. Всё считается над массивами целиком, без циклов по строкам.
+WINDOW_DAYS = int(os.environ.get('FORECAST_WINDOW_DAYS', 28))
+HALF_LIFE_DAYS = float(os.environ.get('FORECAST_HALF_LIFE_DAYS', 7))
+# Сколько дней истории «весит» средняя скорость товара по всем аппаратам: сглаживает
+# прогноз для пар с редкими продажами. Для товара без продаж вообще берётся PropensityToSell (штук в сутки)
+PRIOR_WEIGHT = 3.0
+DEFAULT_HORIZON = 7
+MAX_HORIZON = 90
+# Даты дальше этого срока не выводятся: при почти нулевой скорости они теряют смысл
+MAX_DAYS_AHEAD = 3650
+
+# Вес всего окна: дни без продаж тоже входят в знаменатель
+_WEIGHTS = 0.5 ** (np.arange(WINDOW_DAYS) / HALF_LIFE_DAYS)
+TOTAL_WEIGHT = _WEIGHTS.sum()
+
+TABLES = ("Sales", "MachineProducts", "Products")
+
+_cache = None
+_lock = threading.Lock()
+
+
+def _frame(cursor, names):
+    return pd.DataFrame.from_records(cursor.fetchall(), columns=names, coerce_float=True)
+
+
+def load(today):
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""select PeriodStart, MachineID, ProductID, sum(Quantity) from SalesRollup
+                          where Granularity = 'D' and PeriodStart >= ? and PeriodStart < ?
+                          group by PeriodStart, MachineID, ProductID""",
+                       (datetime.combine(today - timedelta(days=WINDOW_DAYS), datetime.min.time()),
+                        datetime.combine(today, datetime.min.time())))
+        sales = _frame(cursor, ["PeriodStart", "MachineID", "ProductID", "Sold"])
+        cursor.execute("select MachineID, ProductID, Quantity, MinQuantity from MachineProducts")
+        stock = _frame(cursor, ["MachineID", "ProductID", "Quantity", "MinQuantity"])
+        cursor.execute("select ProductID, InStock, MinStock, PropensityToSell from Products")
+        products = _frame(cursor, ["ProductID", "InStock", "MinStock", "PropensityToSell"])
+        cursor.close()
+    return sales, stock, products
+
+
+# Скорость продаж (штук в сутки) по каждой паре аппарат–товар из MachineProducts
+def rates(sales, stock, products, today):
+    keys = ["MachineID", "ProductID"]
+    if len(sales):
+        age = (pd.Timestamp(today) - pd.to_datetime(sales["PeriodStart"])).dt.days.to_numpy() - 1
+        weighted = sales["Sold"].to_numpy(dtype=float) * _WEIGHTS[np.clip(age, 0, WINDOW_DAYS - 1)]
+        sold = (sales[keys].assign(Weighted=weighted)
+                .groupby(keys, sort=False)["Weighted"].sum().reset_index())
+    else:
+        sold = pd.DataFrame({"MachineID": [], "ProductID": [], "Weighted": []})
+
+    plan = stock.merge(sold, on=keys, how="left")
+    plan["Weighted"] = plan["Weighted"].fillna(0.0)
+    observed = plan["Weighted"].to_numpy() / TOTAL_WEIGHT
+
+    # Априорная скорость товара: средняя по аппаратам, где он продавался, иначе PropensityToSell
+    fleet = plan.assign(Observed=observed).groupby("ProductID")["Observed"].mean()
+    propensity = products.set_index("ProductID")["PropensityToSell"].astype(float)
+    prior = fleet.where(fleet > 0, propensity.reindex(fleet.index)).fillna(0.0)
+    prior = plan["ProductID"].map(prior).to_numpy(dtype=float)
+
+    plan["DailyRate"] = (plan["Weighted"].to_numpy() + PRIOR_WEIGHT * prior) / (TOTAL_WEIGHT + PRIOR_WEIGHT)
+    return plan.drop(columns="Weighted")
+
+
+# Базовый план кэшируется, пока не изменятся продажи, остатки или товары (и не дольше CACHE_TTL)
+def base_plan():
+    global _cache
+    today = date.today()
+    key = (versions(*TABLES), today)
+    cache = _cache
+    if cache is not None and cache[0] == key and time.monotonic() - cache[1] < CACHE_TTL:
+        return cache[2]
+    with _lock:
+        cache = _cache
+        if cache is not None and cache[0] == key and time.monotonic() - cache[1] < CACHE_TTL:
+            return cache[2]
+        sales, stock, products = load(today)
+        plan = (rates(sales, stock, products, today), products, today)
+        _cache = (key, time.monotonic(), plan)
+        return plan
+
+
+def _dates(today, days):
+    # Дата, когда при текущей скорости будет достигнут порог; None — скорость нулевая или дата слишком далеко
+    finite = days <= MAX_DAYS_AHEAD
+    result = np.full(len(days), None, dtype=object)
+    offsets = pd.to_timedelta(np.floor(days[finite]), unit="D")
+    result[finite] = (pd.Timestamp(today) + offsets).date
+    return result
+
+
+# Прогноз по парам аппарат–товар на horizon дней: когда товар кончится (StockOutDate),
+# когда опустится ниже MinQuantity (RestockBy) и сколько загрузить, чтобы хватило на horizon (ToLoad)
+def machine_plan(horizon, machine_id=None, product_id=None, within=None):
+    plan, _, today = base_plan()
+    if machine_id is not None:
+        plan = plan[plan["MachineID"].to_numpy() == machine_id]
+    if product_id is not None:
+        plan = plan[plan["ProductID"].to_numpy() == product_id]
+
+    rate = plan["DailyRate"].to_numpy()
+    quantity = plan["Quantity"].to_numpy(dtype=float)
+    reserve = np.maximum(quantity - plan["MinQuantity"].to_numpy(dtype=float), 0.0)
+    with np.errstate(divide="ignore"):
+        days_left = np.where(rate > 0, quantity / rate, np.inf)
+        restock_in = np.where(rate > 0, reserve / rate, np.inf)
+    to_load = np.maximum(np.ceil(rate * horizon + plan["MinQuantity"].to_numpy() - quantity), 0)
+
+    result = pd.DataFrame({
+        "MachineID": plan["MachineID"].to_numpy(),
+        "ProductID": plan["ProductID"].to_numpy(),
+        "Quantity": plan["Quantity"].to_numpy(),
+        "MinQuantity": plan["MinQuantity"].to_numpy(),
+        "DailyRate": np.round(rate, 3),
+        "DaysLeft": np.where(np.isfinite(days_left), np.round(days_left, 1), np.nan),
+        "StockOutDate": _dates(today, days_left),
+        "RestockBy": _dates(today, restock_in),
+        "ToLoad": to_load.astype(int),
+    })
+    if within is not None:
+        result = result[restock_in <= within]
+    result = result.sort_values(["DaysLeft", "MachineID", "ProductID"], kind="stable", na_position="last")
+    result.insert(2, "ProductName", result["ProductID"].map(lookup("Products")))
+    return result
+
+
+# План закупки на склад: загрузка аппаратов на horizon дней против Products.InStock и MinStock
+def product_plan(horizon):
+    plan, products, _ = base_plan()
+    demand = plan.assign(Demand=plan["DailyRate"] * horizon,
+                         ToLoad=np.maximum(np.ceil(plan["DailyRate"] * horizon + plan["MinQuantity"]
+                                                   - plan["Quantity"]), 0))
+    totals = demand.groupby("ProductID")[["DailyRate", "Demand", "ToLoad"]].sum()
+    result = products.set_index("ProductID")[["InStock", "MinStock"]].join(totals).fillna(0.0)
+    result["ToOrder"] = np.maximum(result["ToLoad"] + result["MinStock"] - result["InStock"], 0).astype(int)
+    result["DailyRate"] = result["DailyRate"].round(3)
+    result["Demand"] = result["Demand"].round(1)
+    result["ToLoad"] = result["ToLoad"].astype(int)
+    result = result.reset_index().sort_values(["ToOrder", "ProductID"], ascending=[False, True], kind="stable")
+    result.insert(1, "ProductName", result["ProductID"].map(lookup("Products")))
+    return result
+
+
+# Значения numpy/pandas → обычные типы Python для JSON; NaN → None
+def records(frame):
+    values = frame.astype(object).where(frame.notna(), None)
+    return list(frame.columns), values.to_numpy().tolist()
@@ -0,0 +1,66 @@
+from collections import defaultdict
+
+from db import DB_BACKEND
+
+# Остаток не уходит в минус: продажа товара, который не заведён или уже кончился
+# по учёту, всё равно записывается, а остаток просто остаётся нулевым
+CONSUME_STOCK = """UPDATE MachineProducts
+                   SET Quantity = CASE WHEN Quantity > ? THEN Quantity - ? ELSE 0 END
+                   WHERE MachineID = ? AND ProductID = ?"""
+
+# Остаток задаётся одним атомарным запросом: при раздельных UPDATE и INSERT две загрузки
+# новой позиции обе доходили до INSERT, и одна падала на PK_MachineProducts.
+# Параметры: MachineID, ProductID, Quantity, MinQuantity (None — не менять), MinQuantity для новой позиции
+UPSERT_STOCK = {
+    'mssql': """MERGE MachineProducts WITH (HOLDLOCK) AS t
+                USING (SELECT CAST(? AS int) AS MachineID, CAST(? AS int) AS ProductID,
+                              CAST(? AS int) AS Quantity, CAST(? AS int) AS MinQuantity,
+                              CAST(? AS int) AS DefaultMinQuantity) AS s
+                ON t.MachineID = s.MachineID AND t.ProductID = s.ProductID
+                WHEN MATCHED THEN UPDATE SET Quantity = s.Quantity,
+                     MinQuantity = COALESCE(s.MinQuantity, t.MinQuantity)
+                WHEN NOT MATCHED THEN INSERT (MachineID, ProductID, Quantity, MinQuantity)
+                     VALUES (s.MachineID, s.ProductID, s.Quantity, COALESCE(s.MinQuantity, s.DefaultMinQuantity));""",
+    'sqlite': """INSERT INTO MachineProducts (MachineID, ProductID, Quantity, MinQuantity)
+                 VALUES (?1, ?2, ?3, COALESCE(?4, ?5))
+                 ON CONFLICT (MachineID, ProductID) DO UPDATE
+                 SET Quantity = excluded.Quantity, MinQuantity = COALESCE(?4, MinQuantity)""",
+}
+# Совпадает с DEFAULT для MinQuantity в bd.sql
+DEFAULT_MIN_QUANTITY = 5
+
+
+# Суммарное списание по (MachineID, ProductID); строки продаж — кортежи parse_sale
+def consumption(rows):
+    totals = defaultdict(int)
+    for product_id, machine_id, quantity, *_ in rows:
+        totals[(machine_id, product_id)] += quantity
+    return totals
+
+
+# Списывает проданное с остатков аппаратов в той же транзакции, что и запись продаж.
+# Флаг NeedsRestock — вычисляемый столбец с индексом, поэтому список на пополнение
+# обновляется вместе с остатком и не требует пересчёта.
+# Строки идут по (MachineID, ProductID), как в set_stock и rollups, чтобы параллельные
+# транзакции блокировали их в одном порядке
+def consume(cursor, rows):
+    params = [(quantity, quantity, machine_id, product_id)
+              for (machine_id, product_id), quantity in sorted(consumption(rows).items())]
+    if params:
+        cursor.executemany(CONSUME_STOCK, params)
+
+
+def parse_stock(data):
+    min_quantity = data.get('MinQuantity')
+    quantity = int(data['Quantity'])
+    if quantity < 0 or (min_quantity is not None and int(min_quantity) < 0):
+        raise ValueError("Остаток и порог не могут быть отрицательными")
+    return int(data['ProductID']), quantity, None if min_quantity is None else int(min_quantity)
+
+
+# Устанавливает остатки после загрузки аппарата; MinQuantity меняется, только если передан.
+# Позиции идут по возрастанию ProductID, чтобы параллельные загрузки блокировали строки в одном порядке
+def set_stock(cursor, machine_id, items):
+    for product_id, quantity, min_quantity in sorted(items, key=lambda item: item[0]):
+        cursor.execute(UPSERT_STOCK[DB_BACKEND],
+                       (machine_id, product_id, quantity, min_quantity, DEFAULT_MIN_QUANTITY))
@@ -0,0 +1,186 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from db import connection
+
+# Фоновые задачи (импорт CSV) выполняются в отдельном небольшом пуле,
+# чтобы долгий импорт не занимал потоки, обслуживающие запросы.
+# Задача выполняется в процессе, который её принял, а статус пишется в таблицу Jobs:
+# опрос статуса может прийти в любой воркер gunicorn
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 1))
+# Выгрузки идут в своём пуле: долгая выгрузка не задерживает импорт CSV, и наоборот
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', 1))
+# Сколько завершённых задач помнить и сколько секунд хранить их статус
+JOBS_KEEP = int(os.environ.get('JOBS_KEEP', 100))
+JOB_TTL = float(os.environ.get('JOB_TTL', 3600))
+# Ошибки считаются все, но хранятся только первые — память не зависит от размера файла
+MAX_STORED_ERRORS = 100
+# Прогресс пишется в БД не чаще раза в JOB_SAVE_INTERVAL секунд, смена статуса — сразу
+SAVE_INTERVAL = float(os.environ.get('JOB_SAVE_INTERVAL', 1))
+# Задача, которая столько секунд не обновлялась в статусе running, считается прерванной
+# (процесс, выполнявший её, перезапущен или упал)
+STALE_AFTER = float(os.environ.get('JOB_STALE_AFTER', 600))
+
+INSERT_JOB = """INSERT INTO Jobs (JobID, Kind, Status, Total, Done, Processed, ErrorsCount,
+                                  Errors, Error, Result, CreatedAt, FinishedAt, UpdatedAt)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+UPDATE_JOB = """UPDATE Jobs SET Status = ?, Total = ?, Done = ?, Processed = ?, ErrorsCount = ?,
+                                Errors = ?, Error = ?, Result = ?, FinishedAt = ?, UpdatedAt = ?
+                WHERE JobID = ?"""
+SELECT_JOB = """SELECT JobID, Kind, Status, Total, Done, Processed, ErrorsCount,
+                       Errors, Error, Result, CreatedAt, FinishedAt, UpdatedAt
+                FROM Jobs WHERE JobID = ?"""
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+_executors = {
+    "export": ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export"),
+}
+_jobs = OrderedDict()
+_lock = threading.Lock()
+
+
+class Job:
+    def __init__(self, kind, total=0):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.total = total
+        self.done = 0
+        self.processed = 0
+        self.errors = []
+        self.errors_count = 0
+        self.error = None
+        # Результат задачи для обработчиков (например, готовый файл выгрузки); в статус не попадает
+        self.result = None
+        self.created = time.time()
+        self.finished = None
+        self._lock = threading.Lock()
+        self._saved_at = 0.0
+
+    def progress(self, done, processed=0, errors=()):
+        with self._lock:
+            self.done = done
+            self.processed += processed
+            self.errors_count += len(errors)
+            room = MAX_STORED_ERRORS - len(self.errors)
+            if room > 0:
+                self.errors.extend(errors[:room])
+        self.save()
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "progress": round(self.done / self.total * 100, 1) if self.total else 0.0,
+                "processed": self.processed,
+                "errors_count": self.errors_count,
+                "errors": list(self.errors),
+                "error": self.error,
+                "created": self.created,
+                "finished": self.finished,
+            }
+
+    def _row(self):
+        with self._lock:
+            return [self.status, self.total, self.done, self.processed, self.errors_count,
+                    json.dumps(self.errors, ensure_ascii=False), self.error,
+                    json.dumps(self.result, ensure_ascii=False) if self.result is not None else None,
+                    _moment(self.finished), datetime.now()]
+
+    def insert(self):
+        row = self._row()
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(INSERT_JOB, [self.id, self.kind] + row[:-2] + [_moment(self.created)] + row[-2:])
+            cursor.execute("DELETE FROM Jobs WHERE FinishedAt < ?",
+                           (datetime.fromtimestamp(time.time() - JOB_TTL),))
+            cursor.close()
+        self._saved_at = time.monotonic()
+
+    # Запись статуса в Jobs; ошибка записи не прерывает саму задачу
+    def save(self, force=False):
+        if not force and time.monotonic() - self._saved_at < SAVE_INTERVAL:
+            return
+        self._saved_at = time.monotonic()
+        try:
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(UPDATE_JOB, self._row() + [self.id])
+                cursor.close()
+        except Exception as e:
+            print(f"✗ Не удалось сохранить статус задачи {self.id}: {e}")
+
+    @classmethod
+    def from_row(cls, row):
+        job = cls(row[1], row[3])
+        job.id = row[0]
+        job.status, job.done, job.processed, job.errors_count = row[2], row[4], row[5], row[6]
+        job.errors = json.loads(row[7]) if row[7] else []
+        job.error = row[8]
+        job.result = json.loads(row[9]) if row[9] else None
+        job.created = row[10].timestamp()
+        job.finished = row[11].timestamp() if row[11] else None
+        if job.status == "running" and (datetime.now() - row[12]).total_seconds() > STALE_AFTER:
+            job.status = "failed"
+            job.error = "Задача прервана: процесс, выполнявший её, остановлен"
+        return job
+
+
+def _moment(timestamp):
+    return datetime.fromtimestamp(timestamp) if timestamp is not None else None
+
+
+def _expire():
+    now = time.time()
+    finished = [job_id for job_id, job in _jobs.items() if job.finished is not None]
+    for job_id in finished:
+        if len(_jobs) <= JOBS_KEEP and now - _jobs[job_id].finished < JOB_TTL:
+            break
+        del _jobs[job_id]
+
+
+def _run(job, target, args):
+    job.status = "running"
+    job.save(force=True)
+    try:
+        target(job, *args)
+        job.status = "done"
+    except Exception as e:
+        job.error = str(e)
+        job.status = "failed"
+    finally:
+        job.finished = time.time()
+        job.save(force=True)
+
+
+# Ставит target(job, *args) в очередь и сразу возвращает задачу
+def submit(kind, target, *args, total=0):
+    job = Job(kind, total)
+    job.insert()
+    with _lock:
+        _expire()
+        _jobs[job.id] = job
+    _executors.get(kind, _executor).submit(_run, job, target, args)
+    return job
+
+
+# Задача этого процесса берётся из памяти, чужая — из таблицы Jobs
+def get(job_id):
+    with _lock:
+        job = _jobs.get(job_id)
+    if job is not None:
+        return job
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SELECT_JOB, (job_id,))
+        row = cursor.fetchone()
+        cursor.close()
+    return Job.from_row(row) if row else None
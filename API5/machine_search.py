@@ -0,0 +1,277 @@
+import heapq
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from itertools import chain
+
+from db import connection
+from response_cache import versions
+
+# Поиск аппаратов по части серийного или инвентарного номера, адреса и модели.
+# Индекс в памяти: каждое слово поля разбивается на триграммы, к началу слова добавляется
+# метка \0, поэтому запрос из 1–2 символов ищется как начало слова, а от 3 символов — как подстрока.
+# Вес поля: совпадение в номере важнее совпадения в адресе
+FIELDS = {
+    "SerialNumber": 4,
+    "InventoryNumber": 4,
+    "Model": 2,
+    "Location": 1,
+}
+QUERY = f"select MachineID, {', '.join(FIELDS)} from VendingMachines"
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# Новые аппараты (POST в любом воркере) дочитываются, как только меняется версия VendingMachines
+# в TableVersions. Правки в обход POST попадают в индекс при полной перестройке
+REBUILD_INTERVAL = float(os.environ.get('SEARCH_REBUILD_INTERVAL', 600))
+FETCH_ROWS = 5000
+# При дочитывании последние номера перечитываются заново: на SQL Server транзакция
+# с меньшим MachineID может закоммититься позже транзакции с большим
+CATCH_UP_OVERLAP = 100
+
+# Слово целиком, начало слова, подстрока
+EXACT, PREFIX, SUBSTRING = 4, 2, 1
+# Запрос совпал со значением поля целиком, например полный серийный номер
+FULL_MATCH_BONUS = 100
+
+_WORD = re.compile(r"\w+")
+_MARK = "\0"
+
+
+def normalize(value):
+    return str(value or "").casefold().replace("ё", "е")
+
+
+def words(value):
+    return tuple(_WORD.findall(normalize(value)))
+
+
+# Слова поля одной строкой с разделителем \0 по краям: начало слова ищется как "\0" + token,
+# слово целиком — как "\0" + token + "\0", проверки идут на уровне C без цикла по словам
+def _text(field_words):
+    return _MARK + _MARK.join(field_words) + _MARK if field_words else ""
+
+
+# Номера почти уникальны, а города, улицы и модели повторяются — триграммы слова запоминаются
+@lru_cache(maxsize=65536)
+def _grams(word):
+    padded = _MARK + word
+    grams = {padded[i:i + 3] for i in range(len(padded) - 2)}
+    grams.add(padded[:2])
+    return frozenset(grams)
+
+
+# Триграммы, которые обязаны встретиться в подходящем слове
+def _query_grams(token):
+    if len(token) < 3:
+        return {_MARK + token}
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def _patterns(token):
+    exact, prefix = _MARK + token + _MARK, _MARK + token
+    # Запрос из 1–2 символов ищется только в начале слова
+    return exact, prefix, token if len(token) >= 3 else prefix
+
+
+def _token_score(patterns, texts, weights):
+    exact, prefix, anywhere = patterns
+    best = 0
+    for weight, text in zip(weights, texts):
+        if anywhere not in text:
+            continue
+        if exact in text:
+            score = EXACT
+        elif prefix in text:
+            score = PREFIX
+        else:
+            score = SUBSTRING
+        best = max(best, weight * score)
+    return best
+
+
+class MachineIndex:
+    def __init__(self):
+        # MachineID → (исходные значения полей, строки слов каждого поля, все поля одной строкой)
+        self.docs = {}
+        # Триграмма → MachineID; при замене аппарата старые записи остаются и отсеиваются проверкой
+        self.postings = defaultdict(list)
+        # Наибольший MachineID, прочитанный из БД
+        self.loaded_id = 0
+
+    def add(self, machine_id, values):
+        values = tuple(values)
+        # Перечитанный без изменений аппарат не дублирует записи в postings
+        known = self.docs.get(machine_id)
+        if known is not None and known[0] == values:
+            return
+        field_words = [words(value) for value in values]
+        texts = tuple(_text(field) for field in field_words)
+        self.docs[machine_id] = (values, texts, "".join(texts))
+        postings = self.postings
+        for gram in frozenset().union(*map(_grams, chain.from_iterable(field_words))):
+            postings[gram].append(machine_id)
+
+    def search(self, query, limit):
+        query_words = words(query)
+        tokens = list(dict.fromkeys(query_words))
+        if not tokens:
+            return 0, []
+        # Кандидаты — аппараты из самого короткого списка; каждое слово запроса проверяется по строке всех полей
+        lists = [self.postings.get(gram, ()) for token in tokens for gram in _query_grams(token)]
+        candidates = set(min(lists, key=len))
+        patterns = [_patterns(token) for token in tokens]
+        required = [anywhere for _, _, anywhere in patterns]
+        full = _text(query_words)
+        weights = tuple(FIELDS.values())
+
+        scored = []
+        docs = self.docs
+        for machine_id in candidates:
+            _, texts, combined = docs[machine_id]
+            if not all(pattern in combined for pattern in required):
+                continue
+            score = 0
+            for token_patterns in patterns:
+                best = _token_score(token_patterns, texts, weights)
+                if not best:
+                    break
+                score += best
+            else:
+                if full in texts:
+                    score += FULL_MATCH_BONUS
+                scored.append((score, -machine_id))
+
+        top = heapq.nlargest(limit, scored)
+        return len(scored), [self.item(-neg_id, score) for score, neg_id in top]
+
+    def item(self, machine_id, score):
+        values = self.docs[machine_id][0]
+        item = {"MachineID": machine_id}
+        item.update(zip(FIELDS, values))
+        item["Score"] = score
+        return item
+
+
+def build():
+    index = MachineIndex()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(QUERY)
+        while True:
+            rows = cursor.fetchmany(FETCH_ROWS)
+            if not rows:
+                break
+            for row in rows:
+                index.add(row[0], row[1:])
+        cursor.close()
+    index.loaded_id = max(index.docs, default=0)
+    return index
+
+
+_index = None
+_built_at = 0.0
+# Версия VendingMachines, до которой индекс дочитан
+_version = None
+_lock = threading.Lock()
+_updates_lock = threading.Lock()
+_catch_up_lock = threading.Lock()
+# Аппараты, дочитанные во время перестройки: повторяются в новом индексе перед заменой
+_pending = None
+_rebuilding = False
+
+
+def _rebuild():
+    global _index, _built_at, _version, _pending
+    with _updates_lock:
+        _pending = []
+    try:
+        version = versions("VendingMachines")[0]
+        index = build()
+    except Exception:
+        with _updates_lock:
+            _pending = None
+        raise
+    with _updates_lock:
+        for machine_id, values in _pending:
+            index.add(machine_id, values)
+        _pending = None
+        _index, _built_at, _version = index, time.monotonic(), version
+    return index
+
+
+def _rebuild_in_background():
+    global _rebuilding
+    try:
+        with _lock:
+            _rebuild()
+    except Exception as e:
+        print(f"✗ Не удалось перестроить индекс поиска аппаратов: {e}")
+    finally:
+        _rebuilding = False
+
+
+def _start_rebuild():
+    global _rebuilding
+    with _updates_lock:
+        if _rebuilding:
+            return
+        _rebuilding = True
+    threading.Thread(target=_rebuild_in_background, name="machine-search", daemon=True).start()
+
+
+def _add(machine_id, values):
+    with _updates_lock:
+        if _index is not None:
+            _index.add(machine_id, values)
+        if _pending is not None:
+            _pending.append((machine_id, values))
+
+
+# Дочитывает аппараты после последнего загруженного номера. Если дочитывание уже идёт
+# в другом потоке, запрос отвечает по текущему индексу
+def _catch_up(index, version):
+    global _version
+    if not _catch_up_lock.acquire(blocking=False):
+        return
+    try:
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"{QUERY} where MachineID > ?", (max(index.loaded_id - CATCH_UP_OVERLAP, 0),))
+            rows = cursor.fetchall()
+            cursor.close()
+        for row in rows:
+            _add(row[0], tuple(row[1:]))
+        index.loaded_id = max([index.loaded_id] + [row[0] for row in rows])
+        _version = version
+    finally:
+        _catch_up_lock.release()
+
+
+# Первый запрос ждёт построения индекса; устаревший индекс отвечает, пока в фоне строится новый.
+# Версия VendingMachines проверяется на каждый запрос по снимку TableVersions из response_cache
+def current():
+    index = _index
+    if index is None:
+        with _lock:
+            return _index if _index is not None else _rebuild()
+    if time.monotonic() - _built_at >= REBUILD_INTERVAL:
+        _start_rebuild()
+    try:
+        version = versions("VendingMachines")[0]
+        if version != _version:
+            _catch_up(index, version)
+    except Exception as e:
+        print(f"✗ Не удалось дочитать аппараты в индекс поиска: {e}")
+    return index
+
+
+def search(query, limit=DEFAULT_LIMIT):
+    return current().search(query, limit)
+
+
+# Индекс строится в фоне при старте, чтобы первый поиск не ждал чтения всех аппаратов
+def init_app(app):
+    _start_rebuild()
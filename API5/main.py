@@ -2,30 +2,79 @@ from flask import Flask
 from flask_cors import CORS
 from GET.Users import get_users_blueprint
 from GET.Sales import get_sales_blueprint
+from GET.SalesSummary import get_sales_summary_blueprint
 from GET.Products import get_products_blueprint
 from GET.VendingMachines import get_vm_blueprint
 from GET.Maintenance import get_mtc_blueprint
+from GET.Pool import get_pool_blueprint
+from GET.Calendar import get_calendar_blueprint
+from GET.Metrics import get_metrics_blueprint
+from GET.Frontend import get_frontend_blueprint
+from GET.Inventory import get_inventory_blueprint
+from GET.ImportJobs import get_import_blueprint
+from GET.Changes import get_changes_blueprint
+from GET.Export import get_export_blueprint
+from GET.Forecast import get_forecast_blueprint
+from GET.Schedule import get_schedule_blueprint
 from POST.maintenance import post_mtc_blueprint
 from POST.users import post_user_blueprint
 from POST.products import post_products_blueprint
 from POST.sales import post_sales_blueprint
 from POST.vendingMachines import post_vm_blueprint
 from POST.login import post_login_blueprint
+from POST.inventory import post_inventory_blueprint
+from POST.export import post_export_blueprint
+import assets
+import auth
+import compression
+import consistency
+import machine_search
+import metrics
+import workers
 
-app = Flask(__name__)
-CORS(app)
 
-app.register_blueprint(get_users_blueprint)
-app.register_blueprint(get_sales_blueprint)
-app.register_blueprint(get_products_blueprint)
-app.register_blueprint(get_vm_blueprint)
-app.register_blueprint(get_mtc_blueprint)
-app.register_blueprint(post_mtc_blueprint)
-app.register_blueprint(post_user_blueprint)
-app.register_blueprint(post_products_blueprint)
-app.register_blueprint(post_sales_blueprint)
-app.register_blueprint(post_vm_blueprint)
-app.register_blueprint(post_login_blueprint)
+def create_app():
+    app = Flask(__name__)
+    # Без ключа подписи сервер не запускается
+    auth.init_app(app)
+    CORS(app, expose_headers=["X-Next-Cursor"])
+
+    app.register_blueprint(get_users_blueprint)
+    app.register_blueprint(get_sales_blueprint)
+    app.register_blueprint(get_sales_summary_blueprint)
+    app.register_blueprint(get_products_blueprint)
+    app.register_blueprint(get_vm_blueprint)
+    app.register_blueprint(get_mtc_blueprint)
+    app.register_blueprint(get_pool_blueprint)
+    app.register_blueprint(get_calendar_blueprint)
+    app.register_blueprint(get_metrics_blueprint)
+    app.register_blueprint(get_frontend_blueprint)
+    app.register_blueprint(get_inventory_blueprint)
+    app.register_blueprint(get_import_blueprint)
+    app.register_blueprint(get_changes_blueprint)
+    app.register_blueprint(get_export_blueprint)
+    app.register_blueprint(get_forecast_blueprint)
+    app.register_blueprint(get_schedule_blueprint)
+    app.register_blueprint(post_mtc_blueprint)
+    app.register_blueprint(post_user_blueprint)
+    app.register_blueprint(post_products_blueprint)
+    app.register_blueprint(post_sales_blueprint)
+    app.register_blueprint(post_vm_blueprint)
+    app.register_blueprint(post_login_blueprint)
+    app.register_blueprint(post_inventory_blueprint)
+    app.register_blueprint(post_export_blueprint)
+
+    # Статика собирается и сжимается один раз при старте
+    assets.build()
+
+    consistency.init_app(app)
+    machine_search.init_app(app)
+    metrics.init_app(app)
+    # Регистрируется после metrics, чтобы в api_response_bytes попадал размер сжатого ответа
+    compression.init_app(app)
+    workers.init_app(app)
+    return app
+
 
 if __name__ == '__main__':
-    app.run(host ='0.0.0.0', debug=True, port=8086)
\ No newline at end of file
+    create_app().run(host ='0.0.0.0', debug=True, port=8086)
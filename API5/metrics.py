@@ -0,0 +1,182 @@
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, has_request_context, request
+
+import db
+from encoding import FastJSONProvider
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+BYTE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+HISTOGRAMS = {
+    "api_request_seconds": ("Полное время обработки запроса", TIME_BUCKETS),
+    "api_db_connect_seconds": ("Время получения соединения из пула за запрос", TIME_BUCKETS),
+    "api_db_execute_seconds": ("Время выполнения SQL за запрос", TIME_BUCKETS),
+    "api_db_fetch_seconds": ("Время выборки строк за запрос", TIME_BUCKETS),
+    "api_serialize_seconds": ("Время сериализации JSON за запрос", TIME_BUCKETS),
+    "api_rows": ("Число строк, прочитанных из БД за запрос", ROW_BUCKETS),
+    "api_response_bytes": ("Размер тела ответа", BYTE_BUCKETS),
+}
+
+# Какое поле накопителя запроса попадает в какую гистограмму
+REQUEST_FIELDS = {
+    "connect": "api_db_connect_seconds",
+    "execute": "api_db_execute_seconds",
+    "fetch": "api_db_fetch_seconds",
+    "serialize": "api_serialize_seconds",
+    "rows": "api_rows",
+}
+
+ENVIRON_KEY = "metrics.timings"
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+_lock = threading.Lock()
+_histograms = {}
+_requests = {}
+
+
+def observe(name, blueprint, value):
+    key = (name, blueprint)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram(HISTOGRAMS[name][1])
+        histogram.observe(value)
+
+
+# Накопитель текущего запроса лежит в environ: он общий для потока сервера и db-воркера
+def _timings():
+    if not has_request_context():
+        return None
+    return request.environ.get(ENVIRON_KEY)
+
+
+def _db_hook(kind, seconds, rows):
+    timings = _timings()
+    if timings is not None:
+        timings[kind] += seconds
+        timings["rows"] += rows
+
+
+class TimedJSONProvider(FastJSONProvider):
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        result = super().dumps(obj, **kwargs)
+        timings = _timings()
+        if timings is not None:
+            timings["serialize"] += time.perf_counter() - started
+        return result
+
+
+def _start():
+    request.environ[ENVIRON_KEY] = dict.fromkeys(REQUEST_FIELDS, 0)
+    g.metrics_started = time.perf_counter()
+
+
+def _finish(response):
+    timings = request.environ.get(ENVIRON_KEY)
+    if timings is None:
+        return response
+    started = g.metrics_started
+    blueprint = request.blueprint or request.endpoint or "unknown"
+    status = response.status_code
+    sent = [0]
+
+    if response.is_streamed:
+        body = response.response
+
+        def counting():
+            for chunk in body:
+                sent[0] += len(chunk)
+                yield chunk
+        response.response = counting()
+    else:
+        sent[0] = response.content_length or 0
+
+    # Для потоковых ответов итог подводится, когда тело отдано целиком
+    def record():
+        observe("api_request_seconds", blueprint, time.perf_counter() - started)
+        observe("api_response_bytes", blueprint, sent[0])
+        for field, name in REQUEST_FIELDS.items():
+            observe(name, blueprint, timings[field])
+        with _lock:
+            _requests[(blueprint, status)] = _requests.get((blueprint, status), 0) + 1
+
+    response.call_on_close(record)
+    return response
+
+
+def init_app(app):
+    app.json = TimedJSONProvider(app)
+    app.before_request(_start)
+    app.after_request(_finish)
+    db.timing_hook = _db_hook
+
+
+def _format_labels(**labels):
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+def render():
+    lines = []
+    with _lock:
+        histograms = sorted(_histograms.items())
+        requests = sorted(_requests.items())
+
+    lines.append("# HELP api_requests_total Число обработанных запросов")
+    lines.append("# TYPE api_requests_total counter")
+    for (blueprint, status), count in requests:
+        lines.append(f"api_requests_total{_format_labels(blueprint=blueprint, status=status)} {count}")
+
+    current = None
+    for (name, blueprint), histogram in histograms:
+        if name != current:
+            current = name
+            lines.append(f"# HELP {name} {HISTOGRAMS[name][0]}")
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(blueprint=blueprint, le=bound)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(blueprint=blueprint)} {histogram.sum}")
+        lines.append(f"{name}_count{_format_labels(blueprint=blueprint)} {histogram.count}")
+
+    lines.append("# HELP db_pool_connections Соединения в пуле")
+    lines.append("# TYPE db_pool_connections gauge")
+    stats = db.pool_stats()
+    for state in ("size", "idle", "in_use"):
+        lines.append(f"db_pool_connections{_format_labels(state=state)} {stats[state]}")
+    lines.append("# HELP db_pool_wait_seconds Суммарное время ожидания соединения")
+    lines.append("# TYPE db_pool_wait_seconds counter")
+    lines.append(f"db_pool_wait_seconds {stats['wait_total']}")
+    lines.append("# HELP db_pool_timeouts_total Отказы из-за пустого пула")
+    lines.append("# TYPE db_pool_timeouts_total counter")
+    lines.append(f"db_pool_timeouts_total {stats['timeouts']}")
+    replicas = db.replica_stats()
+    if replicas:
+        lines.append("# HELP db_replica_connections Соединения в пулах реплик для чтения")
+        lines.append("# TYPE db_replica_connections gauge")
+        for target, replica in replicas.items():
+            for state in ("size", "idle", "in_use"):
+                lines.append(f"db_replica_connections{_format_labels(replica=target, state=state)} {replica[state]}")
+        lines.append("# HELP db_replica_down Реплика временно исключена из чтения после ошибки")
+        lines.append("# TYPE db_replica_down gauge")
+        for target, replica in replicas.items():
+            lines.append(f"db_replica_down{_format_labels(replica=target)} {int(replica['down'])}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+
+from db import connection
+from table_versions import versions
+
+# Небольшие справочники, которые раньше подтягивались join'ами в каждом GET-запросе
+TABLES = {
+    "PaymentType": "select PaymentTypeID, Name from PaymentType",
+    "MachineStatus": "select StatusID, Name from MachineStatus",
+    "Country": "select CountryID, Name from Country",
+    "Users": "select UserID, FullName from Users",
+    "Products": "select ProductID, Name from Products",
+}
+
+# Справочник перечитывается, когда его версия в TableVersions изменилась (запись через API
+# в любом процессе). Справочники без POST-эндпоинтов могут меняться вручную в БД в обход
+# версий — их перечитываем по таймеру
+CACHE_TTL = float(os.environ.get('REFDATA_TTL', 300))
+# Не чаще этого перечитываем справочник, если в нём не нашёлся ID
+MISS_RELOAD_INTERVAL = 5.0
+
+# таблица -> (момент загрузки, версия, {ID: название})
+_cache = {}
+_lock = threading.Lock()
+
+
+def _version(table):
+    try:
+        return versions(table)[0]
+    except Exception as e:
+        # Без версий остаётся только TTL
+        print(f"✗ Не удалось прочитать версии таблиц: {e}")
+        return None
+
+
+def _load(table, version):
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(TABLES[table])
+        values = {row[0]: row[1] for row in cursor.fetchall()}
+        cursor.close()
+    _cache[table] = (time.monotonic(), version, values)
+    return values
+
+
+def _valid(entry, version):
+    return (entry is not None and (version is None or entry[1] == version)
+            and time.monotonic() - entry[0] < CACHE_TTL)
+
+
+def lookup(table):
+    version = _version(table)
+    entry = _cache.get(table)
+    if _valid(entry, version):
+        return entry[2]
+    with _lock:
+        entry = _cache.get(table)
+        if _valid(entry, version):
+            return entry[2]
+        return _load(table, version)
+
+
+def name(table, key):
+    if key is None:
+        return None
+    values = lookup(table)
+    if key in values:
+        return values[key]
+    with _lock:
+        entry = _cache.get(table)
+        if entry is None or time.monotonic() - entry[0] >= MISS_RELOAD_INTERVAL:
+            values = _load(table, entry[1] if entry else None)
+        else:
+            values = entry[2]
+    return values.get(key)
+
+
+# Возвращает функцию, которая заменяет ID в полях записи на названия из справочников
+def resolver(fields):
+    def resolve(item):
+        for field, table in fields.items():
+            item[field] = name(table, item[field])
+        return item
+    resolve.fields = fields
+    return resolve
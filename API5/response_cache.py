@@ -0,0 +1,76 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request
+
+from db import primary_reads, reads_from_primary
+from streaming import wants_stream
+# bump и versions импортируются отсюда POST-обработчиками и модулями со своими кэшами
+from table_versions import bump, versions
+
+# Сколько ответов держим в памяти и сколько секунд считаем их свежими.
+# TTL ограничивает устаревание, если таблицу поменяли вручную в БД, в обход bump().
+MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_SIZE', 256))
+CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 30))
+
+_entries = OrderedDict()
+_lock = threading.Lock()
+
+
+def _stored_headers(response):
+    return [(name, value) for name, value in response.headers
+            if name not in ('Content-Length', 'Content-Type', 'ETag')]
+
+
+# Кэширует ответ GET-обработчика, пока не изменится ни одна из таблиц, от которых он зависит
+def cached(*tables):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if wants_stream():
+                return view(*args, **kwargs)
+
+            try:
+                key = (request.full_path, versions(*tables))
+            except Exception as e:
+                # Без версий нельзя проверить свежесть — отвечаем без кэша
+                print(f"✗ Не удалось прочитать версии таблиц: {e}")
+                return view(*args, **kwargs)
+
+            with _lock:
+                # Клиент только что писал: ответ мог быть собран на отстающей реплике,
+                # поэтому перечитываем из основной БД и заменяем запись в кэше
+                entry = None if reads_from_primary() else _entries.get(key)
+                if entry is not None and time.monotonic() - entry[0] < CACHE_TTL:
+                    _entries.move_to_end(key)
+                else:
+                    entry = None
+
+            if entry is not None:
+                _, etag, body, mimetype, headers = entry
+                response = Response(body, mimetype=mimetype, headers=headers)
+            else:
+                # Ответ ляжет в кэш под версией из основной БД; отстающая реплика сохранила бы
+                # под ней старые данные на CACHE_TTL, поэтому заполняющее кэш чтение идёт в основную БД
+                with primary_reads():
+                    response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                body = response.get_data()
+                etag = hashlib.sha1(body).hexdigest()
+                with _lock:
+                    _entries[key] = (time.monotonic(), etag, body, response.mimetype,
+                                     _stored_headers(response))
+                    _entries.move_to_end(key)
+                    while len(_entries) > MAX_ENTRIES:
+                        _entries.popitem(last=False)
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
@@ -0,0 +1,107 @@
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+from db import DB_BACKEND, connection
+
+# Гранулярность агрегатов: H — час, D — сутки
+GRANULARITIES = ('H', 'D')
+
+# Одна атомарная вставка-или-сложение на ключ: при раздельных UPDATE и INSERT две транзакции
+# с новым ключом обе доходили до INSERT, и одна падала на PK_SalesRollup вместе с самой продажей
+UPSERT_ROLLUP = {
+    'mssql': """MERGE SalesRollup WITH (HOLDLOCK) AS t
+                USING (SELECT ? AS Granularity, ? AS PeriodStart, ? AS MachineID, ? AS ProductID,
+                              ? AS PaymentTypeID, ? AS SaleCount, ? AS Quantity, ? AS SaleSum) AS s
+                ON t.Granularity = s.Granularity AND t.PeriodStart = s.PeriodStart
+                   AND t.MachineID = s.MachineID AND t.ProductID = s.ProductID
+                   AND t.PaymentTypeID = s.PaymentTypeID
+                WHEN MATCHED THEN UPDATE SET SaleCount = t.SaleCount + s.SaleCount,
+                     Quantity = t.Quantity + s.Quantity, SaleSum = t.SaleSum + s.SaleSum
+                WHEN NOT MATCHED THEN INSERT
+                     (Granularity, PeriodStart, MachineID, ProductID, PaymentTypeID, SaleCount, Quantity, SaleSum)
+                     VALUES (s.Granularity, s.PeriodStart, s.MachineID, s.ProductID, s.PaymentTypeID,
+                             s.SaleCount, s.Quantity, s.SaleSum);""",
+    'sqlite': """INSERT INTO SalesRollup
+                 (Granularity, PeriodStart, MachineID, ProductID, PaymentTypeID, SaleCount, Quantity, SaleSum)
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                 ON CONFLICT (Granularity, PeriodStart, MachineID, ProductID, PaymentTypeID) DO UPDATE
+                 SET SaleCount = SaleCount + excluded.SaleCount, Quantity = Quantity + excluded.Quantity,
+                     SaleSum = SaleSum + excluded.SaleSum""",
+}
+
+REBUILD_ROLLUP = {
+    'mssql': {
+        'H': "DATEADD(hour, DATEDIFF(hour, 0, SaleDateTime), 0)",
+        'D': "DATEADD(day, DATEDIFF(day, 0, SaleDateTime), 0)",
+    },
+    'sqlite': {
+        'H': "strftime('%Y-%m-%d %H:00:00', SaleDateTime)",
+        'D': "strftime('%Y-%m-%d 00:00:00', SaleDateTime)",
+    },
+}
+
+
+def period_start(granularity, moment):
+    if granularity == 'H':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+# Строки продаж в формате sales_ingest.parse_sale:
+# (ProductID, MachineID, Quantity, SaleSum, PaymentTypeID, SaleDateTime)
+def aggregate(rows):
+    totals = defaultdict(lambda: [0, 0, 0])
+    for product_id, machine_id, quantity, sale_sum, payment_type_id, sale_datetime in rows:
+        for granularity in GRANULARITIES:
+            key = (granularity, period_start(granularity, sale_datetime),
+                   machine_id, product_id, payment_type_id)
+            total = totals[key]
+            total[0] += 1
+            total[1] += quantity
+            total[2] += sale_sum
+    return totals
+
+
+# Вызывается в той же транзакции, что и вставка продаж. Ключи идут в одном порядке во всех
+# транзакциях, чтобы пачки с пересекающимися ключами не блокировали друг друга по кругу
+def apply_sales(cursor, rows):
+    params = [key + tuple(total) for key, total in sorted(aggregate(rows).items())]
+    if params:
+        cursor.executemany(UPSERT_ROLLUP[DB_BACKEND], params)
+
+
+def rebuild(conn, date_from=None):
+    cursor = conn.cursor()
+    try:
+        for granularity, bucket in REBUILD_ROLLUP[DB_BACKEND].items():
+            if date_from is None:
+                cursor.execute("DELETE FROM SalesRollup WHERE Granularity = ?", (granularity,))
+                where, params = "", (granularity,)
+            else:
+                start = period_start(granularity, date_from)
+                cursor.execute("DELETE FROM SalesRollup WHERE Granularity = ? AND PeriodStart >= ?",
+                               (granularity, start))
+                where, params = "WHERE SaleDateTime >= ?", (granularity, start)
+            cursor.execute(f"""INSERT INTO SalesRollup
+                (Granularity, PeriodStart, MachineID, ProductID, PaymentTypeID, SaleCount, Quantity, SaleSum)
+                SELECT ?, {bucket}, MachineID, ProductID, PaymentTypeID, COUNT(*), SUM(Quantity), SUM(SaleSum)
+                FROM Sales {where}
+                GROUP BY {bucket}, MachineID, ProductID, PaymentTypeID""", params)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+# Пересчёт агрегатов: python rollups.py rebuild [YYYY-MM-DD]
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'rebuild':
+        print("Использование: python rollups.py rebuild [YYYY-MM-DD]")
+        sys.exit(1)
+    date_from = datetime.fromisoformat(sys.argv[2]) if len(sys.argv) > 2 else None
+    with connection() as conn:
+        rebuild(conn, date_from)
+    print("✓ Агрегаты продаж пересчитаны")
@@ -0,0 +1,147 @@
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+
+from db import connection
+from rollups import apply_sales
+from inventory import consume
+import changefeed
+from response_cache import bump
+
+# Поля продажи в ленте изменений, в порядке кортежа parse_sale (ID товара и способа оплаты
+# заменяются названиями при отдаче)
+SALE_CHANGE_KEYS = ("ProductName", "MachineID", "Quantity", "SaleSum", "PaymentTypeName", "SaleDateTime")
+
+INSERT_SALE = """INSERT INTO Sales
+                 (ProductID, MachineID, Quantity, SaleSum, PaymentTypeID, SaleDateTime)
+                 VALUES (?, ?, ?, ?, ?, ?)"""
+
+# Параметры буфера отложенной записи продаж
+BUFFER_ENABLED = os.environ.get('SALES_BUFFER_ENABLED', '0') == '1'
+BUFFER_FLUSH_SIZE = int(os.environ.get('SALES_BUFFER_FLUSH_SIZE', 500))
+BUFFER_FLUSH_INTERVAL = float(os.environ.get('SALES_BUFFER_FLUSH_INTERVAL', 1.0))
+BUFFER_MAX_SIZE = int(os.environ.get('SALES_BUFFER_MAX_SIZE', 10000))
+
+
+def parse_sale(data):
+    sale_datetime = data.get('SaleDateTime')
+    return (
+        int(data['ProductID']),
+        int(data['MachineID']),
+        int(data['Quantity']),
+        int(data['SaleSum']),
+        int(data['PaymentTypeID']),
+        datetime.fromisoformat(sale_datetime) if sale_datetime else datetime.now()
+    )
+
+
+# Пишет пачку продаж, обновляет агрегаты, остатки в аппаратах, ленту изменений и версии таблиц в уже открытой транзакции;
+# коммит — на вызывающем
+def write_sales(conn, rows):
+    cursor = conn.cursor()
+    try:
+        if hasattr(cursor, 'fast_executemany'):
+            cursor.fast_executemany = True
+        cursor.executemany(INSERT_SALE, rows)
+        apply_sales(cursor, rows)
+        consume(cursor, rows)
+        changefeed.record(cursor, "Sales", [dict(zip(SALE_CHANGE_KEYS, row)) for row in rows])
+    finally:
+        cursor.close()
+    bump(conn, "Sales", "MachineProducts")
+
+
+class BufferFull(Exception):
+    pass
+
+
+# Копит одиночные продажи и сбрасывает их одной транзакцией по размеру или по таймеру
+class SalesBuffer:
+    def __init__(self, flush_size=BUFFER_FLUSH_SIZE, flush_interval=BUFFER_FLUSH_INTERVAL,
+                 max_size=BUFFER_MAX_SIZE):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self._items = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._thread = None
+        self._stats = {"accepted": 0, "rejected": 0, "flushed": 0, "flushes": 0, "dropped": 0}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sales-buffer", daemon=True)
+        self._thread.start()
+
+    def add(self, rows):
+        with self._cond:
+            if self._closed or len(self._items) + len(rows) > self.max_size:
+                self._stats["rejected"] += len(rows)
+                raise BufferFull("Буфер продаж переполнен")
+            self._items.extend(rows)
+            self._stats["accepted"] += len(rows)
+            if len(self._items) >= self.flush_size:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._closed and len(self._items) < self.flush_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._cond:
+                rows, self._items = self._items, []
+            if not rows:
+                return
+            try:
+                with connection() as conn:
+                    write_sales(conn, rows)
+            except Exception as e:
+                print(f"Ошибка записи пачки продаж, пишем построчно: {e}")
+                self._write_one_by_one(rows)
+            changefeed.notify()
+            with self._cond:
+                self._stats["flushed"] += len(rows)
+                self._stats["flushes"] += 1
+
+    def _write_one_by_one(self, rows):
+        for row in rows:
+            try:
+                with connection() as conn:
+                    write_sales(conn, [row])
+            except Exception as e:
+                print(f"Продажа отброшена: {row}: {e}")
+                with self._cond:
+                    self._stats["dropped"] += 1
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._items)
+        return stats
+
+
+buffer = None
+if BUFFER_ENABLED:
+    buffer = SalesBuffer()
+    buffer.start()
+    atexit.register(buffer.close)
@@ -0,0 +1,218 @@
+import heapq
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from db import connection
+from response_cache import versions
+
+# Распределение планового ТО между сотрудниками на SCHEDULE_HORIZON_DAYS дней вперёд.
+# Задача — аппарат, у которого DateOfNextFixing попадает в горизонт (или уже прошла), а ТО ещё не сделано.
+HORIZON_DAYS = int(os.environ.get('SCHEDULE_HORIZON_DAYS', 14))
+HOURS_PER_DAY = float(os.environ.get('SCHEDULE_HOURS_PER_DAY', 8))
+# Роли сотрудников, которым назначаются работы; по умолчанию те же, что у исполнителей
+# в истории работ. Если ни у кого нет этих ролей, план не строится и GET /Schedule отвечает ошибкой
+ROLES = tuple(role.strip() for role in os.environ.get('SCHEDULE_ROLES', 'Оператор,Администратор').split(',')
+              if role.strip())
+# Запись в Maintenance закрывает задачу, если сделана не раньше чем за столько дней до срока
+CLOSE_EARLY_DAYS = 30
+DEFAULT_TASK_HOURS = 4
+
+# Полный пересчёт — при смене дня, изменении аппаратов, сотрудников или записей ТО и не реже
+# чем раз в REBUILD_INTERVAL секунд. Запись ТО своим POST, если других изменений не было,
+# пересчитывает план частично.
+TABLES = ("VendingMachines", "Users", "Maintenance")
+REBUILD_INTERVAL = float(os.environ.get('SCHEDULE_REBUILD_INTERVAL', 300))
+
+
+class Schedule:
+    def __init__(self, today, technicians, tasks):
+        self.today = today
+        self.technicians = technicians
+        # MachineID → задача; day — номер дня от today, None — не хватило времени в горизонте
+        self.tasks = tasks
+        self.used = {}
+        self.load = {user_id: 0.0 for user_id in technicians}
+        self._assign_all()
+
+    def _fits(self, used, hours):
+        # Задача длиннее рабочего дня занимает отдельный день целиком
+        return used + hours <= HOURS_PER_DAY or used == 0
+
+    # День за днём: задачи берутся из очереди по возрастанию срока, сотрудники — из очереди
+    # (занято в этот день, общая загрузка). Задача, которой не нашлось места, ждёт следующего дня.
+    def _assign_all(self):
+        for task in self.tasks.values():
+            task["UserID"] = task["day"] = None
+        pending = [(task["DueDate"], task["MachineID"]) for task in self.tasks.values()]
+        heapq.heapify(pending)
+        for day in range(HORIZON_DAYS):
+            if not pending or not self.technicians:
+                break
+            staff = [(0.0, self.load[user_id], user_id) for user_id in self.technicians]
+            deferred = []
+            while pending and staff:
+                item = heapq.heappop(pending)
+                task = self.tasks[item[1]]
+                busy = []
+                while staff:
+                    used, load, user_id = heapq.heappop(staff)
+                    if self._fits(used, task["Hours"]):
+                        self._place(task, user_id, day)
+                        heapq.heappush(staff, (used + task["Hours"], load + task["Hours"], user_id))
+                        break
+                    busy.append((used, load, user_id))
+                else:
+                    deferred.append(item)
+                # Полностью занятые сотрудники до конца дня больше не рассматриваются
+                for entry in busy:
+                    if entry[0] < HOURS_PER_DAY:
+                        heapq.heappush(staff, entry)
+            pending.extend(deferred)
+            heapq.heapify(pending)
+
+    def _place(self, task, user_id, day):
+        task["UserID"], task["day"] = user_id, day
+        self.used[(user_id, day)] = self.used.get((user_id, day), 0.0) + task["Hours"]
+        self.load[user_id] += task["Hours"]
+
+    def _free(self, task):
+        key = (task["UserID"], task["day"])
+        self.used[key] -= task["Hours"]
+        self.load[task["UserID"]] -= task["Hours"]
+        task["UserID"] = task["day"] = None
+        return key
+
+    # Задача закрыта: освободившееся время занимает самая срочная из задач, назначенных позже
+    # или не назначенных вовсе; её прежний слот освобождается, и так по цепочке
+    def close(self, machine_id):
+        task = self.tasks.pop(machine_id, None)
+        if task is None or task["day"] is None:
+            return
+        freed = [self._free(task)]
+        while freed:
+            user_id, day = freed.pop()
+            room = self.used[(user_id, day)]
+            candidates = [t for t in self.tasks.values()
+                          if (t["day"] is None or t["day"] > day) and self._fits(room, t["Hours"])]
+            if not candidates:
+                continue
+            moved = min(candidates, key=lambda t: (t["DueDate"], t["MachineID"]))
+            if moved["day"] is not None:
+                freed.append(self._free(moved))
+            self._place(moved, user_id, day)
+            freed.append((user_id, day))
+
+    def to_dict(self):
+        plans = {user_id: [] for user_id in self.technicians}
+        unassigned = []
+        for task in sorted(self.tasks.values(), key=lambda t: (t["day"] is None, t["day"] or 0, t["DueDate"])):
+            item = {
+                "MachineID": task["MachineID"],
+                "Location": task["Location"],
+                "Model": task["Model"],
+                "DueDate": task["DueDate"],
+                "Overdue": task["DueDate"] < self.today,
+                "Hours": task["Hours"],
+            }
+            if task["day"] is None:
+                unassigned.append(item)
+            else:
+                item["Date"] = self.today + timedelta(days=task["day"])
+                plans[task["UserID"]].append(item)
+        return {
+            "today": self.today,
+            "horizon_days": HORIZON_DAYS,
+            "hours_per_day": HOURS_PER_DAY,
+            "technicians": [{
+                "UserID": user_id,
+                "FullName": name,
+                "Hours": self.load[user_id],
+                "Tasks": plans[user_id],
+            } for user_id, name in self.technicians.items()],
+            "unassigned": unassigned,
+        }
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+
+def load(today):
+    horizon_end = today + timedelta(days=HORIZON_DAYS)
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""select UserID, FullName from Users
+                           where Role in ({', '.join('?' * len(ROLES))}) order by UserID""", ROLES)
+        technicians = {user_id: name for user_id, name in cursor.fetchall()}
+        if not technicians:
+            raise RuntimeError(f"Нет сотрудников с ролями {', '.join(ROLES)}: проверьте SCHEDULE_ROLES")
+        cursor.execute("""select vm.MachineID, vm.Location, vm.Model, vm.DateOfNextFixing,
+                                 vm.MaintenanceTimeHours, m.LastDone
+                          from VendingMachines vm
+                          left join (select MachineID, max(MaintenanceDate) as LastDone
+                                     from Maintenance group by MachineID) m on m.MachineID = vm.MachineID
+                          where vm.DateOfNextFixing < ?""", (horizon_end,))
+        tasks = {}
+        for machine_id, location, model, due, hours, last_done in cursor.fetchall():
+            due = _as_date(due)
+            if last_done is not None and _as_date(last_done) >= due - timedelta(days=CLOSE_EARLY_DAYS):
+                continue
+            tasks[machine_id] = {
+                "MachineID": machine_id, "Location": location, "Model": model,
+                "DueDate": due, "Hours": float(hours or DEFAULT_TASK_HOURS),
+            }
+        cursor.close()
+    return technicians, tasks
+
+
+_state = None
+_lock = threading.Lock()
+
+
+def _current(today):
+    key = (versions(*TABLES), today)
+    if _state is not None and _state[0] == key and time.monotonic() - _state[1] < REBUILD_INTERVAL:
+        return _state[2]
+    return None
+
+
+def plan():
+    global _state
+    today = date.today()
+    with _lock:
+        schedule = _current(today)
+        if schedule is None:
+            key = (versions(*TABLES), today)
+            schedule = Schedule(today, *load(today))
+            _state = (key, time.monotonic(), schedule)
+        return schedule.to_dict()
+
+
+# Вызывается POST /Maintenance после commit: закрывает задачу аппарата без полного пересчёта.
+# План догоняется, только если с его построения версия Maintenance выросла ровно на эту запись,
+# а остальные таблицы не менялись; иначе следующий запрос пересчитает план целиком
+def maintenance_done(machine_id, maintenance_date):
+    global _state
+    with _lock:
+        today = date.today()
+        if _state is None or time.monotonic() - _state[1] >= REBUILD_INTERVAL:
+            return
+        (machines, users, maintenance), built_for = _state[0]
+        current = versions(*TABLES)
+        if built_for != today or current != (machines, users, maintenance + 1):
+            return
+        try:
+            done = _as_date(maintenance_date)
+        except ValueError:
+            return
+        schedule = _state[2]
+        task = schedule.tasks.get(machine_id)
+        if task is not None and done >= task["DueDate"] - timedelta(days=CLOSE_EARLY_DAYS):
+            schedule.close(machine_id)
+        _state = ((current, today), _state[1], schedule)
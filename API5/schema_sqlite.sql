@@ -0,0 +1,153 @@
+-- Схема bd.sql для локального бэкенда SQLite (DB_BACKEND=sqlite).
+-- Типы date/datetime2 объявлены как DATE/DATETIME, чтобы sqlite3 возвращал объекты дат.
+
+CREATE TABLE IF NOT EXISTS Country (
+    CountryID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS MachineStatus (
+    StatusID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS PaymentType (
+    PaymentTypeID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS Users (
+    UserID INTEGER PRIMARY KEY AUTOINCREMENT,
+    FullName TEXT NOT NULL,
+    Contacts TEXT NOT NULL UNIQUE,
+    Role TEXT NOT NULL,
+    Password TEXT NOT NULL DEFAULT ''
+);
+
+CREATE TABLE IF NOT EXISTS Products (
+    ProductID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Name TEXT NOT NULL,
+    Description TEXT NULL,
+    Price NUMERIC NOT NULL CHECK (Price > 0),
+    InStock INTEGER NOT NULL CHECK (InStock >= 0),
+    MinStock INTEGER NOT NULL CHECK (MinStock >= 0),
+    PropensityToSell NUMERIC NULL
+);
+
+CREATE TABLE IF NOT EXISTS VendingMachines (
+    MachineID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Location TEXT NOT NULL,
+    Model TEXT NOT NULL,
+    PaymentTypeID INTEGER NOT NULL REFERENCES PaymentType (PaymentTypeID),
+    FullIncome NUMERIC NOT NULL DEFAULT 0,
+    SerialNumber TEXT NOT NULL UNIQUE,
+    InventoryNumber TEXT NOT NULL UNIQUE,
+    Manufacturer TEXT NOT NULL,
+    ManufactureDate DATE NOT NULL,
+    InsertDate DATE NOT NULL DEFAULT (date('now')),
+    DateOfCommissioning DATE NOT NULL,
+    LastVerificationDate DATE NOT NULL,
+    VerificationInterval INTEGER NULL,
+    ResourceHours INTEGER NOT NULL CHECK (ResourceHours > 0),
+    DateOfNextFixing DATE NOT NULL,
+    MaintenanceTimeHours INTEGER NOT NULL CHECK (MaintenanceTimeHours BETWEEN 1 AND 20),
+    MachineStatusID INTEGER NOT NULL REFERENCES MachineStatus (StatusID),
+    CountryID INTEGER NOT NULL REFERENCES Country (CountryID),
+    InventoryDate DATE NOT NULL,
+    LastCheckedByUserID INTEGER NULL REFERENCES Users (UserID),
+    NextVerificationDate DATE GENERATED ALWAYS AS
+        (date(LastVerificationDate, '+' || VerificationInterval || ' months')) STORED
+);
+
+CREATE TABLE IF NOT EXISTS MachineProducts (
+    MachineID INTEGER NOT NULL REFERENCES VendingMachines (MachineID) ON DELETE CASCADE,
+    ProductID INTEGER NOT NULL REFERENCES Products (ProductID),
+    Quantity INTEGER NOT NULL CHECK (Quantity >= 0),
+    MinQuantity INTEGER NOT NULL DEFAULT 5 CHECK (MinQuantity >= 0),
+    NeedsRestock INTEGER GENERATED ALWAYS AS (Quantity < MinQuantity) STORED,
+    PRIMARY KEY (MachineID, ProductID)
+);
+
+CREATE TABLE IF NOT EXISTS Maintenance (
+    NoteID INTEGER PRIMARY KEY AUTOINCREMENT,
+    MachineID INTEGER NOT NULL REFERENCES VendingMachines (MachineID),
+    MaintenanceDate DATE NOT NULL,
+    Description TEXT NOT NULL,
+    Problems TEXT NULL,
+    DoneByUserID INTEGER NOT NULL REFERENCES Users (UserID)
+);
+
+CREATE TABLE IF NOT EXISTS Events (
+    EventID INTEGER PRIMARY KEY AUTOINCREMENT,
+    MachineID INTEGER NULL REFERENCES VendingMachines (MachineID),
+    EventType TEXT NOT NULL,
+    Message TEXT NOT NULL,
+    EventDateTime DATETIME NOT NULL DEFAULT (datetime('now'))
+);
+
+CREATE TABLE IF NOT EXISTS Sales (
+    SaleID INTEGER PRIMARY KEY AUTOINCREMENT,
+    MachineID INTEGER NOT NULL REFERENCES VendingMachines (MachineID),
+    ProductID INTEGER NOT NULL REFERENCES Products (ProductID),
+    Quantity INTEGER NOT NULL CHECK (Quantity > 0),
+    SaleSum NUMERIC NOT NULL CHECK (SaleSum >= 0),
+    SaleDateTime DATETIME NOT NULL DEFAULT (datetime('now')),
+    PaymentTypeID INTEGER NOT NULL REFERENCES PaymentType (PaymentTypeID)
+);
+
+CREATE TABLE IF NOT EXISTS SalesRollup (
+    Granularity TEXT NOT NULL CHECK (Granularity IN ('D', 'H')),
+    PeriodStart DATETIME NOT NULL,
+    MachineID INTEGER NOT NULL,
+    ProductID INTEGER NOT NULL,
+    PaymentTypeID INTEGER NOT NULL,
+    SaleCount INTEGER NOT NULL,
+    Quantity INTEGER NOT NULL,
+    SaleSum NUMERIC NOT NULL,
+    PRIMARY KEY (Granularity, PeriodStart, MachineID, ProductID, PaymentTypeID)
+);
+
+CREATE TABLE IF NOT EXISTS ChangeLog (
+    ChangeID INTEGER PRIMARY KEY AUTOINCREMENT,
+    TableName TEXT NOT NULL,
+    Operation TEXT NOT NULL CHECK (Operation IN ('I', 'U', 'D')),
+    Payload TEXT NOT NULL,
+    ChangedAt DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS Jobs (
+    JobID TEXT PRIMARY KEY,
+    Kind TEXT NOT NULL,
+    Status TEXT NOT NULL,
+    Total INTEGER NOT NULL DEFAULT 0,
+    Done INTEGER NOT NULL DEFAULT 0,
+    Processed INTEGER NOT NULL DEFAULT 0,
+    ErrorsCount INTEGER NOT NULL DEFAULT 0,
+    Errors TEXT,
+    Error TEXT,
+    Result TEXT,
+    CreatedAt DATETIME NOT NULL,
+    FinishedAt DATETIME,
+    UpdatedAt DATETIME NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS RevokedTokens (
+    Jti TEXT PRIMARY KEY,
+    ExpiresAt DATETIME NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS TableVersions (
+    TableName TEXT PRIMARY KEY,
+    Version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS IX_Sales_SaleDateTime ON Sales (SaleDateTime DESC, SaleID DESC);
+CREATE INDEX IF NOT EXISTS IX_Sales_Machine_SaleDateTime ON Sales (MachineID, SaleDateTime DESC, SaleID DESC);
+CREATE INDEX IF NOT EXISTS IX_Sales_Product_SaleDateTime ON Sales (ProductID, SaleDateTime DESC, SaleID DESC);
+CREATE INDEX IF NOT EXISTS IX_Sales_PaymentType_SaleDateTime ON Sales (PaymentTypeID, SaleDateTime DESC, SaleID DESC);
+CREATE INDEX IF NOT EXISTS IX_Events_EventDateTime ON Events (EventDateTime);
+CREATE INDEX IF NOT EXISTS IX_Maintenance_MaintenanceDate ON Maintenance (MaintenanceDate);
+CREATE INDEX IF NOT EXISTS IX_Maintenance_Machine_MaintenanceDate ON Maintenance (MachineID, MaintenanceDate);
+CREATE INDEX IF NOT EXISTS IX_VendingMachines_DateOfNextFixing ON VendingMachines (DateOfNextFixing);
+CREATE INDEX IF NOT EXISTS IX_VendingMachines_NextVerificationDate ON VendingMachines (NextVerificationDate);
+CREATE INDEX IF NOT EXISTS IX_MachineProducts_NeedsRestock ON MachineProducts (NeedsRestock, MachineID, ProductID);
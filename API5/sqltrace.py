@@ -0,0 +1,77 @@
+import json
+import logging
+import os
+import re
+from datetime import datetime
+
+from flask import has_request_context, request
+
+# Запросы дольше порога пишутся в журнал медленных запросов (JSON, по строке на запрос)
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG', 'slow_queries.log')
+# SQL_TRACE=1 — писать в журнал все запросы, а не только медленные
+TRACE_ALL = os.environ.get('SQL_TRACE', '0') == '1'
+# Один и тот же текст запроса столько раз за одно взятие соединения — признак запроса на каждую строку
+REPEAT_THRESHOLD = int(os.environ.get('SQL_REPEAT_THRESHOLD', 50))
+
+logger = logging.getLogger('sql.slow')
+logger.setLevel(logging.INFO)
+logger.propagate = False
+if SLOW_QUERY_LOG and not logger.handlers:
+    _handler = logging.FileHandler(SLOW_QUERY_LOG, encoding='utf-8', delay=True)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+
+_spaces = re.compile(r'\s+')
+
+
+def normalize(sql):
+    return _spaces.sub(' ', sql).strip()
+
+
+# Числа и даты оставляем, строки скрываем: среди них пароли и контакты
+def redact(params):
+    if params and len(params) == 1 and isinstance(params[0], (list, tuple)):
+        params = params[0]
+    redacted = []
+    for value in params:
+        if value is None or isinstance(value, (bool, int, float)):
+            redacted.append(value)
+        elif isinstance(value, str):
+            redacted.append(f"<str:{len(value)}>")
+        else:
+            redacted.append(f"<{type(value).__name__}>")
+    return redacted
+
+
+def _write(kind, sql, params, execute_s, fetch_s, rows, **extra):
+    entry = {
+        "ts": datetime.now().isoformat(timespec='milliseconds'),
+        "kind": kind,
+        "duration_ms": round((execute_s + fetch_s) * 1000, 3),
+        "execute_ms": round(execute_s * 1000, 3),
+        "fetch_ms": round(fetch_s * 1000, 3),
+        "rows": rows,
+        "sql": normalize(sql),
+        "params": params,
+    }
+    if has_request_context():
+        entry["endpoint"] = f"{request.method} {request.path}"
+    entry.update(extra)
+    logger.info(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+# Вызывается курсором, когда выполнение и выборка по запросу закончены.
+# many — executemany: параметры пачки не пишем, только её размер.
+def statement(sql, params, execute_s, fetch_s, rows, many, repeats):
+    duration_ms = (execute_s + fetch_s) * 1000
+    slow = duration_ms >= SLOW_QUERY_MS
+    if slow or TRACE_ALL:
+        if many:
+            shown = {"batch": len(params[0]) if params else 0}
+        else:
+            shown = redact(params)
+        _write("slow" if slow else "trace", sql, shown, execute_s, fetch_s, rows)
+    if repeats[sql] == REPEAT_THRESHOLD:
+        _write("repeated", sql, None, execute_s, fetch_s, rows, repeats=REPEAT_THRESHOLD,
+               hint="один и тот же запрос на каждую строку — стоит заменить пакетным")
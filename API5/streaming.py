@@ -0,0 +1,41 @@
+from flask import Response, current_app, request, stream_with_context
+
+from encoding import RowEncoder, columns, wants_columnar
+from workers import hold_connection
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+BATCH_SIZE = 500
+
+
+def wants_stream():
+    if request.args.get('stream') == '1':
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+# Отдаёт строки курсора по одной JSON-строке, подтягивая их пачками через fetchmany.
+# Имена полей берутся из cursor.description. В колоночном формате первая строка —
+# {"columns": [...]}, дальше по массиву значений на запись.
+# Соединение и курсор закрываются, когда генератор дочитан или клиент отключился;
+# до этого ответ занимает место соединения в workers.
+# resolve — необязательная функция из refdata.resolver для подстановки названий.
+def stream_rows(conn, cursor, resolve=None, batch_size=BATCH_SIZE):
+    dumps = current_app.json.dumps
+    encoder = RowEncoder(columns(cursor), resolve)
+    columnar = wants_columnar()
+    encode = encoder.values if columnar else encoder.record
+
+    def generate():
+        try:
+            if columnar:
+                yield dumps({"columns": list(encoder.keys)}) + '\n'
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield ''.join(dumps(encode(row)) + '\n' for row in rows)
+        finally:
+            cursor.close()
+            conn.close()
+
+    return hold_connection(Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE))
@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+
+from db import DB_BACKEND, connection
+
+# Версии таблиц общие для всех процессов и хранятся в TableVersions. Процесс перечитывает их
+# не чаще раза в VERSION_CHECK_INTERVAL секунд: на столько запись через другой воркер может
+# запоздать в его кэше. 0 — читать версии на каждый запрос
+VERSION_CHECK_INTERVAL = float(os.environ.get('RESPONSE_CACHE_VERSION_CHECK', 1))
+
+BUMP_VERSION = {
+    'mssql': """MERGE TableVersions WITH (HOLDLOCK) AS t
+                USING (SELECT ? AS TableName) AS s ON t.TableName = s.TableName
+                WHEN MATCHED THEN UPDATE SET Version = t.Version + 1
+                WHEN NOT MATCHED THEN INSERT (TableName, Version) VALUES (s.TableName, 1);""",
+    'sqlite': """INSERT INTO TableVersions (TableName, Version) VALUES (?, 1)
+                 ON CONFLICT (TableName) DO UPDATE SET Version = Version + 1""",
+}
+
+# (момент чтения, {таблица: версия}) — последний снимок TableVersions
+_snapshot = None
+# Снимок, начатый раньше собственного commit с bump(), уже устарел
+_invalidated_at = 0.0
+_snapshot_lock = threading.Lock()
+
+
+def _invalidate():
+    global _snapshot, _invalidated_at
+    _invalidated_at = time.monotonic()
+    _snapshot = None
+
+
+def _fresh(snapshot):
+    return (snapshot is not None and snapshot[0] >= _invalidated_at
+            and time.monotonic() - snapshot[0] < VERSION_CHECK_INTERVAL)
+
+
+# Вызывается POST-обработчиками последним запросом перед commit: строка версии блокируется
+# до конца транзакции, поэтому её стоит держать как можно меньше. Таблицы идут в одном
+# порядке, чтобы параллельные транзакции не ждали друг друга по кругу
+def bump(conn, *tables):
+    cursor = conn.cursor()
+    try:
+        for table in sorted(set(tables)):
+            cursor.execute(BUMP_VERSION[DB_BACKEND], (table,))
+    finally:
+        cursor.close()
+    conn.after_commit(_invalidate)
+
+
+def _load_versions():
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT TableName, Version FROM TableVersions")
+        values = {table: version for table, version in cursor.fetchall()}
+        cursor.close()
+    return values
+
+
+def _current():
+    global _snapshot
+    snapshot = _snapshot
+    if _fresh(snapshot):
+        return snapshot[1]
+    with _snapshot_lock:
+        snapshot = _snapshot
+        if _fresh(snapshot):
+            return snapshot[1]
+        started = time.monotonic()
+        values = _load_versions()
+        _snapshot = (started, values)
+        return values
+
+
+# Версии таблиц для собственных кэшей модулей: меняются вместе с bump() в любом процессе
+def versions(*tables):
+    values = _current()
+    return tuple(values.get(table, 0) for table in tables)
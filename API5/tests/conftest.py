@@ -0,0 +1,46 @@
+import os
+import random
+import sys
+import tempfile
+
+# Тесты идут на отдельной SQLite-базе; переменные окружения должны быть заданы до импорта db
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="vending-tests-"), "test.db")
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ['DB_SQLITE_PATH'] = DB_PATH
+os.environ['EXPORT_DIR'] = os.path.join(os.path.dirname(DB_PATH), 'exports')
+os.environ.setdefault('AUTH_SECRET_KEY', 'test-secret')
+sys.path.insert(0, API_DIR)
+sys.path.insert(0, os.path.join(API_DIR, 'bench'))
+
+import pytest
+
+import seed
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    seed.seed(DB_PATH, machines=20, products=10, users=6, sales=200, days=30,
+              products_per_machine=5, rnd=random.Random(1))
+    return DB_PATH
+
+
+# Реплика для чтения — копия тестовой базы на момент вызова; дальше она отстаёт от основной
+@pytest.fixture
+def replica(monkeypatch, tmp_path):
+    import sqlite3
+
+    import db
+
+    path = str(tmp_path / "replica.db")
+    source = sqlite3.connect(DB_PATH)
+    target = sqlite3.connect(path)
+    source.backup(target)
+    source.close()
+    target.close()
+    router = db.ReadRouter(db.pool, [path])
+    monkeypatch.setattr(db, "reads", router)
+    monkeypatch.setattr(db, "DB_READ_REPLICAS", [path])
+    yield path
+    for _, replica_pool in router.replicas:
+        replica_pool.close_all()
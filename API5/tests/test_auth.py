@@ -0,0 +1,40 @@
+import pytest
+
+import auth
+import main
+
+
+# Выход через один воркер отзывает токен и в остальных: список читается из RevokedTokens
+def test_logout_revokes_token_in_other_workers():
+    client = main.create_app().test_client()
+    response = client.post("/api/v1/login", json={"contacts": "user1@example.com", "password": "password"})
+    assert response.status_code == 200
+    token = response.get_json()["token"]
+    claims = auth.verify(token)
+
+    response = client.post("/api/v1/logout", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+    # Другой процесс: в памяти список отозванных пуст, пока фоновый поток не перечитает его из БД
+    auth._revoked = frozenset()
+    auth._refresh_revoked()
+    assert claims["jti"] in auth._revoked
+    response = client.post("/api/v1/logout", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+
+
+# Проверка токена не обращается к БД
+def test_verify_without_database(monkeypatch):
+    main.create_app()
+    token = auth.issue(1, auth.OPERATOR)
+
+    def no_database():
+        raise AssertionError("verify обратился к БД")
+    monkeypatch.setattr(auth, "connection", no_database)
+    assert auth.verify(token)["uid"] == 1
+
+
+def test_app_requires_secret_key(monkeypatch):
+    monkeypatch.setattr(auth, "SECRET_KEY", None)
+    with pytest.raises(RuntimeError, match="AUTH_SECRET_KEY"):
+        main.create_app()
@@ -0,0 +1,34 @@
+from datetime import date, timedelta
+
+import db
+import main
+from GET.Calendar import UPCOMING_DAYS, due_status
+from response_cache import bump
+
+
+# Граница как в прежнем календаре: срок через 0..5 дней включительно — приближается
+def test_due_status_boundaries():
+    today = date(2026, 2, 16)
+    assert due_status(today - timedelta(days=1), today) == "overdue"
+    assert due_status(today, today) == "upcoming"
+    assert due_status(today + timedelta(days=UPCOMING_DAYS), today) == "upcoming"
+    assert due_status(today + timedelta(days=UPCOMING_DAYS + 1), today) == "planned"
+
+
+def test_calendar_for_machine():
+    due = date(2026, 2, 21)
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE VendingMachines SET DateOfNextFixing = ? WHERE MachineID = 3", (due,))
+        cursor.close()
+        bump(conn, "VendingMachines")
+
+    client = main.create_app().test_client()
+    response = client.get("/api/v1/Calendar?date_from=2026-01-01&date_to=2027-01-01&machine_id=3&today=2026-02-16")
+    assert response.status_code == 200
+    events = response.get_json()
+    assert {event["MachineID"] for event in events} == {3}
+    assert {"Date": "2026-02-21", "Type": "maintenance", "Status": "upcoming"}.items() <= \
+        next(event for event in events if event["Description"] == "Плановое ТО").items()
+
+    assert client.get("/api/v1/Calendar?date_from=2026-01-01&date_to=2028-01-01").status_code == 400
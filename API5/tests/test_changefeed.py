@@ -0,0 +1,62 @@
+import changefeed
+import db
+import main
+from GET import Changes
+
+
+def add_change(change_id):
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO ChangeLog (ChangeID, TableName, Operation, Payload) VALUES (?, 'Users', 'I', '{}')",
+                       (change_id,))
+        cursor.close()
+
+
+# Пропуск ждёт GAP_WAIT по времени записи следующей строки, а не по тому, когда его заметил процесс
+def test_gap_settles_by_row_age():
+    since = changefeed.latest() + 1
+    add_change(since)
+    add_change(since + 1)
+    add_change(since + 3)
+    changes, last_id = changefeed.read(since)
+    assert [change["id"] for change in changes] == [since + 1]
+    assert last_id == since + 1
+
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE ChangeLog SET ChangedAt = strftime('%Y-%m-%d %H:%M:%f', 'now', '-10 seconds') "
+                       "WHERE ChangeID = ?", (since + 3,))
+        cursor.close()
+    changes, last_id = changefeed.read(since + 1)
+    assert [change["id"] for change in changes] == [since + 3]
+    assert last_id == since + 3
+
+
+# С пустой ленты (since=0) номер, закоммиченный раньше меньшего, тоже ждёт пропуск
+def test_gap_from_empty_feed():
+    fresh, old = 0, 10 * 1000
+    rows = [(2, "Users", "I", "{}", None, fresh)]
+    assert changefeed._settled(rows, 0) == []
+    rows = [(1, "Users", "I", "{}", None, fresh)] + rows
+    assert [row[0] for row in changefeed._settled(rows, 0)] == [1, 2]
+    rows = [(5, "Users", "I", "{}", None, old), (7, "Users", "I", "{}", None, fresh)]
+    assert [row[0] for row in changefeed._settled(rows, 0)] == [5]
+
+
+# Сверх CHANGES_MAX_STREAMS поток не открывается, клиента отправляют на опрос
+def test_stream_limit():
+    client = main.create_app().test_client()
+    streams = [client.get("/api/v1/changes/stream?since=0") for _ in range(Changes.MAX_STREAMS)]
+    assert [response.status_code for response in streams] == [200] * Changes.MAX_STREAMS
+
+    response = client.get("/api/v1/changes/stream?since=0")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(Changes.POLL_RETRY_AFTER)
+    assert response.get_json()["poll_url"] == "/api/v1/changes?since=0"
+
+    streams.pop().close()
+    response = client.get("/api/v1/changes/stream?since=0")
+    assert response.status_code == 200
+    response.close()
+    for stream in streams:
+        stream.close()
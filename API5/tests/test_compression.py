@@ -0,0 +1,52 @@
+import gzip
+import re
+
+import main
+
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+def test_gzip_negotiation():
+    client = main.create_app().test_client()
+    plain = client.get("/api/v1/VendingMachines")
+    assert "Content-Encoding" not in plain.headers
+
+    packed = client.get("/api/v1/VendingMachines", headers=GZIP)
+    assert packed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in packed.headers["Vary"]
+    assert gzip.decompress(packed.get_data()) == plain.get_data()
+
+    # Сжатое представление получает слабый ETag, повторный запрос с ним — 304
+    etag = packed.headers["ETag"]
+    assert etag.startswith("W/")
+    assert client.get("/api/v1/VendingMachines", headers=dict(GZIP, **{"If-None-Match": etag})).status_code == 304
+
+    # Маленькие ответы не сжимаются
+    assert "Content-Encoding" not in client.get("/api/v1/Pool", headers=GZIP).headers
+
+
+def test_gzip_stream():
+    client = main.create_app().test_client()
+    plain = client.get("/api/v1/Products?stream=1")
+    body = plain.get_data()
+    plain.close()
+    packed = client.get("/api/v1/Products?stream=1", headers=GZIP)
+    assert packed.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(packed.get_data()) == body
+    packed.close()
+
+
+# index.html ссылается на статику с хэшем в имени; она отдаётся заранее сжатой и кэшируется навсегда
+def test_hashed_assets():
+    client = main.create_app().test_client()
+    index = client.get("/").get_data(as_text=True)
+    script = re.search(r'src="(/assets/script\.[0-9a-f]{10}\.js)"', index).group(1)
+
+    response = client.get(script, headers=GZIP)
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "immutable" in response.headers["Cache-Control"]
+    assert b"renderYearCalendar" in gzip.decompress(response.get_data())
+    etag = response.headers["ETag"]
+    assert client.get(script, headers=dict(GZIP, **{"If-None-Match": etag})).status_code == 304
+    assert client.get("/assets/script.0000000000.js").status_code == 404
@@ -0,0 +1,77 @@
+import threading
+from datetime import datetime
+
+import db
+import inventory
+import sales_ingest
+
+WRITERS = 8
+
+
+# Запускает target(i) одновременно в WRITERS потоках и возвращает пойманные исключения
+def run_concurrently(target):
+    barrier = threading.Barrier(WRITERS)
+    errors = []
+
+    def worker(i):
+        barrier.wait()
+        try:
+            target(i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(WRITERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def fetch(query, params):
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        cursor.close()
+    return rows
+
+
+# Параллельные продажи по ещё не существующему ключу агрегата: ни одна не теряется
+def test_concurrent_sales_share_new_rollup_key():
+    moment = datetime(2031, 1, 2, 10, 15)
+
+    def write(i):
+        with db.connection() as conn:
+            sales_ingest.write_sales(conn, [(1, 1, 2, 100, 1, moment.replace(minute=i))])
+
+    assert run_concurrently(write) == []
+    assert fetch("SELECT COUNT(*) FROM Sales WHERE SaleDateTime >= ?", (moment.replace(minute=0),)) == [(WRITERS,)]
+    for granularity in ('H', 'D'):
+        rows = fetch("""SELECT SaleCount, Quantity, SaleSum FROM SalesRollup
+                        WHERE Granularity = ? AND PeriodStart >= ? AND MachineID = 1
+                          AND ProductID = 1 AND PaymentTypeID = 1""",
+                     (granularity, datetime(2031, 1, 2)))
+        assert rows == [(WRITERS, 2 * WRITERS, 100 * WRITERS)]
+
+
+# Параллельная загрузка новой позиции в аппарат: ни одна транзакция не падает на первичном ключе,
+# а порог, переданный одной из загрузок, не затирается остальными
+def test_concurrent_stock_loads_create_position_once():
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM MachineProducts WHERE MachineID = 2")
+        cursor.close()
+
+    def load(i):
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            inventory.set_stock(cursor, 2, [(3, 10 + i, 7 if i == 0 else None), (1, i, None)])
+            cursor.close()
+
+    assert run_concurrently(load) == []
+    rows = fetch("SELECT ProductID, Quantity, MinQuantity FROM MachineProducts WHERE MachineID = 2 ORDER BY ProductID", ())
+    assert [product_id for product_id, _, _ in rows] == [1, 3]
+    assert rows[0][2] == inventory.DEFAULT_MIN_QUANTITY
+    assert rows[1][1] in range(10, 10 + WRITERS)
+    assert rows[1][2] == 7
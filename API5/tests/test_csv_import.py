@@ -0,0 +1,70 @@
+import io
+
+import pandas as pd
+
+import changefeed
+import db
+from POST.vendingMachines import import_dataframe
+
+HEADER = ("Location,Model,PaymentTypeID,SerialNumber,InventoryNumber,Manufacturer,ManufactureDate,"
+          "DateOfCommissioning,LastVerificationDate,ResourceHours,DateOfNextFixing,MachineStatusID,CountryID")
+
+
+def row(location, payment, serial, inventory):
+    return f"{location},M-1,{payment},{serial},{inventory},Bench,2024-01-01,2024-01-02,2024-02-01,100,2030-01-01,1,1"
+
+
+def fetch(query, params):
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        cursor.close()
+    return rows
+
+
+# Пачка CSV проверяется по колонкам: неверные поля, пустые обязательные поля и дубли отсекаются по номеру строки
+def test_import_dataframe_validates_columns():
+    existing = fetch("SELECT SerialNumber FROM VendingMachines WHERE MachineID = 1", ())[0][0]
+    lines = [
+        row("Казань", 1, "CSV-1", "CSV-INV-1"),
+        row("Казань", "abc", "CSV-2", "CSV-INV-2"),
+        row("", 1, "CSV-3", "CSV-INV-3"),
+        row("Казань", 2, "CSV-1", "CSV-INV-4"),
+        row("Казань", 2, existing, "CSV-INV-5"),
+        row("Самара", 3, 6006, "CSV-INV-6"),
+        row("Самара", 10.7, "CSV-7", "CSV-INV-7"),
+    ]
+    df = pd.read_csv(io.StringIO("\n".join([HEADER] + lines)))
+    with db.connection() as conn:
+        success, errors = import_dataframe(conn, df)
+
+    assert success == 2
+    assert errors == [
+        "Строка 3: Поле PaymentTypeID: ожидается целое число",
+        "Строка 4: Не заполнено поле Location",
+        "Строка 5: Дублирование в файле",
+        "Строка 6: Дублирование",
+        "Строка 8: Поле PaymentTypeID: ожидается целое число",
+    ]
+    rows = fetch("""SELECT SerialNumber, Location, PaymentTypeID, FullIncome, VerificationInterval, MaintenanceTimeHours
+                    FROM VendingMachines WHERE InventoryNumber IN ('CSV-INV-1', 'CSV-INV-6') ORDER BY SerialNumber""", ())
+    assert rows == [("6006", "Самара", 3, 0, 6, 4), ("CSV-1", "Казань", 1, 0, 6, 4)]
+
+
+# Изменения из пачки CSV и из построчного повтора несут MachineID, чтобы клиент сопоставил их с U/D
+def test_import_records_machine_ids():
+    since = changefeed.latest()
+    lines = [row("Тверь", 1, "CSV-FEED-1", "CSV-FEED-INV-1"), row("Тверь", 1, "CSV-FEED-2", "CSV-FEED-INV-2")]
+    with db.connection() as conn:
+        assert import_dataframe(conn, pd.read_csv(io.StringIO("\n".join([HEADER] + lines))))[0] == 2
+
+    # Пачка с ошибкой вставки (нет такого PaymentTypeID) повторяется построчно
+    lines = [row("Тверь", 1, "CSV-FEED-3", "CSV-FEED-INV-3"), row("Тверь", 999, "CSV-FEED-4", "CSV-FEED-INV-4")]
+    with db.connection() as conn:
+        success, errors = import_dataframe(conn, pd.read_csv(io.StringIO("\n".join([HEADER] + lines))))
+
+    ids = dict(fetch("SELECT SerialNumber, MachineID FROM VendingMachines WHERE SerialNumber LIKE 'CSV-FEED-%'", ()))
+    changes = [change["data"] for change in changefeed.read(since)[0] if change["table"] == "VendingMachines"]
+    assert {change["SerialNumber"]: change["MachineID"] for change in changes} == ids
+    assert len(ids) == 2 + success
@@ -0,0 +1,43 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import main
+from encoding import FastJSONProvider, RowEncoder
+from refdata import lookup, resolver
+
+
+def test_row_encoder_resolves_selected_fields():
+    resolve = resolver({"ProductName": "Products", "PaymentTypeName": "PaymentType"})
+    encoder = RowEncoder(("SaleID", "ProductName"), resolve)
+    products = lookup("Products")
+    product_id = next(iter(products))
+    assert encoder.record((7, product_id)) == {"SaleID": 7, "ProductName": products[product_id]}
+    assert encoder.encode([(7, product_id)], columnar=True) == {
+        "columns": ["SaleID", "ProductName"], "rows": [[7, products[product_id]]]}
+    # Справочник способов оплаты не загружается: поля нет в выборке
+    assert [table for _, table, _ in encoder.lookups] == ["Products"]
+
+
+# Колоночный ответ несёт те же данные, что и обычный
+def test_columnar_matches_records():
+    client = main.create_app().test_client()
+    records = client.get("/api/v1/Products").get_json()
+    columnar = client.get("/api/v1/Products?format=columnar").get_json()
+    assert [dict(zip(columnar["columns"], row)) for row in columnar["rows"]] == records
+
+    stream = client.get("/api/v1/Products?format=columnar&stream=1")
+    lines = [json.loads(line) for line in stream.get_data().splitlines()]
+    stream.close()
+    assert lines[0] == {"columns": columnar["columns"]}
+    assert lines[1:] == columnar["rows"]
+
+
+# Формат значений не зависит от того, установлен ли orjson
+def test_fast_provider_matches_default():
+    app = Flask(__name__)
+    value = {"date": date(2026, 1, 2), "at": datetime(2026, 1, 2, 3, 4, 5), "sum": Decimal("1.50"), "name": "Кофе"}
+    assert json.loads(FastJSONProvider(app).dumps(value)) == json.loads(DefaultJSONProvider(app).dumps(value))
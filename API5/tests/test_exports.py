@@ -0,0 +1,29 @@
+import os
+import time
+
+import exports
+import main
+
+
+# Фоновая выгрузка пишет файл в свой каталог и отдаётся как есть, без сжатия в памяти
+def test_background_export_file():
+    client = main.create_app().test_client()
+    response = client.post("/api/v1/Sales/export", json={"format": "csv", "date_to": "2030-01-01"})
+    assert response.status_code == 202
+    status_url = response.get_json()["status_url"]
+
+    for _ in range(100):
+        status = client.get(status_url).get_json()
+        if status["status"] in ("done", "failed"):
+            break
+        time.sleep(0.1)
+    assert status["status"] == "done"
+    assert status["processed"] == 200
+
+    response = client.get(status["download_url"], headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert int(response.headers["Content-Length"]) == status["size"]
+    assert response.get_data().decode("utf-8-sig").count("\n") == 201
+    response.close()
+    assert [name.split("_")[1] for name in os.listdir(exports.EXPORT_DIR)] == [status["id"]]
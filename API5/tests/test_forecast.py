@@ -0,0 +1,12 @@
+import main
+
+
+def test_forecast_rejects_invalid_ids():
+    client = main.create_app().test_client()
+    assert client.get("/api/v1/Forecast?machine_id=abc").status_code == 400
+    assert client.get("/api/v1/Forecast?product_id=1.5").status_code == 400
+    assert client.get("/api/v1/Forecast?by_days=x").status_code == 400
+
+    response = client.get("/api/v1/Forecast?machine_id=1")
+    assert response.status_code == 200
+    assert {row["MachineID"] for row in response.get_json()} <= {1}
@@ -0,0 +1,17 @@
+import inventory
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.params = None
+
+    def executemany(self, query, params):
+        self.params = params
+
+
+# Списание блокирует строки MachineProducts по возрастанию (MachineID, ProductID), а не в порядке запроса
+def test_consume_locks_rows_in_key_order():
+    cursor = RecordingCursor()
+    # (ProductID, MachineID, Quantity) — начало кортежа parse_sale
+    inventory.consume(cursor, [(5, 2, 1), (3, 2, 1), (9, 1, 2), (5, 2, 4)])
+    assert cursor.params == [(2, 2, 1, 9), (1, 1, 2, 3), (5, 5, 2, 5)]
@@ -0,0 +1,45 @@
+import threading
+import time
+
+import jobs
+
+
+def forget(job_id):
+    with jobs._lock:
+        del jobs._jobs[job_id]
+
+
+# Статус задачи читается из Jobs тем процессом, который её не запускал
+def test_job_status_visible_to_other_workers():
+    started = threading.Event()
+    release = threading.Event()
+
+    def target(job):
+        job.progress(50, 10, [(2, "Дублирование")])
+        job.save(force=True)
+        started.set()
+        release.wait(10)
+        job.result = {"filename": "sales.csv"}
+
+    job = jobs.submit("test", target, total=100)
+    assert started.wait(10)
+    forget(job.id)
+    running = jobs.get(job.id).to_dict()
+    assert running["status"] == "running"
+    assert running["progress"] == 50.0
+    assert running["processed"] == 10
+    assert running["errors"] == [[2, "Дублирование"]]
+
+    release.set()
+    for _ in range(100):
+        status = jobs.get(job.id)
+        if status.status == "done":
+            break
+        time.sleep(0.1)
+    assert status.status == "done"
+    assert status.result == {"filename": "sales.csv"}
+    assert status.finished is not None
+
+
+def test_unknown_job():
+    assert jobs.get("0" * 32) is None
@@ -0,0 +1,21 @@
+import db
+import machine_search
+from response_cache import bump
+
+
+# Аппарат, добавленный другим воркером, находится сразу после смены версии VendingMachines
+def test_search_catches_up_with_other_workers():
+    machine_search.current()
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA table_info(VendingMachines)")
+        columns = [row[1] for row in cursor.fetchall() if row[1] not in ("MachineID", "SerialNumber", "InventoryNumber")]
+        cursor.execute(f"""INSERT INTO VendingMachines ({', '.join(columns)}, SerialNumber, InventoryNumber)
+                           SELECT {', '.join(columns)}, 'ZX-900417', 'INV-ZX-900417' FROM VendingMachines WHERE MachineID = 1""")
+        cursor.close()
+        bump(conn, "VendingMachines")
+
+    total, items = machine_search.search("zx-900417")
+    assert total == 1
+    assert items[0]["SerialNumber"] == "ZX-900417"
+    assert items[0]["MachineID"] == machine_search._index.loaded_id
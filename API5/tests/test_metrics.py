@@ -0,0 +1,40 @@
+import uuid
+
+import main
+import metrics
+
+
+def sample(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_histogram_buckets():
+    histogram = metrics.Histogram((1, 10))
+    for value in (0.5, 1, 5, 50):
+        histogram.observe(value)
+    # Граница входит в свою корзину, как le в Prometheus
+    assert histogram.counts == [2, 1, 1]
+    assert (histogram.count, histogram.sum) == (4, 56.5)
+
+
+# Запрос попадает в счётчик своего blueprint, строки и время SQL — в его гистограммы
+def test_request_metrics_per_blueprint():
+    client = main.create_app().test_client()
+    before = client.get("/metrics").get_data(as_text=True)
+
+    # Уникальный адрес — промах кэша, то есть настоящий запрос к БД
+    response = client.get(f"/api/v1/Users?nocache={uuid.uuid4().hex}")
+    users = len(response.get_json())
+    response.close()
+
+    after = client.get("/metrics").get_data(as_text=True)
+    assert sample(after, 'api_requests_total{blueprint="get_users",status="200"}') == \
+        sample(before, 'api_requests_total{blueprint="get_users",status="200"}') + 1
+    assert sample(after, 'api_rows_sum{blueprint="get_users"}') >= \
+        sample(before, 'api_rows_sum{blueprint="get_users"}') + users
+    assert sample(after, 'api_db_execute_seconds_count{blueprint="get_users"}') == \
+        sample(before, 'api_db_execute_seconds_count{blueprint="get_users"}') + 1
+    assert sample(after, 'db_pool_connections{state="size"}') >= 1
@@ -0,0 +1,79 @@
+import sqlite3
+
+import pytest
+
+import db
+import main
+
+
+def memory_pool(**options):
+    return db.ConnectionPool(lambda: sqlite3.connect(":memory:", check_same_thread=False), **options)
+
+
+# close() возвращает соединение в пул, следующий запрос берёт то же соединение
+def test_connection_is_reused():
+    pool = memory_pool(min_size=0, max_size=2)
+    first = pool.acquire()
+    raw = first._raw
+    first.close()
+    second = pool.acquire()
+    assert second._raw is raw
+    second.close()
+    stats = pool.stats()
+    assert stats["created"] == 1
+    assert stats["checkouts"] == 2
+    assert stats["in_use"] == 0
+
+
+def test_exhausted_pool_times_out():
+    pool = memory_pool(min_size=0, max_size=1, timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(db.PoolTimeout):
+        pool.acquire()
+    assert pool.stats()["timeouts"] == 1
+    held.close()
+    pool.acquire().close()
+
+
+# Незавершённая транзакция откатывается при возврате, а не достаётся следующему запросу
+def test_release_rolls_back():
+    pool = memory_pool(min_size=0, max_size=1)
+    with pool.acquire() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+    conn = pool.acquire()
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.close()
+    conn = pool.acquire()
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    conn.close()
+
+
+# Соединение, умершее в пуле, отбрасывается при выдаче
+def test_broken_idle_connection_is_replaced():
+    pool = memory_pool(min_size=0, max_size=1, check_after=0)
+    conn = pool.acquire()
+    raw = conn._raw
+    conn.close()
+    raw.close()
+    conn = pool.acquire()
+    assert conn._raw is not raw
+    conn.close()
+    assert pool.stats()["broken"] == 1
+
+
+def test_after_commit_skipped_on_rollback():
+    pool = memory_pool(min_size=0, max_size=1)
+    called = []
+    conn = pool.acquire()
+    conn.after_commit(lambda: called.append("rollback"))
+    conn.rollback()
+    conn.after_commit(lambda: called.append("commit"))
+    conn.commit()
+    conn.close()
+    assert called == ["commit"]
+
+
+def test_pool_endpoint():
+    stats = main.create_app().test_client().get("/api/v1/Pool").get_json()
+    assert stats["max_size"] == db.POOL_MAX_SIZE
+    assert stats["checkouts"] > 0
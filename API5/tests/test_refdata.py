@@ -0,0 +1,19 @@
+import db
+import refdata
+import table_versions
+
+
+# Переименование через другой воркер видно по версии в TableVersions, без ожидания REFDATA_TTL
+def test_names_follow_table_versions():
+    product_id, old_name = next(iter(refdata.lookup("Products").items()))
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE Products SET Name = ? WHERE ProductID = ?", (old_name + " (новое)", product_id))
+        # Другой процесс: версия растёт в БД, а свой after_commit в этом процессе не срабатывает
+        cursor.execute(table_versions.BUMP_VERSION[db.DB_BACKEND], ("Products",))
+        cursor.close()
+    assert refdata._cache["Products"][2][product_id] == old_name
+
+    # Прошло RESPONSE_CACHE_VERSION_CHECK: процесс перечитал TableVersions
+    table_versions._snapshot = None
+    assert refdata.name("Products", product_id) == old_name + " (новое)"
@@ -0,0 +1,65 @@
+import json
+
+import consistency
+import db
+import main
+from response_cache import bump
+
+
+def rename_product(product_id, name):
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE Products SET Name = ? WHERE ProductID = ?", (name, product_id))
+        cursor.close()
+        bump(conn, "Products")
+
+
+def product_names(response):
+    return {product["Name"] for product in response.get_json()}
+
+
+# Кэш заполняется из основной БД: отстающая реплика не попадает в ответ под новой версией
+def test_cache_fill_reads_primary(replica):
+    client = main.create_app().test_client()
+    rename_product(1, "Товар после записи")
+    assert "Товар после записи" in product_names(client.get("/api/v1/Products"))
+
+
+
+def streamed_names(client, headers=None):
+    # Потоковый ответ идёт в обход кэша, поэтому показывает, из какой БД читал запрос
+    response = client.get("/api/v1/Products?stream=1", headers=headers)
+    names = {json.loads(line)["Name"] for line in response.get_data().splitlines()}
+    response.close()
+    return names
+
+
+def test_reads_go_to_replica(replica):
+    client = main.create_app().test_client()
+    rename_product(2, "Только в основной")
+    assert "Только в основной" not in streamed_names(client)
+    assert "Только в основной" in streamed_names(client, {"X-Read-Your-Writes": "1"})
+    assert db.replica_stats()[replica]["size"] >= 1
+
+
+# После своей записи клиент по cookie читает из основной БД
+def test_read_your_writes_after_post(replica):
+    client = main.create_app().test_client()
+    rename_product(3, "Записано клиентом")
+    response = client.post("/api/v1/Sales", json={"ProductID": 3, "MachineID": 1, "Quantity": 1, "SaleSum": 100,
+                                                   "PaymentTypeID": 1, "SaleDateTime": "2031-02-01T10:00:00"})
+    assert response.status_code == 201
+    assert consistency.COOKIE in response.headers["Set-Cookie"]
+    assert "Записано клиентом" in streamed_names(client)
+
+
+# Недоступная реплика пропускается, чтение уходит в основную БД
+def test_unavailable_replica(monkeypatch, tmp_path):
+    missing = str(tmp_path / "нет" / "replica.db")
+    router = db.ReadRouter(db.pool, [missing])
+    monkeypatch.setattr(db, "reads", router)
+    monkeypatch.setattr(db, "DB_READ_REPLICAS", [missing])
+    client = main.create_app().test_client()
+    rename_product(4, "Из основной при сбое реплики")
+    assert "Из основной при сбое реплики" in streamed_names(client)
+    assert db.replica_stats()[missing]["down"]
@@ -0,0 +1,48 @@
+import db
+import main
+
+
+def sale_ids(query, params=()):
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+    return ids
+
+
+def pages(client, query):
+    ids = []
+    url = f"/api/v1/Sales?{query}"
+    while True:
+        response = client.get(url)
+        assert response.status_code == 200
+        # Пустая выборка отдаётся текстом «Не найдены записи о продажах»
+        if response.is_json:
+            ids.extend(sale["SaleID"] for sale in response.get_json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return ids
+        url = f"/api/v1/Sales?{query}&cursor={cursor}"
+
+
+# Проход по курсору отдаёт каждую продажу ровно один раз, от новых к старым
+def test_cursor_round_trip():
+    client = main.create_app().test_client()
+    expected = sale_ids("SELECT SaleID FROM Sales ORDER BY SaleDateTime DESC, SaleID DESC")
+    assert pages(client, "limit=70") == expected
+
+
+def test_filters():
+    client = main.create_app().test_client()
+    expected = sale_ids("""SELECT SaleID FROM Sales WHERE MachineID = 1 AND SaleDateTime >= ?
+                           ORDER BY SaleDateTime DESC, SaleID DESC""", ("2000-01-01",))
+    assert pages(client, "limit=5&machine_id=1&date_from=2000-01-01") == expected
+    assert pages(client, "date_to=2000-01-01") == []
+
+
+def test_invalid_parameters():
+    client = main.create_app().test_client()
+    assert client.get("/api/v1/Sales?cursor=not-a-cursor").status_code == 400
+    assert client.get("/api/v1/Sales?machine_id=abc").status_code == 400
+    assert client.get("/api/v1/Sales?date_from=вчера").status_code == 400
@@ -0,0 +1,53 @@
+import db
+import main
+import sales_ingest
+from POST import sales
+
+
+# Дата позже окна выгрузки в test_exports, чтобы порядок тестов не менял её объём
+def sale(quantity=1):
+    return {"ProductID": 1, "MachineID": 1, "Quantity": quantity, "SaleSum": 100 * quantity,
+            "PaymentTypeID": 1, "SaleDateTime": "2031-01-15T10:00:00"}
+
+
+def count_sales():
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM Sales")
+        count = cursor.fetchone()[0]
+        cursor.close()
+    return count
+
+
+def test_batch_writes_valid_rows():
+    client = main.create_app().test_client()
+    before = count_sales()
+    response = client.post("/api/v1/Sales/batch", json={"sales": [sale(), sale(2), {"ProductID": 1}, sale(3)]})
+    assert response.status_code == 207
+    body = response.get_json()
+    assert body["processed"] == 3
+    assert body["errors"] == ["Продажа 2: отсутствует обязательное поле 'MachineID'"]
+    assert count_sales() == before + 3
+
+    assert client.post("/api/v1/Sales/batch", json=[]).status_code == 400
+    too_many = [sale()] * (sales.MAX_BATCH_SIZE + 1)
+    assert client.post("/api/v1/Sales/batch", json=too_many).status_code == 413
+
+
+# Буфер принимает продажи до max_size, дальше 503 с Retry-After; запись — при сбросе
+def test_buffer_rejects_when_full(monkeypatch):
+    buffer = sales_ingest.SalesBuffer(flush_size=100, flush_interval=60, max_size=2)
+    monkeypatch.setattr(sales_ingest, "buffer", buffer)
+    client = main.create_app().test_client()
+    before = count_sales()
+
+    assert [client.post("/api/v1/Sales", json=sale()).status_code for _ in range(2)] == [202, 202]
+    response = client.post("/api/v1/Sales", json=sale())
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert count_sales() == before
+
+    buffer.flush()
+    assert count_sales() == before + 2
+    stats = buffer.stats()
+    assert (stats["accepted"], stats["rejected"], stats["flushed"], stats["pending"]) == (2, 1, 2, 0)
@@ -0,0 +1,63 @@
+from datetime import date
+
+import db
+import main
+import scheduler
+from response_cache import bump
+
+
+def execute(query, params, *tables):
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        cursor.close()
+        bump(conn, *tables)
+
+
+def planned(plan):
+    return {task["MachineID"] for technician in plan["technicians"] for task in technician["Tasks"]}
+
+
+def test_schedule_user_id_must_be_number():
+    client = main.create_app().test_client()
+    assert client.get("/api/v1/Schedule?user_id=abc").status_code == 400
+
+
+# Запись ТО из другого процесса снимает задачу; своя запись закрывает её без полного пересчёта
+def test_schedule_follows_maintenance():
+    today = date.today()
+    execute("DELETE FROM Maintenance WHERE MachineID IN (1, 2)", (), "Maintenance")
+    execute("UPDATE VendingMachines SET DateOfNextFixing = ? WHERE MachineID IN (1, 2)", (today,), "VendingMachines")
+    assert {1, 2} <= planned(scheduler.plan())
+
+    execute("INSERT INTO Maintenance (MachineID, MaintenanceDate, Description, Problems, DoneByUserID) "
+            "VALUES (1, ?, 'ТО', '', 1)", (today,), "Maintenance")
+    plan = planned(scheduler.plan())
+    assert 1 not in plan and 2 in plan
+
+    client = main.create_app().test_client()
+    token = client.post("/api/v1/login", json={"contacts": "user1@example.com", "password": "password"}).get_json()["token"]
+    schedule = scheduler._state[2]
+    response = client.post("/api/v1/Maintenance", headers={"Authorization": f"Bearer {token}"}, json={
+        "MachineID": 2, "MaintenanceDate": today.isoformat(), "Description": "ТО", "DoneByUserID": 1})
+    assert response.status_code == 201
+    assert 2 not in planned(scheduler.plan())
+    assert scheduler._state[2] is schedule
+
+
+# Ошибка обновления графика после commit не откатывает запись ТО и не даёт 500
+def test_maintenance_saved_when_schedule_fails(monkeypatch):
+    def broken(machine_id, maintenance_date):
+        raise RuntimeError("график недоступен")
+    monkeypatch.setattr(scheduler, "maintenance_done", broken)
+
+    client = main.create_app().test_client()
+    token = client.post("/api/v1/login", json={"contacts": "user1@example.com", "password": "password"}).get_json()["token"]
+    response = client.post("/api/v1/Maintenance", headers={"Authorization": f"Bearer {token}"}, json={
+        "MachineID": 4, "MaintenanceDate": "2026-03-01", "Description": "ТО после сбоя графика", "DoneByUserID": 1})
+    assert response.status_code == 201
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM Maintenance WHERE Description = 'ТО после сбоя графика'")
+        assert cursor.fetchone()[0] == 1
+        cursor.close()
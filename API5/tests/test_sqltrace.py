@@ -0,0 +1,63 @@
+import json
+import logging
+
+import pytest
+
+import db
+import sqltrace
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.entries = []
+
+    def emit(self, record):
+        self.entries.append(json.loads(record.getMessage()))
+
+
+@pytest.fixture
+def trace_log():
+    handler = ListHandler()
+    sqltrace.logger.addHandler(handler)
+    yield handler.entries
+    sqltrace.logger.removeHandler(handler)
+
+
+# Медленный запрос пишется с нормализованным текстом, числом строк и скрытыми строковыми параметрами
+def test_slow_query_entry(monkeypatch, trace_log):
+    monkeypatch.setattr(sqltrace, "SLOW_QUERY_MS", 0)
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT UserID\n   FROM Users WHERE Contacts <> ? AND UserID > ?", ("secret@example.com", 0))
+        rows = cursor.fetchall()
+        cursor.close()
+
+    entry = next(entry for entry in trace_log if entry["sql"].startswith("SELECT UserID"))
+    assert entry["kind"] == "slow"
+    assert entry["sql"] == "SELECT UserID FROM Users WHERE Contacts <> ? AND UserID > ?"
+    assert entry["params"] == ["<str:18>", 0]
+    assert entry["rows"] == len(rows)
+
+
+def test_repeated_statement_and_batch(monkeypatch, trace_log):
+    monkeypatch.setattr(sqltrace, "REPEAT_THRESHOLD", 3)
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        for user_id in range(4):
+            cursor.execute("SELECT FullName FROM Users WHERE UserID = ?", (user_id,))
+            cursor.fetchone()
+        cursor.close()
+    repeated = [entry for entry in trace_log if entry["kind"] == "repeated"]
+    assert [entry["sql"] for entry in repeated] == ["SELECT FullName FROM Users WHERE UserID = ?"]
+    assert repeated[0]["repeats"] == 3
+
+    monkeypatch.setattr(sqltrace, "SLOW_QUERY_MS", 0)
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS trace_batch (x INTEGER)")
+        cursor.executemany("INSERT INTO trace_batch VALUES (?)", [(1,), (2,), (3,)])
+        cursor.close()
+    batch = next(entry for entry in trace_log if entry["sql"].startswith("INSERT INTO trace_batch"))
+    assert batch["params"] == {"batch": 3}
+    assert batch["rows"] == 3
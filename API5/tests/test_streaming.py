@@ -0,0 +1,31 @@
+import json
+
+import main
+import workers
+
+
+def test_sales_stream_sends_next_cursor():
+    client = main.create_app().test_client()
+    page = client.get("/api/v1/Sales?limit=7")
+    stream = client.get("/api/v1/Sales?limit=7&stream=1")
+    assert stream.mimetype == "application/x-ndjson"
+    assert stream.headers["X-Next-Cursor"] == page.headers["X-Next-Cursor"]
+    assert [json.loads(line) for line in stream.get_data().splitlines()] == page.get_json()
+    stream.close()
+
+    # Последняя страница курсора не даёт ни в каком режиме
+    last = client.get("/api/v1/Sales?limit=1000&stream=1")
+    assert "X-Next-Cursor" not in last.headers
+    last.close()
+
+
+# Потоковый ответ держит место соединения, пока клиент его не дочитал
+def test_stream_holds_connection_slot():
+    client = main.create_app().test_client()
+    free = workers._connections._value
+    streams = [client.get("/api/v1/Users?stream=1") for _ in range(2)]
+    assert workers._connections._value == free - 2
+    # Контексты запросов тестового клиента снимаются в обратном порядке
+    for stream in reversed(streams):
+        stream.close()
+    assert workers._connections._value == free
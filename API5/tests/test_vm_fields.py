@@ -0,0 +1,25 @@
+import main
+from GET.VendingMachines import DEFAULT_FIELDS, VM_FIELDS
+from refdata import lookup
+
+
+def test_fields_select_columns():
+    client = main.create_app().test_client()
+    machines = client.get("/api/v1/VendingMachines?fields=MachineID,Location,StatusName,Location").get_json()
+    assert machines
+    assert all(set(machine) == {"MachineID", "Location", "StatusName"} for machine in machines)
+    # Справочные поля отдаются названиями, как и без fields
+    assert {machine["StatusName"] for machine in machines} <= set(lookup("MachineStatus").values())
+
+
+def test_default_fields():
+    machines = main.create_app().test_client().get("/api/v1/VendingMachines").get_json()
+    assert set(machines[0]) == set(DEFAULT_FIELDS)
+    assert "MachineID" not in machines[0]
+
+
+def test_unknown_field():
+    response = main.create_app().test_client().get("/api/v1/VendingMachines?fields=Location,Password")
+    assert response.status_code == 400
+    assert response.get_json()["allowed"] == list(VM_FIELDS)
+    assert "Password" in response.get_json()["error"]
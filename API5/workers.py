@@ -0,0 +1,93 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from functools import wraps
+
+from flask import copy_current_request_context, jsonify, make_response
+
+import db
+
+# Обработчики с блокирующими вызовами pyodbc выполняются в ограниченном пуле потоков.
+# Если пул и очередь заняты, запрос сразу получает 503, а не копится в ожидании.
+# Потоков не больше, чем соединений в пуле БД: лишние потоки только ждали бы соединение
+DB_WORKERS = int(os.environ.get('DB_WORKERS', db.POOL_MAX_SIZE))
+DB_QUEUE_DEPTH = int(os.environ.get('DB_QUEUE_DEPTH', DB_WORKERS * 2))
+REQUEST_TIMEOUT = float(os.environ.get('REQUEST_TIMEOUT', 30))
+
+_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="db-worker")
+_slots = threading.BoundedSemaphore(DB_WORKERS + DB_QUEUE_DEPTH)
+# Соединения, занятые запросами: обработчиком в потоке пула или потоковым ответом, который
+# клиент ещё дочитывает. Потоковые ответы освобождают поток сразу, но соединение — только
+# при закрытии, поэтому и они не могут занять больше DB_WORKERS соединений
+_connections = threading.BoundedSemaphore(DB_WORKERS)
+
+POOL_EXHAUSTED = "Нет свободных соединений с БД, повторите запрос позже"
+
+
+def overloaded(message):
+    return jsonify({"error": message}), 503, {"Retry-After": "1"}
+
+
+# Отмечает потоковый ответ, генератор которого держит соединение из пула до конца отдачи
+def hold_connection(response):
+    response.holds_connection = True
+    return response
+
+
+def offload(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _slots.acquire(blocking=False):
+            return overloaded("Сервер перегружен, повторите запрос позже")
+
+        @copy_current_request_context
+        def run():
+            try:
+                if not _connections.acquire(timeout=db.POOL_TIMEOUT):
+                    return overloaded(POOL_EXHAUSTED)
+                held = False
+                try:
+                    try:
+                        response = make_response(view(*args, **kwargs))
+                    except db.PoolTimeout:
+                        return overloaded(POOL_EXHAUSTED)
+                    # Соединение не дождалось очереди в пуле: это перегрузка, а не ошибка обработчика
+                    if db.pool_exhausted() and response.status_code >= 500:
+                        return overloaded(POOL_EXHAUSTED)
+                    if getattr(response, 'holds_connection', False):
+                        response.call_on_close(_connections.release)
+                        held = True
+                    return response
+                finally:
+                    if not held:
+                        _connections.release()
+            finally:
+                _slots.release()
+
+        # Переменные контекста запроса (например, чтение из основной БД) переходят в поток пула
+        context = contextvars.copy_context()
+        try:
+            future = _executor.submit(context.run, run)
+        except RuntimeError:
+            _slots.release()
+            raise
+        try:
+            return future.result(timeout=REQUEST_TIMEOUT)
+        except TimeoutError:
+            future.add_done_callback(_close_late)
+            return overloaded("Превышено время ожидания ответа БД")
+    return wrapper
+
+
+# Ответ, собранный уже после таймаута, клиенту не уйдёт: закрываем его, чтобы потоковый
+# ответ вернул соединение
+def _close_late(future):
+    if future.exception() is None:
+        future.result().close()
+
+
+def init_app(app):
+    for endpoint, view in app.view_functions.items():
+        if endpoint != 'static':
+            app.view_functions[endpoint] = offload(view)
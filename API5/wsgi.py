@@ -0,0 +1,6 @@
+from main import create_app
+
+# Точка входа для боевого запуска, например:
+#   gunicorn -w 4 -k gthread --threads 8 -b 0.0.0.0:8086 wsgi:app
+#   waitress-serve --threads=16 --port=8086 wsgi:app
+app = create_app()
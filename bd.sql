@@ -84,6 +84,23 @@ ALTER DATABASE [VendingDB] SET QUERY_STORE (OPERATION_MODE = READ_WRITE, CLEANUP
 GO
 USE [VendingDB]
 GO
+/****** Object:  Table [dbo].[ChangeLog]    Script Date: 15.02.2026 21:56:09 ******/
+SET ANSI_NULLS ON
+GO
+SET QUOTED_IDENTIFIER ON
+GO
+CREATE TABLE [dbo].[ChangeLog](
+	[ChangeID] [bigint] IDENTITY(1,1) NOT NULL,
+	[TableName] [nvarchar](50) NOT NULL,
+	[Operation] [char](1) NOT NULL,
+	[Payload] [nvarchar](max) NOT NULL,
+	[ChangedAt] [datetime2](3) NOT NULL,
+PRIMARY KEY CLUSTERED 
+(
+	[ChangeID] ASC
+)WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, IGNORE_DUP_KEY = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+) ON [PRIMARY] TEXTIMAGE_ON [PRIMARY]
+GO
 /****** Object:  Table [dbo].[Country]    Script Date: 15.02.2026 21:56:09 ******/
 SET ANSI_NULLS ON
 GO
@@ -119,6 +136,31 @@ PRIMARY KEY CLUSTERED
 )WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, IGNORE_DUP_KEY = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
 ) ON [PRIMARY]
 GO
+/****** Object:  Table [dbo].[Jobs]    Script Date: 15.02.2026 21:56:09 ******/
+SET ANSI_NULLS ON
+GO
+SET QUOTED_IDENTIFIER ON
+GO
+CREATE TABLE [dbo].[Jobs](
+	[JobID] [char](32) NOT NULL,
+	[Kind] [nvarchar](20) NOT NULL,
+	[Status] [nvarchar](10) NOT NULL,
+	[Total] [bigint] NOT NULL,
+	[Done] [bigint] NOT NULL,
+	[Processed] [bigint] NOT NULL,
+	[ErrorsCount] [int] NOT NULL,
+	[Errors] [nvarchar](max) NULL,
+	[Error] [nvarchar](max) NULL,
+	[Result] [nvarchar](max) NULL,
+	[CreatedAt] [datetime2](3) NOT NULL,
+	[FinishedAt] [datetime2](3) NULL,
+	[UpdatedAt] [datetime2](3) NOT NULL,
+PRIMARY KEY CLUSTERED 
+(
+	[JobID] ASC
+)WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, IGNORE_DUP_KEY = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+) ON [PRIMARY] TEXTIMAGE_ON [PRIMARY]
+GO
 /****** Object:  Table [dbo].[MachineProducts]    Script Date: 15.02.2026 21:56:09 ******/
 SET ANSI_NULLS ON
 GO
@@ -128,6 +170,8 @@ CREATE TABLE [dbo].[MachineProducts](
 	[MachineID] [int] NOT NULL,
 	[ProductID] [int] NOT NULL,
 	[Quantity] [int] NOT NULL,
+	[MinQuantity] [int] NOT NULL,
+	[NeedsRestock]  AS (CONVERT([bit],case when [Quantity]<[MinQuantity] then (1) else (0) end)) PERSISTED NOT NULL,
  CONSTRAINT [PK_MachineProducts] PRIMARY KEY CLUSTERED 
 (
 	[MachineID] ASC,
@@ -208,6 +252,20 @@ PRIMARY KEY CLUSTERED
 )WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, IGNORE_DUP_KEY = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
 ) ON [PRIMARY]
 GO
+/****** Object:  Table [dbo].[RevokedTokens]    Script Date: 15.02.2026 21:56:09 ******/
+SET ANSI_NULLS ON
+GO
+SET QUOTED_IDENTIFIER ON
+GO
+CREATE TABLE [dbo].[RevokedTokens](
+	[Jti] [varchar](32) NOT NULL,
+	[ExpiresAt] [datetime2](0) NOT NULL,
+PRIMARY KEY CLUSTERED 
+(
+	[Jti] ASC
+)WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, IGNORE_DUP_KEY = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+) ON [PRIMARY]
+GO
 /****** Object:  Table [dbo].[Sales]    Script Date: 15.02.2026 21:56:09 ******/
 SET ANSI_NULLS ON
 GO
@@ -227,6 +285,44 @@ PRIMARY KEY CLUSTERED
 )WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, IGNORE_DUP_KEY = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
 ) ON [PRIMARY]
 GO
+/****** Object:  Table [dbo].[SalesRollup]    Script Date: 15.02.2026 21:56:09 ******/
+SET ANSI_NULLS ON
+GO
+SET QUOTED_IDENTIFIER ON
+GO
+CREATE TABLE [dbo].[SalesRollup](
+	[Granularity] [char](1) NOT NULL,
+	[PeriodStart] [datetime2](0) NOT NULL,
+	[MachineID] [int] NOT NULL,
+	[ProductID] [int] NOT NULL,
+	[PaymentTypeID] [int] NOT NULL,
+	[SaleCount] [int] NOT NULL,
+	[Quantity] [int] NOT NULL,
+	[SaleSum] [decimal](14, 2) NOT NULL,
+ CONSTRAINT [PK_SalesRollup] PRIMARY KEY CLUSTERED 
+(
+	[Granularity] ASC,
+	[PeriodStart] ASC,
+	[MachineID] ASC,
+	[ProductID] ASC,
+	[PaymentTypeID] ASC
+)WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, IGNORE_DUP_KEY = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+) ON [PRIMARY]
+GO
+/****** Object:  Table [dbo].[TableVersions]    Script Date: 15.02.2026 21:56:09 ******/
+SET ANSI_NULLS ON
+GO
+SET QUOTED_IDENTIFIER ON
+GO
+CREATE TABLE [dbo].[TableVersions](
+	[TableName] [nvarchar](50) NOT NULL,
+	[Version] [bigint] NOT NULL,
+PRIMARY KEY CLUSTERED 
+(
+	[TableName] ASC
+)WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, IGNORE_DUP_KEY = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+) ON [PRIMARY]
+GO
 /****** Object:  Table [dbo].[Users]    Script Date: 15.02.2026 21:56:09 ******/
 SET ANSI_NULLS ON
 GO
@@ -274,6 +370,7 @@ CREATE TABLE [dbo].[VendingMachines](
 	[CountryID] [int] NOT NULL,
 	[InventoryDate] [date] NOT NULL,
 	[LastCheckedByUserID] [int] NULL,
+	[NextVerificationDate]  AS (dateadd(month,[VerificationInterval],[LastVerificationDate])) PERSISTED,
 PRIMARY KEY CLUSTERED 
 (
 	[MachineID] ASC
@@ -288,8 +385,92 @@ UNIQUE NONCLUSTERED
 )WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, IGNORE_DUP_KEY = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
 ) ON [PRIMARY]
 GO
+/****** Object:  Index [IX_Sales_SaleDateTime]    Script Date: 15.02.2026 21:56:09 ******/
+CREATE NONCLUSTERED INDEX [IX_Sales_SaleDateTime] ON [dbo].[Sales]
+(
+	[SaleDateTime] DESC,
+	[SaleID] DESC
+)
+INCLUDE([MachineID],[ProductID],[Quantity],[SaleSum],[PaymentTypeID]) WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, SORT_IN_TEMPDB = OFF, DROP_EXISTING = OFF, ONLINE = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+GO
+/****** Object:  Index [IX_Sales_Machine_SaleDateTime]    Script Date: 15.02.2026 21:56:09 ******/
+CREATE NONCLUSTERED INDEX [IX_Sales_Machine_SaleDateTime] ON [dbo].[Sales]
+(
+	[MachineID] ASC,
+	[SaleDateTime] DESC,
+	[SaleID] DESC
+)
+INCLUDE([ProductID],[Quantity],[SaleSum],[PaymentTypeID]) WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, SORT_IN_TEMPDB = OFF, DROP_EXISTING = OFF, ONLINE = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+GO
+/****** Object:  Index [IX_Sales_Product_SaleDateTime]    Script Date: 15.02.2026 21:56:09 ******/
+CREATE NONCLUSTERED INDEX [IX_Sales_Product_SaleDateTime] ON [dbo].[Sales]
+(
+	[ProductID] ASC,
+	[SaleDateTime] DESC,
+	[SaleID] DESC
+)
+INCLUDE([MachineID],[Quantity],[SaleSum],[PaymentTypeID]) WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, SORT_IN_TEMPDB = OFF, DROP_EXISTING = OFF, ONLINE = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+GO
+/****** Object:  Index [IX_Sales_PaymentType_SaleDateTime]    Script Date: 15.02.2026 21:56:09 ******/
+CREATE NONCLUSTERED INDEX [IX_Sales_PaymentType_SaleDateTime] ON [dbo].[Sales]
+(
+	[PaymentTypeID] ASC,
+	[SaleDateTime] DESC,
+	[SaleID] DESC
+)
+INCLUDE([MachineID],[ProductID],[Quantity],[SaleSum]) WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, SORT_IN_TEMPDB = OFF, DROP_EXISTING = OFF, ONLINE = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+GO
+/****** Object:  Index [IX_Events_EventDateTime]    Script Date: 15.02.2026 21:56:09 ******/
+CREATE NONCLUSTERED INDEX [IX_Events_EventDateTime] ON [dbo].[Events]
+(
+	[EventDateTime] ASC
+)
+INCLUDE([MachineID],[EventType],[Message]) WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, SORT_IN_TEMPDB = OFF, DROP_EXISTING = OFF, ONLINE = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+GO
+/****** Object:  Index [IX_Maintenance_MaintenanceDate]    Script Date: 15.02.2026 21:56:09 ******/
+CREATE NONCLUSTERED INDEX [IX_Maintenance_MaintenanceDate] ON [dbo].[Maintenance]
+(
+	[MaintenanceDate] ASC
+)
+INCLUDE([MachineID],[Description]) WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, SORT_IN_TEMPDB = OFF, DROP_EXISTING = OFF, ONLINE = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+GO
+/****** Object:  Index [IX_Maintenance_Machine_MaintenanceDate]    Script Date: 15.02.2026 21:56:09 ******/
+CREATE NONCLUSTERED INDEX [IX_Maintenance_Machine_MaintenanceDate] ON [dbo].[Maintenance]
+(
+	[MachineID] ASC,
+	[MaintenanceDate] ASC
+)
+INCLUDE([Description]) WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, SORT_IN_TEMPDB = OFF, DROP_EXISTING = OFF, ONLINE = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+GO
+/****** Object:  Index [IX_VendingMachines_DateOfNextFixing]    Script Date: 15.02.2026 21:56:09 ******/
+CREATE NONCLUSTERED INDEX [IX_VendingMachines_DateOfNextFixing] ON [dbo].[VendingMachines]
+(
+	[DateOfNextFixing] ASC
+)
+INCLUDE([Model],[Location]) WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, SORT_IN_TEMPDB = OFF, DROP_EXISTING = OFF, ONLINE = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+GO
+/****** Object:  Index [IX_VendingMachines_NextVerificationDate]    Script Date: 15.02.2026 21:56:09 ******/
+CREATE NONCLUSTERED INDEX [IX_VendingMachines_NextVerificationDate] ON [dbo].[VendingMachines]
+(
+	[NextVerificationDate] ASC
+)
+INCLUDE([Model],[Location]) WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, SORT_IN_TEMPDB = OFF, DROP_EXISTING = OFF, ONLINE = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+GO
+/****** Object:  Index [IX_MachineProducts_NeedsRestock]    Script Date: 15.02.2026 21:56:09 ******/
+CREATE NONCLUSTERED INDEX [IX_MachineProducts_NeedsRestock] ON [dbo].[MachineProducts]
+(
+	[NeedsRestock] ASC,
+	[MachineID] ASC,
+	[ProductID] ASC
+)
+INCLUDE([Quantity],[MinQuantity]) WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, SORT_IN_TEMPDB = OFF, DROP_EXISTING = OFF, ONLINE = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+GO
+ALTER TABLE [dbo].[ChangeLog] ADD  DEFAULT (sysdatetime()) FOR [ChangedAt]
+GO
 ALTER TABLE [dbo].[Events] ADD  DEFAULT (getdate()) FOR [EventDateTime]
 GO
+ALTER TABLE [dbo].[MachineProducts] ADD  DEFAULT ((5)) FOR [MinQuantity]
+GO
 ALTER TABLE [dbo].[Sales] ADD  DEFAULT (getdate()) FOR [SaleDateTime]
 GO
 ALTER TABLE [dbo].[VendingMachines] ADD  DEFAULT ((0)) FOR [FullIncome]
@@ -357,8 +538,12 @@ REFERENCES [dbo].[Users] ([UserID])
 GO
 ALTER TABLE [dbo].[VendingMachines] CHECK CONSTRAINT [FK_VM_User]
 GO
+ALTER TABLE [dbo].[ChangeLog]  WITH CHECK ADD CHECK  (([Operation]='D' OR [Operation]='U' OR [Operation]='I'))
+GO
 ALTER TABLE [dbo].[MachineProducts]  WITH CHECK ADD CHECK  (([Quantity]>=(0)))
 GO
+ALTER TABLE [dbo].[MachineProducts]  WITH CHECK ADD CHECK  (([MinQuantity]>=(0)))
+GO
 ALTER TABLE [dbo].[Products]  WITH CHECK ADD CHECK  (([InStock]>=(0)))
 GO
 ALTER TABLE [dbo].[Products]  WITH CHECK ADD CHECK  (([MinStock]>=(0)))
@@ -367,6 +552,8 @@ ALTER TABLE [dbo].[Products]  WITH CHECK ADD CHECK  (([Price]>(0)))
 GO
 ALTER TABLE [dbo].[Sales]  WITH CHECK ADD CHECK  (([Quantity]>(0)))
 GO
+ALTER TABLE [dbo].[SalesRollup]  WITH CHECK ADD CHECK  (([Granularity]='D' OR [Granularity]='H'))
+GO
 ALTER TABLE [dbo].[Sales]  WITH CHECK ADD CHECK  (([SaleSum]>=(0)))
 GO
 ALTER TABLE [dbo].[VendingMachines]  WITH CHECK ADD CHECK  (([MaintenanceTimeHours]>=(1) AND [MaintenanceTimeHours]<=(20)))
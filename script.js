@@ -2,7 +2,8 @@
 const API_CONFIG = {
     BASE_URL: 'http://localhost:8086/api/v1',
     ENDPOINTS: {
-        VENDING_MACHINES: '/VendingMachines',
+        // Только поля, которые использует интерфейс
+        VENDING_MACHINES: '/VendingMachines?fields=MachineID,Location,Model,PaymentType,FullIncome,Manufacturer,LastVerificationDate,DateOfNextFixing,StatusName,CountryName',
         MAINTENANCE: '/Maintenance',
         USERS: '/Users',
         PRODUCTS: '/Products',
@@ -45,23 +46,57 @@ function hideModal(modalId) {
     document.getElementById(modalId).style.display = 'none';
 }
 
+// Разворачивает ответ {columns, rows} в привычный массив объектов
+function fromColumnar(data) {
+    if (!data || !Array.isArray(data.columns) || !Array.isArray(data.rows)) return data;
+    return data.rows.map(row => {
+        const item = {};
+        data.columns.forEach((column, i) => { item[column] = row[i]; });
+        return item;
+    });
+}
+
+// Токен, выданный при входе, передаётся в заголовке Authorization
+function authHeaders() {
+    const token = appData.currentUser && appData.currentUser.token;
+    return token ? { 'Authorization': `Bearer ${token}` } : {};
+}
+
+// После своей записи несколько секунд читаем из основной БД: реплика может отставать
+const READ_YOUR_WRITES_MS = 5000;
+let readPrimaryUntil = 0;
+function consistencyHeaders() {
+    return Date.now() < readPrimaryUntil ? { 'X-Read-Your-Writes': '1' } : {};
+}
+
+// Токен истёк или отозван — возвращаемся к окну входа
+function handleUnauthorized() {
+    localStorage.removeItem('currentUser');
+    appData.currentUser = null;
+    showModal('login-modal');
+}
+
 // API сервис
 const ApiService = {
     async request(endpoint, method = 'GET', data = null) {
         const url = `${API_CONFIG.BASE_URL}${endpoint}`;
         const options = {
             method,
-            headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' }
+            headers: { 'Content-Type': 'application/json', 'Accept': 'application/json', ...authHeaders(), ...consistencyHeaders() }
         };
         if (data && (method === 'POST' || method === 'PUT')) {
             options.body = JSON.stringify(data);
         }
         try {
             const response = await fetch(url, options);
+            if (response.status === 401 && appData.currentUser) {
+                handleUnauthorized();
+            }
             if (!response.ok) {
                 const errorText = await response.text();
                 throw new Error(`HTTP ${response.status}: ${errorText}`);
             }
+            if (method !== 'GET') readPrimaryUntil = Date.now() + READ_YOUR_WRITES_MS;
             return await response.json();
         } catch (error) {
             console.error('API Request failed:', error);
@@ -69,7 +104,11 @@ const ApiService = {
             throw error;
         }
     },
-    get(endpoint) { return this.request(endpoint, 'GET'); },
+    // Списки запрашиваются в колоночном формате (?format=columnar) — он вдвое компактнее
+    async get(endpoint) {
+        const separator = endpoint.includes('?') ? '&' : '?';
+        return fromColumnar(await this.request(`${endpoint}${separator}format=columnar`, 'GET'));
+    },
     post(endpoint, data) { return this.request(endpoint, 'POST', data); }
 };
 
@@ -100,7 +139,7 @@ async function login() {
         }
 
         // Успешный вход
-        appData.currentUser = data; // { UserID, FullName, Role }
+        appData.currentUser = data; // { UserID, FullName, Role, token }
         localStorage.setItem('currentUser', JSON.stringify(data));
         document.getElementById('current-user').textContent = `Пользователь: ${data.FullName}`;
         hideModal('login-modal');
@@ -116,6 +155,8 @@ async function login() {
 
 // ---------- ЗАГРУЗКА ДАННЫХ ПОСЛЕ ВХОДА ----------
 async function initApp() {
+    // Точку отсчёта ленты берём до загрузки списков, чтобы не потерять изменения между ними
+    const since = await fetchChangesCursor();
     await loadInitialData();
     updateTASelect();
     setupNavigation();
@@ -124,6 +165,77 @@ async function initApp() {
     await renderVendingMachinesTable();
     showNotification('Приложение успешно загружено', 'success');
     renderCalendar();
+    if (since !== null) subscribeToChanges(since);
+}
+
+// ---------- ЛЕНТА ИЗМЕНЕНИЙ ----------
+// Новые записи приходят через SSE и дописываются в appData без перезагрузки списков
+const CHANGE_HANDLERS = {
+    Sales: data => appData.sales.unshift(data),
+    Maintenance: data => appData.maintenance.push(data),
+    VendingMachines: data => {
+        appData.vendingMachines.push(data);
+        renderVendingMachinesTable();
+    },
+    Users: data => appData.users.push(data),
+    Products: data => appData.products.push(data)
+};
+let changeStream = null;
+let changePolling = null;
+let changesSince = null;
+// Как часто опрашивать ленту, если SSE недоступен или сервер отказал в потоке
+const CHANGES_POLL_MS = 5000;
+
+async function fetchChangesCursor() {
+    try {
+        const response = await fetch(`${API_CONFIG.BASE_URL}/changes`);
+        return response.ok ? (await response.json()).last_id : null;
+    } catch (error) {
+        return null;
+    }
+}
+
+function applyChange(change) {
+    changesSince = change.id;
+    const apply = CHANGE_HANDLERS[change.table];
+    if (apply && change.op === 'I') apply(change.data);
+}
+
+function subscribeToChanges(since) {
+    if (changeStream || changePolling) return;
+    changesSince = since;
+    if (!window.EventSource) {
+        pollChanges();
+        return;
+    }
+    // При обрыве EventSource переподключается сам и передаёт Last-Event-ID
+    changeStream = new EventSource(`${API_CONFIG.BASE_URL}/changes/stream?since=${since}`);
+    Object.keys(CHANGE_HANDLERS).forEach(table => {
+        changeStream.addEventListener(table, event => applyChange(JSON.parse(event.data)));
+    });
+    // Ответ не 200 (например, 503 при лимите подписчиков) закрывает EventSource насовсем —
+    // дальше читаем ленту опросом с последнего полученного изменения
+    changeStream.onerror = () => {
+        if (changeStream.readyState !== EventSource.CLOSED) return;
+        changeStream = null;
+        pollChanges();
+    };
+}
+
+function pollChanges() {
+    changePolling = setTimeout(async () => {
+        try {
+            const response = await fetch(`${API_CONFIG.BASE_URL}/changes?since=${changesSince}`);
+            if (response.ok) {
+                const data = await response.json();
+                data.changes.forEach(applyChange);
+                changesSince = data.last_id;
+            }
+        } catch (error) {
+            console.error('Changes poll error:', error);
+        }
+        pollChanges();
+    }, CHANGES_POLL_MS);
 }
 
 async function loadInitialData() {
@@ -252,8 +364,10 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 
     // Кнопка выхода
-    document.getElementById('logout-btn').addEventListener('click', () => {
+    document.getElementById('logout-btn').addEventListener('click', async () => {
         if (confirm('Вы уверены, что хотите выйти?')) {
+            // Отзываем токен на сервере; ошибка сети выходу не мешает
+            await fetch(`${API_CONFIG.BASE_URL}/logout`, { method: 'POST', headers: authHeaders() }).catch(() => {});
             localStorage.removeItem('currentUser');
             location.reload(); // перезагружаем страницу, вернёмся к окну входа
         }
@@ -590,6 +704,27 @@ async function addVendingMachine() {
     }
 }
 
+// Опрашивает статус фонового импорта и приводит итог к виду прежнего синхронного ответа
+async function waitForImport(statusUrl) {
+    const url = API_CONFIG.BASE_URL.replace(/\/api\/v1$/, '') + statusUrl;
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const response = await fetch(url);
+        const job = await response.json();
+        if (!response.ok) return { result: job, status: response.status };
+        if (job.status === 'failed') return { result: { error: job.error }, status: 500 };
+        if (job.status === 'done') {
+            const message = job.errors_count
+                ? `Загружено ${job.processed} записей, ошибок: ${job.errors_count}`
+                : `Загружено ${job.processed} записей`;
+            return {
+                result: { success: !job.errors_count, message, processed: job.processed, errors: job.errors },
+                status: job.errors_count ? 207 : 201
+            };
+        }
+    }
+}
+
 async function processCSVFile() {
     const fileInput = document.getElementById('csv-file');
     const file = fileInput.files[0];
@@ -612,15 +747,23 @@ async function processCSVFile() {
         // Отправляем файл на сервер
         const response = await fetch(`${API_CONFIG.BASE_URL}${API_CONFIG.ENDPOINTS.ADD_VENDING_MACHINE}`, {
             method: 'POST',
+            headers: authHeaders(),
             body: formData
             // Не устанавливаем Content-Type, чтобы браузер установил его автоматически с boundary
         });
         
-        const result = await response.json();
+        let result = await response.json();
+        let status = response.status;
+        if (response.ok) readPrimaryUntil = Date.now() + READ_YOUR_WRITES_MS;
+        
+        // Большие файлы импортируются в фоне: ждём завершения задачи
+        if (status === 202) {
+            ({ result, status } = await waitForImport(result.status_url));
+        }
         
         document.getElementById('loading').style.display = 'none';
         
-        if (response.status === 201 || response.status === 207) {
+        if (status === 201 || status === 207) {
             if (result.success) {
                 // Успешная загрузка
                 document.getElementById('processed-count').textContent = result.processed;
@@ -634,7 +777,7 @@ async function processCSVFile() {
                 resetUploadForm();
                 
                 // Если есть ошибки (статус 207), показываем их
-                if (response.status === 207 && result.errors && result.errors.length > 0) {
+                if (status === 207 && result.errors && result.errors.length > 0) {
                     const errorList = document.getElementById('error-list');
                     errorList.innerHTML = '';
                     
@@ -686,11 +829,11 @@ async function processCSVFile() {
             errorList.innerHTML = '';
             
             const li = document.createElement('li');
-            li.textContent = result.error || `Ошибка сервера: ${response.status}`;
+            li.textContent = result.error || `Ошибка сервера: ${status}`;
             errorList.appendChild(li);
             
             document.getElementById('validation-errors').style.display = 'block';
-            showNotification(result.error || `Ошибка сервера: ${response.status}`, 'error');
+            showNotification(result.error || `Ошибка сервера: ${status}`, 'error');
         }
         
     } catch (error) {
@@ -756,41 +899,91 @@ function renderCalendar() {
     }
 }
 
-function renderYearCalendar(container) {
-    container.innerHTML = '<div class="year-calendar" id="year-calendar"></div>';
-    const yearContainer = document.getElementById('year-calendar');
-    
-    const currentYear = appData.currentDate.getFullYear();
-    
-    // Фиксированная дата для сравнения - 16 февраля 2026
-    const targetDate = new Date('2026-02-16');
-    targetDate.setHours(0, 0, 0, 0);
-    
-    // Границы для желтого периода
-    const yellowStart = new Date('2026-02-16');
-    yellowStart.setHours(0, 0, 0, 0);
-    const yellowEnd = new Date('2026-02-21');
-    yellowEnd.setHours(23, 59, 59, 999);
-    
-    // Получаем выбранный ТА
+// Сроки ТО и поверки, выполненные работы и события за год приходят из GET /Calendar со статусом,
+// посчитанным на сервере. Без сервера (демо-режим) события собираются из загруженных списков
+const CALENDAR_STATUS_PRIORITY = ['overdue', 'upcoming', 'planned'];
+const UPCOMING_DAYS = 5;
+let calendarRequest = 0;
+
+function selectedMachine() {
     const selectedTA = appData.selectedTA;
-    console.log('Выбранный ТА:', selectedTA);
-    
-    // Фильтруем аппараты для отображения
-    let vendingMachinesToShow = [];
-    if (selectedTA && selectedTA !== '') {
-        // Показываем только выбранный ТА
-        const selectedIndex = parseInt(selectedTA) - 1;
-        if (selectedIndex >= 0 && selectedIndex < appData.vendingMachines.length) {
-            vendingMachinesToShow = [appData.vendingMachines[selectedIndex]];
-            console.log('Показываем только ТА:', vendingMachinesToShow[0].Model);
-        }
-    } else {
-        // Показываем все ТА
-        vendingMachinesToShow = appData.vendingMachines;
-        console.log('Показываем все ТА');
+    if (!selectedTA) return null;
+    return appData.vendingMachines[parseInt(selectedTA) - 1] || null;
+}
+
+async function fetchCalendarEvents(year, machine) {
+    let url = `${API_CONFIG.BASE_URL}/Calendar?date_from=${year}-01-01&date_to=${year + 1}-01-01`;
+    if (machine && machine.MachineID) url += `&machine_id=${machine.MachineID}`;
+    try {
+        const response = await fetch(url);
+        if (response.ok) return await response.json();
+    } catch (error) {
+        console.warn('Календарь недоступен на сервере, события собираются локально', error);
     }
-    
+    return localCalendarEvents(year, machine);
+}
+
+function toISODate(date) {
+    return `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}-${String(date.getDate()).padStart(2, '0')}`;
+}
+
+// Тот же расчёт статуса, что на сервере: просрочено, ближайшие UPCOMING_DAYS дней включительно, по плану
+function dueStatus(dateStr, today) {
+    const days = Math.round((new Date(dateStr) - new Date(toISODate(today))) / (1000 * 60 * 60 * 24));
+    if (days < 0) return 'overdue';
+    if (days <= UPCOMING_DAYS) return 'upcoming';
+    return 'planned';
+}
+
+function localCalendarEvents(year, machine) {
+    const today = new Date();
+    const machines = machine ? [machine] : appData.vendingMachines;
+    const inYear = dateStr => dateStr && String(dateStr).startsWith(`${year}-`);
+    const events = [];
+    machines.forEach(vm => {
+        const due = vm.DateOfNextFixing && String(vm.DateOfNextFixing).slice(0, 10);
+        if (!inYear(due)) return;
+        events.push({
+            Date: due, Type: 'maintenance', Status: dueStatus(due, today),
+            MachineID: vm.MachineID, Model: vm.Model, Location: vm.Location, Description: 'Плановое ТО'
+        });
+    });
+    (appData.maintenance || []).forEach(maintenance => {
+        const done = maintenance.MaintenanceDate && String(maintenance.MaintenanceDate).slice(0, 10);
+        const vm = machines.find(v => v.MachineID == maintenance.MachineID);
+        if (!inYear(done) || !vm) return;
+        events.push({
+            Date: done, Type: 'maintenance', Status: 'done',
+            MachineID: vm.MachineID, Model: vm.Model, Location: vm.Location, Description: maintenance.Description
+        });
+    });
+    return events;
+}
+
+function calendarEventText(event) {
+    const model = event.Model || `Аппарат #${event.MachineID}`;
+    if (event.Status === 'done') return `${model}\n  🔧 Выполнено: ${event.Description || 'ТО'}`;
+    if (event.Type === 'event') return `${model}\n  ⚠️ ${event.Description}`;
+    return `${model}\n  📍 ${event.Location || 'местоположение не указано'}\n  📅 ${event.Description}`;
+}
+
+async function renderYearCalendar(container) {
+    const request = ++calendarRequest;
+    const currentYear = appData.currentDate.getFullYear();
+    const machine = selectedMachine();
+    const events = await fetchCalendarEvents(currentYear, machine);
+    // Пока ждали ответ, пользователь мог переключить вид или аппарат
+    if (request !== calendarRequest) return;
+
+    const eventsByDate = {};
+    events.forEach(event => {
+        (eventsByDate[event.Date] = eventsByDate[event.Date] || []).push(event);
+    });
+    const todayStr = toISODate(new Date());
+
+    container.innerHTML = '<div class="year-calendar" id="year-calendar"></div>';
+    const yearContainer = document.getElementById('year-calendar');
+
     for (let month = 0; month < 12; month++) {
         const monthContainer = document.createElement('div');
         monthContainer.className = 'month-container';
@@ -824,65 +1017,29 @@ function renderYearCalendar(container) {
             dayCell.className = 'day-cell';
             dayCell.textContent = day;
             
-            const cellDate = new Date(currentYear, month, day);
-            cellDate.setHours(0, 0, 0, 0);
-            
-            // Формируем строку даты для поиска событий
-            const dateStr = `${currentYear}-${String(month + 1).padStart(2, '0')}-${String(day).padStart(2, '0')}`;
+            const dateStr = toISODate(new Date(currentYear, month, day));
+            const dayEvents = eventsByDate[dateStr] || [];
             
-            // Получаем события для этой даты с учетом выбранного ТА
-            const events = getServiceEventsForDate(dateStr, vendingMachinesToShow);
-            
-            // Если есть события - окрашиваем ячейку
-            if (events.length > 0) {
-                // Определяем цвет на основе даты события
-                if (cellDate < targetDate) {
-                    // Дата раньше 16 февраля 2026 - КРАСНЫЙ
-                    dayCell.style.backgroundColor = '#e74c3c';
-                    dayCell.style.color = 'white';
-                    dayCell.classList.add('overdue');
-                } 
-                else if (cellDate >= yellowStart && cellDate <= yellowEnd) {
-                    // Дата с 16 по 21 февраля 2026 - ЖЕЛТЫЙ
-                    dayCell.style.backgroundColor = '#f1c40f';
-                    dayCell.style.color = '#333';
-                    dayCell.classList.add('upcoming');
-                }
-                else if (cellDate > yellowEnd) {
-                    // Дата позже 21 февраля 2026 - ЗЕЛЕНЫЙ
-                    dayCell.style.backgroundColor = '#27ae60';
-                    dayCell.style.color = 'white';
-                    dayCell.classList.add('planned');
-                }
+            if (dayEvents.length > 0) {
+                // Цвет ячейки — самый срочный статус срока в этот день; выполненные работы и события без срока — без цвета
+                const status = CALENDAR_STATUS_PRIORITY.find(s => dayEvents.some(event => event.Status === s));
+                dayCell.classList.add('event');
+                if (status) dayCell.classList.add(status);
                 
-                // Добавляем подсказку с информацией о событиях
                 const tooltip = document.createElement('div');
                 tooltip.className = 'calendar-tooltip';
-                
-                let tooltipText = '';
-                if (selectedTA && selectedTA !== '') {
+                if (machine) {
                     // Для одного ТА - краткая информация
-                    tooltipText = `📅 ${events[0].vmName}\n${events[0].description}`;
+                    tooltip.textContent = `📅 ${calendarEventText(dayEvents[0])}`;
                 } else {
                     // Для всех ТА - список всех событий
-                    tooltipText = '📅 События ТО:\n';
-                    events.forEach(event => {
-                        tooltipText += `• ${event.vmName}\n  ${event.description}\n`;
-                    });
+                    tooltip.textContent = '📅 События ТО:\n' + dayEvents.map(event => `• ${calendarEventText(event)}`).join('\n');
                 }
-                
-                tooltip.textContent = tooltipText;
                 dayCell.appendChild(tooltip);
-            } else {
-                // Если событий нет - ячейка без фона
-                dayCell.style.backgroundColor = 'transparent';
-                dayCell.style.color = '#333';
             }
             
-            // Если сегодня (для выделения границей)
-            if (cellDate.toDateString() === targetDate.toDateString()) {
+            if (dateStr === todayStr) {
                 dayCell.classList.add('today');
-                dayCell.style.border = '2px solid #3498db';
             }
             
             monthGrid.appendChild(dayCell);
@@ -893,89 +1050,6 @@ function renderYearCalendar(container) {
     }
 }
 
-function getServiceEventsForDate(dateStr, vendingMachinesToShow = null) {
-    const events = [];
-    const checkDate = new Date(dateStr);
-    checkDate.setHours(0, 0, 0, 0);
-    
-    // Используем переданный список аппаратов или все, если не указан
-    let vendingMachines = vendingMachinesToShow || appData.vendingMachines;
-    
-    // Если выбран конкретный ТА, но список не передан - используем фильтрацию по selectedTA
-    if (!vendingMachinesToShow && appData.selectedTA && appData.selectedTA !== '') {
-        const selectedIndex = parseInt(appData.selectedTA) - 1;
-        if (selectedIndex >= 0 && selectedIndex < appData.vendingMachines.length) {
-            vendingMachines = [appData.vendingMachines[selectedIndex]];
-        }
-    }
-    
-    console.log(`Поиск событий для даты ${dateStr} по ${vendingMachines.length} аппаратам`);
-    
-    // Проверяем даты следующего ТО из данных аппаратов
-    vendingMachines.forEach((vm, index) => {
-        // Проверяем разные возможные названия поля с датой ТО
-        let nextFixingDateStr = vm.DateOfNextFixing || vm.dateOfNextFixing || vm.nextFixingDate;
-        
-        if (nextFixingDateStr) {
-            try {
-                const nextFixingDate = new Date(nextFixingDateStr);
-                nextFixingDate.setHours(0, 0, 0, 0);
-                
-                if (!isNaN(nextFixingDate.getTime()) && 
-                    nextFixingDate.toDateString() === checkDate.toDateString()) {
-                    
-                    console.log(`✅ Найдено событие: ${vm.Model} на ${nextFixingDateStr}`);
-                    
-                    events.push({
-                        vmName: vm.Model || 'Неизвестный аппарат',
-                        description: `📍 ${vm.Location || 'местоположение не указано'}\n   📅 Плановое ТО`,
-                        type: 'maintenance',
-                        date: nextFixingDateStr
-                    });
-                }
-            } catch (error) {
-                console.warn(`Ошибка обработки даты ТО: ${nextFixingDateStr}`, error);
-            }
-        }
-    });
-    
-    // Также проверяем записи о выполненном ТО из истории
-    if (appData.maintenance && Array.isArray(appData.maintenance)) {
-        appData.maintenance.forEach(maintenance => {
-            try {
-                const maintenanceDate = new Date(maintenance.MaintenanceDate);
-                maintenanceDate.setHours(0, 0, 0, 0);
-                
-                if (!isNaN(maintenanceDate.getTime()) && 
-                    maintenanceDate.toDateString() === checkDate.toDateString()) {
-                    
-                    // Находим аппарат для этого обслуживания
-                    const vm = vendingMachines.find(v => 
-                        (v.MachineID && v.MachineID == maintenance.MachineID) || 
-                        (maintenance.MachineID && appData.vendingMachines.indexOf(v) + 1 == maintenance.MachineID)
-                    );
-                    
-                    // Если аппарат найден в текущем списке (или если показываем все)
-                    if (vm) {
-                        console.log(`✅ Найдена запись о выполненном ТО на ${maintenance.MaintenanceDate}`);
-                        
-                        events.push({
-                            vmName: vm.Model || `Аппарат #${maintenance.MachineID}`,
-                            description: `🔧 Выполнено: ${maintenance.Description || 'ТО'}\n   ${maintenance.Problems ? '⚠️ ' + maintenance.Problems : ''}`,
-                            type: 'completed',
-                            date: maintenance.MaintenanceDate
-                        });
-                    }
-                }
-            } catch (error) {
-                console.warn(`Ошибка обработки даты обслуживания`, error);
-            }
-        });
-    }
-    
-    return events;
-}
-
 function updateTASelect() {
     const taSelect = document.getElementById('ta-select');
     if (!taSelect) return;
@@ -1012,7 +1086,62 @@ function renderWeekCalendar(container) {
 }
 
 // === ФУНКЦИОНАЛ РАЗДЕЛА "ГРАФИК РАБОТ" ===
+// План ТО распределяется на сервере (GET /Schedule); без сервера показываем историю выполненных работ
 async function renderWorkSchedule() {
+    let plan = null;
+    try {
+        const response = await fetch(`${API_CONFIG.BASE_URL}/Schedule`);
+        if (response.ok) plan = await response.json();
+    } catch (error) {
+        plan = null;
+    }
+    if (!plan) {
+        renderMaintenanceHistory();
+        return;
+    }
+
+    const scheduleContainer = document.getElementById('employee-schedule');
+    scheduleContainer.innerHTML = '';
+    const cards = plan.technicians.map(tech => ({
+        title: tech.FullName,
+        subtitle: `Загрузка: ${tech.Hours} ч за ${plan.horizon_days} дн.`,
+        tasks: tech.Tasks
+    }));
+    if (plan.unassigned.length > 0) {
+        cards.push({
+            title: 'Не распределено',
+            subtitle: 'Не хватает рабочего времени в горизонте планирования',
+            tasks: plan.unassigned
+        });
+    }
+    if (cards.length === 0) {
+        scheduleContainer.innerHTML = '<div style="text-align: center; padding: 20px;">Нет запланированных работ</div>';
+        return;
+    }
+
+    cards.forEach(card => {
+        const employeeCard = document.createElement('div');
+        employeeCard.className = 'employee-card';
+        employeeCard.innerHTML = `
+            <div class="employee-header">
+                <div class="employee-name">${card.title}</div>
+                <div class="task-count">${card.tasks.length} задач</div>
+            </div>
+            <div style="font-size: 12px; color: #7f8c8d; margin-bottom: 10px;">${card.subtitle}</div>
+            <div>
+                ${card.tasks.length > 0 ? card.tasks.map(task => `
+                    <div class="task-item${task.Overdue ? ' emergency' : ''}">
+                        <div><strong>${task.Date ? formatDate(task.Date) : '—'}</strong> - ${task.Model}, ${task.Location}</div>
+                        <div style="font-size: 12px; color: #666;">Срок ТО: ${formatDate(task.DueDate)}, ${task.Hours} ч${task.Overdue ? ' (просрочено)' : ''}</div>
+                    </div>
+                `).join('') : '<div style="font-size: 12px; color: #7f8c8d; padding: 10px; text-align: center;">Нет назначенных работ</div>'}
+            </div>
+        `;
+        scheduleContainer.appendChild(employeeCard);
+    });
+}
+
+function renderMaintenanceHistory() {
     const scheduleContainer = document.getElementById('employee-schedule');
     scheduleContainer.innerHTML = '';
     